@@ -11,5 +11,23 @@ BACKTEST_CONFIG = {
     "maximum_holding_days": 15,
     "stop_loss_threshold": -5.0,
     "profit_target": 5.0,
-    "min_score_gap_to_replace":5
-}
\ No newline at end of file
+    "min_score_gap_to_replace":5,
+    "data_window_days": None,  # candles held in memory beyond the indicator lookback, e.g. 90 for long runs; None = whole range
+    "use_candidate_index": False  # scan only the archive's per-date entry candidates (brokers/data/candidate_index.py); can drop near-threshold picks
+}
+
+# Walk-forward optimization of the entry/exit filter weights (walk_forward.py); window lengths in sessions
+WALK_FORWARD_CONFIG = {
+    "start_date": "2024-06-01",
+    "end_date": "2025-06-01",
+    "train_days": 120,
+    "test_days": 20,
+    "search": "coordinate",  # grid | random | coordinate
+    "objective": "return_pct",  # any param_sweep.summarize metric, maximized
+    "min_trades": 5,  # training runs with fewer trades never win
+    "scales": [0, 0.5, 1, 1.5, 2],  # candidate weights as multiples of the configured weight
+    "random_runs": 40,
+    "seed": 7,
+    "coordinate_rounds": 2,
+    "grid": None  # grid search: {"entry_filters.adx.weight": [0.1, 0.25], ...}
+}
@@ -0,0 +1,157 @@
+"""
+Micro-benchmarks for the enrichment hot paths.
+
+Run from the repo root:
+    python backend/backtesting/benchmarks.py [--repeat 50]
+"""
+import sys
+import time
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from pathlib import Path
+
+# Ensure the root directory is in sys.path for module imports
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pandas as pd
+import pandas_ta as ta
+from services import indicator_kernels as kernels
+from services.indicator_enrichment_service import enrich_with_indicators
+from services.panel_enrichment import enrich_universe, build_candle_cache
+from config.filters_setup import load_filters
+from services.indicator_enrichment_service import enrich_with_indicators_and_score
+from brokers.data.ohlcv_store import OhlcvStore
+from backtesting.synthetic_ohlcv import make_synthetic_ohlcv, SyntheticBroker
+from services.strategies.strategy_factory import get_strategy
+from backtesting.signal_engine import session_times, build_signal_matrices, simulate
+from backtesting.parity_checks import reference_backtest
+
+BAR_COUNTS = [30, 180, 900]
+UNIVERSE_SIZES = [50, 200]
+
+
+def _time_ms(fn, repeat: int) -> float:
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def kernel_cases(df):
+    h, l, c, v = (df[col].to_numpy(dtype=float) for col in ["high", "low", "close", "volume"])
+    return {
+        "rsi": (lambda: ta.rsi(df["close"]), lambda: kernels.rsi(c)),
+        "atr": (lambda: ta.atr(df["high"], df["low"], df["close"]), lambda: kernels.atr(h, l, c)),
+        "adx": (lambda: ta.adx(df["high"], df["low"], df["close"]), lambda: kernels.adx(h, l, c)),
+        "obv": (lambda: ta.obv(df["close"], df["volume"]), lambda: kernels.obv(c, v)),
+        "stoch": (lambda: ta.stoch(df["high"], df["low"], df["close"], k=14, d=3, smooth_k=3),
+                  lambda: kernels.stoch(h, l, c)),
+        "enrich": (lambda: enrich_with_indicators(df, use_kernels=False),
+                   lambda: enrich_with_indicators(df, use_kernels=True)),
+    }
+
+
+def run_kernel_benchmark(repeat: int = 50):
+    print(f"{'indicator':<10}{'bars':>6}{'pandas_ta ms':>15}{'kernel ms':>12}{'speedup':>10}")
+    for bars in BAR_COUNTS:
+        df = make_synthetic_ohlcv(bars, seed=0)
+        for name, (baseline, kernel) in kernel_cases(df).items():
+            base_ms = _time_ms(baseline, repeat)
+            kernel_ms = _time_ms(kernel, repeat)
+            print(f"{name:<10}{bars:>6}{base_ms:>15.3f}{kernel_ms:>12.3f}{base_ms / kernel_ms:>9.1f}x")
+
+
+def run_panel_benchmark(repeat: int = 3, bars: int = 250):
+    print(f"{'symbols':<10}{'bars':>6}{'per-symbol ms':>15}{'panel ms':>12}{'speedup':>10}")
+    for size in UNIVERSE_SIZES:
+        frames = {f"S{seed}": make_synthetic_ohlcv(bars, seed=seed) for seed in range(size)}
+        loop_ms = _time_ms(lambda: [enrich_with_indicators(df) for df in frames.values()], repeat)
+        panel_ms = _time_ms(lambda: enrich_universe(frames), repeat)
+        print(f"{size:<10}{bars:>6}{loop_ms:>15.1f}{panel_ms:>12.1f}{loop_ms / panel_ms:>9.1f}x")
+
+
+def _legacy_feather_read(file_path, from_date, to_date):
+    """The pre-store MockBroker.fetch_candles read path."""
+    df = pd.read_feather(file_path)
+    df = df.set_index("date").sort_index()
+    df = df.sort_values("date")
+    df = df[df.index >= from_date]
+    df = df[df.index <= to_date]
+    return df.copy()
+
+
+def run_candle_read_benchmark(repeat: int = 200, bars: int = 900, window: int = 180):
+    """One backtest-day candle read of a scored archive frame: feather vs memory-mapped store."""
+    df = enrich_with_indicators_and_score(make_synthetic_ohlcv(bars, seed=0), load_filters("swing"))
+    from_date, to_date = df["date"].iloc[-window], df["date"].iloc[-1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        file_path = Path(tmp) / "SYNTH_1d.feather"
+        df.to_feather(file_path)
+        store = OhlcvStore(root=Path(tmp))
+        store.write({"SYNTH": df})
+        cases = {
+            "feather": lambda: _legacy_feather_read(file_path, from_date, to_date),
+            "store": lambda: store.read("SYNTH", start=from_date, end=to_date, date_index=True),
+            "store[close,low]": lambda: store.read("SYNTH", columns=["close", "low"], start=from_date,
+                                                   end=to_date, date_index=True),
+        }
+        print(f"{'read path':<18}{'bars':>6}{'ms':>10}{'bytes owned':>14}")
+        for name, read in cases.items():
+            ms = _time_ms(read, repeat)
+            result = read()
+            views = sum(result[col].to_numpy().nbytes for col in result.columns
+                        if not result[col].to_numpy().flags.writeable)
+            owned = int(result.memory_usage(index=False, deep=True).sum()) - views
+            print(f"{name:<18}{len(result):>6}{ms:>10.3f}{owned:>14,}")
+        store.close()
+
+
+def run_signal_engine_benchmark(symbols: int = 20):
+    """Six months of the quality backtest: event-driven day loop vs signal matrices (one timed run each)."""
+    config = dict(load_filters("swing"), exit_lookback_days=10_000)
+    broker = SyntheticBroker(symbols, start="2021-01-01", end="2022-12-31")
+    start_date = datetime(2022, 1, 3, tzinfo=ZoneInfo("Asia/Kolkata"))
+    end_date = datetime(2022, 6, 30, tzinfo=ZoneInfo("Asia/Kolkata"))
+    params = dict(capital=100000, minimum_entry_score=1.9, maximum_holding_days=15)
+    sessions = session_times(start_date, end_date)
+
+    timings = {}
+    start = time.perf_counter()
+    reference_backtest(broker, config, start_date, end_date, **params)
+    timings["event loop"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    frames = build_candle_cache(broker, broker.get_symbols("all"), config,
+                                start_date - timedelta(days=config.get("lookback_days", 180)), end_date)
+    timings["enrich"] = time.perf_counter() - start
+    start = time.perf_counter()
+    matrices = build_signal_matrices(frames, config, get_strategy("swing", config), sessions, start_date,
+                                     config["exit_lookback_days"])
+    timings["matrices"] = time.perf_counter() - start
+    start = time.perf_counter()
+    simulate(matrices, dict(config), **params)
+    timings["simulate"] = time.perf_counter() - start
+
+    print(f"{'stage':<12}{'symbols':>8}{'sessions':>10}{'seconds':>10}")
+    for name, seconds in timings.items():
+        print(f"{name:<12}{symbols:>8}{len(sessions):>10}{seconds:>10.3f}")
+    signal_total = timings["enrich"] + timings["matrices"] + timings["simulate"]
+    print(f"speedup {timings['event loop'] / signal_total:.1f}x end to end, "
+          f"{timings['event loop'] / timings['simulate']:.0f}x per re-simulation")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark enrichment hot paths")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed iterations per case")
+    args = parser.parse_args()
+
+    run_kernel_benchmark(args.repeat)
+    run_panel_benchmark()
+    run_candle_read_benchmark()
+    run_signal_engine_benchmark()
@@ -1,3 +1,17 @@
+"""
+Per-symbol config hashes for the layered OHLCV cache.
+
+Each stored symbol has three layers, each invalidated only by the config it
+is derived from:
+- raw OHLCV: no config at all (only --append or a new download changes it)
+- indicators: INDICATOR_KEYS (the indicator *set* is checked against the
+  stored columns by the downloader, so enabling a filter that needs a new
+  indicator also refreshes it)
+- entry scores: SCORE_KEYS; a change there that only touches WEIGHT_KEYS
+  reweights the stored CONTRIB_* columns instead of rescoring
+
+Exit-only config edits touch none of them.
+"""
 import hashlib
 import json
 from pathlib import Path
@@ -10,27 +24,91 @@ CONFIG_FILES = [
 CACHE_DIR = Path(".score_cache")
 CACHE_DIR.mkdir(exist_ok=True)
 
-def get_combined_config_hash():
+# Config keys each cached layer is computed from
+INDICATOR_KEYS = ["use_indicator_kernels"]
+SCORE_KEYS = ["entry_filters", "late_entry_penalty"]
+LAYERS = {"indicators": INDICATOR_KEYS, "scores": SCORE_KEYS}
+
+# Config keys that only scale stored per-filter contributions (CONTRIB_* columns)
+WEIGHT_KEYS = {"weight", "bb_weight", "rsi_weight", "macd_weight", "penalty_score"}
+
+def _strip_weights(data):
+    if isinstance(data, dict):
+        return {k: _strip_weights(v) for k, v in data.items() if k not in WEIGHT_KEYS}
+    if isinstance(data, list):
+        return [_strip_weights(v) for v in data]
+    return data
+
+def _load_config() -> dict:
+    """The config files merged the way load_filters merges them."""
+    config = {}
+    for path in CONFIG_FILES:
+        if path.exists():
+            with open(path) as f:
+                config.update(json.load(f))
+    return config
+
+def _hash(data) -> str:
+    return hashlib.md5(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+def get_layer_hash(layer: str, strip_weights: bool = False, config: dict = None) -> str:
+    config = _load_config() if config is None else config
+    data = {key: config.get(key) for key in LAYERS[layer]}
+    return _hash(_strip_weights(data) if strip_weights else data)
+
+def get_cache_config_hash() -> str:
+    """Hash of every config key any cached layer depends on."""
+    config = _load_config()
+    return _hash([get_layer_hash(layer, config=config) for layer in LAYERS])
+
+def get_combined_config_hash(strip_weights: bool = False):
+    """Hash of both config files in full (the pre-layering cache key)."""
     combined = ""
     for path in CONFIG_FILES:
         if path.exists():
             with open(path) as f:
                 data = json.load(f)
+            if strip_weights:
+                data = _strip_weights(data)
             combined += json.dumps(data, sort_keys=True)
     return hashlib.md5(combined.encode()).hexdigest()
 
-def get_hash_path(symbol: str) -> Path:
-    return CACHE_DIR / f"{symbol}_config.hash"
+def get_hash_path(symbol: str, layer: str) -> Path:
+    return CACHE_DIR / f"{symbol}_{layer}.hash"
 
-def is_config_stale(symbol: str) -> bool:
-    hash_path = get_hash_path(symbol)
-    current = get_combined_config_hash()
+def get_structure_hash_path(symbol: str) -> Path:
+    return CACHE_DIR / f"{symbol}_scores_structure.hash"
+
+def _legacy_hash_matches(symbol: str) -> bool:
+    """Scored under the single combined hash, and nothing changed since."""
+    legacy = CACHE_DIR / f"{symbol}_config.hash"
+    return legacy.exists() and legacy.read_text().strip() == get_combined_config_hash()
+
+def _is_layer_stale(symbol: str, layer: str) -> bool:
+    hash_path = get_hash_path(symbol, layer)
     if not hash_path.exists():
-        return True
-    cached = hash_path.read_text().strip()
-    return current != cached
+        return not _legacy_hash_matches(symbol)
+    return hash_path.read_text().strip() != get_layer_hash(layer)
+
+def is_indicator_stale(symbol: str) -> bool:
+    return _is_layer_stale(symbol, "indicators")
+
+def is_score_stale(symbol: str) -> bool:
+    return _is_layer_stale(symbol, "scores")
+
+def is_config_stale(symbol: str) -> bool:
+    """Any config-derived layer of the symbol is out of date."""
+    return is_indicator_stale(symbol) or is_score_stale(symbol)
+
+def is_weight_only_change(symbol: str) -> bool:
+    """Entry-score config changed since the symbol was scored, but only in weights."""
+    structure_path = get_structure_hash_path(symbol)
+    if not is_score_stale(symbol) or not structure_path.exists():
+        return False
+    return structure_path.read_text().strip() == get_layer_hash("scores", strip_weights=True)
 
 def update_config_hash(symbol: str):
-    hash_path = get_hash_path(symbol)
-    current = get_combined_config_hash()
-    hash_path.write_text(current)
+    config = _load_config()
+    for layer in LAYERS:
+        get_hash_path(symbol, layer).write_text(get_layer_hash(layer, config=config))
+    get_structure_hash_path(symbol).write_text(get_layer_hash("scores", strip_weights=True, config=config))
@@ -0,0 +1,114 @@
+"""
+Two-stage download pipeline used by ohlcv_data_downloader.
+
+Stage 1 (I/O-bound): a small thread pool fetches symbols in multi-ticker
+batches, one request per batch, and puts (symbol, frame) items on a bounded
+queue. Producers block while the queue is full, so downloads never run far
+ahead of scoring (backpressure).
+
+Stage 2 (CPU-bound): the main thread feeds a process pool from the queue with
+at most `max_inflight` frames in flight and hands every finished result to
+`on_result` (e.g. a batched store write) as soon as it completes.
+
+Both stages report throughput.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+DONE = object()
+REPORT_EVERY = 250
+
+
+class StageMeter:
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.rows = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, rows: int = 0):
+        with self._lock:
+            self.items += 1
+            self.rows += rows
+
+    def report(self) -> str:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return (f"📈 {self.name}: {self.items} symbols / {self.rows} candles in {elapsed:.1f}s "
+                f"({self.items / elapsed:.1f} symbols/s, {self.rows / elapsed:.0f} candles/s)")
+
+
+def chunked(items: list, size: int) -> list:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def run_pipeline(batches: list, fetch_batch, process_item, on_result, download_workers: int = 4,
+                 cpu_workers: int = 8, queue_size: int = 64, max_inflight: int = None) -> list:
+    """
+    batches: [(start, [symbols])]; fetch_batch(symbols, start) -> {symbol: frame or None}
+    runs in the download threads. process_item(symbol, frame) runs in the process
+    pool (must be picklable); on_result(symbol, result) runs in the calling thread.
+    Returns the symbols whose batch download or processing raised; symbols of a
+    failed batch are not queued for processing.
+    """
+    items = queue.Queue(maxsize=queue_size)
+    download_meter = StageMeter("download")
+    cpu_meter = StageMeter("enrich+score")
+    max_inflight = max_inflight or cpu_workers * 2
+    failed = []
+
+    def produce(start, symbols):
+        try:
+            frames = fetch_batch(symbols, start)
+        except Exception as e:
+            print(f"❌ Batch download failed ({len(symbols)} symbols from {symbols[0]}): {e}")
+            failed.extend(symbols)
+            return
+        for symbol in symbols:
+            frame = frames.get(symbol)
+            download_meter.add(rows=len(frame) if frame is not None else 0)
+            items.put((symbol, frame))
+
+    def produce_all():
+        try:
+            with ThreadPoolExecutor(max_workers=download_workers) as pool:
+                list(pool.map(lambda batch: produce(*batch), batches))
+        finally:
+            items.put(DONE)
+
+    def drain(inflight: dict, block: bool):
+        done = wait(inflight, return_when=FIRST_COMPLETED)[0] if block else [f for f in inflight if f.done()]
+        for future in done:
+            symbol = inflight.pop(future)
+            try:
+                result = future.result()
+                cpu_meter.add(rows=len(result) if result is not None else 0)
+                on_result(symbol, result)
+            except Exception as e:
+                failed.append(symbol)
+                print(f"❌ Fatal error for {symbol}: {e}")
+            if cpu_meter.items % REPORT_EVERY == 0:
+                print(download_meter.report())
+                print(cpu_meter.report())
+
+    producer = threading.Thread(target=produce_all, daemon=True)
+    producer.start()
+    inflight = {}
+    with ProcessPoolExecutor(max_workers=cpu_workers) as pool:
+        while True:
+            item = items.get()
+            if item is DONE:
+                break
+            while len(inflight) >= max_inflight:
+                drain(inflight, block=True)
+            inflight[pool.submit(process_item, *item)] = item[0]
+            drain(inflight, block=False)
+        while inflight:
+            drain(inflight, block=True)
+    producer.join()
+
+    print(download_meter.report())
+    print(cpu_meter.report())
+    return failed
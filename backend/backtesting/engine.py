@@ -7,16 +7,18 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 # Imports
-from datetime import datetime, timedelta
+from datetime import datetime
 from zoneinfo import ZoneInfo
 from services.entry_service import EntryService
 from services.exit_service import ExitService
 from brokers.mock.mock_broker import MockBroker
+from brokers.mock.backtest_data_context import BacktestDataContext
+from brokers.data.candidate_index import get_candidate_index
 from backtesting.trade_recorder import TradeRecorder
 from backend.backtesting.backtest_config import BACKTEST_CONFIG
 from config.filters_setup import load_filters
 from db.tinydb.client import get_table
-from util.util import is_market_active
+from util.trading_calendar import get_trading_calendar
 from config.logging_config import get_loggers, switch_agent_log_file
 
 # Trading parameters
@@ -34,9 +36,7 @@ logger, trade_logger = get_loggers()
 def run_backtest():
     config = load_filters()
     broker = MockBroker(use_cache=True)
-    entry_service = EntryService(broker, config, "all", "swing")
     portfolio_db = get_table("portfolio")
-    exit_service = ExitService(config=config, portfolio_db=portfolio_db, data_provider=broker)
     recorder = TradeRecorder()
 
     capital = BACKTEST_CONFIG["capital"]
@@ -45,9 +45,19 @@ def run_backtest():
     start_date = datetime.strptime(BACKTEST_CONFIG["start_date"], "%Y-%m-%d").replace(tzinfo=ZoneInfo("Asia/Kolkata"))
     end_date = datetime.strptime(BACKTEST_CONFIG["end_date"], "%Y-%m-%d").replace(tzinfo=ZoneInfo("Asia/Kolkata"))
     current_date = start_date.replace(hour=9, minute=30, second=0)
+
+    # Enrich + score the universe one date window at a time; every simulated day is an as-of view of it
+    candidate_index = get_candidate_index(config) if BACKTEST_CONFIG.get("use_candidate_index") else None
+    context = BacktestDataContext(broker, "all", config, start_date, end_date,
+                                  window_days=BACKTEST_CONFIG.get("data_window_days"),
+                                  candidate_index=candidate_index)
+    entry_service = EntryService(context, config, "all", "swing")
+    exit_service = ExitService(config=config, portfolio_db=portfolio_db, data_provider=context)
     last_logged_month = None
     try:
-        while current_date <= end_date:
+        # Only NSE sessions are simulated; weekends and holidays are never visited
+        for session in get_trading_calendar().sessions_between(start_date, end_date):
+            current_date = current_date.replace(year=session.year, month=session.month, day=session.day)
             month_str = current_date.strftime("%Y-%m")
             if month_str != last_logged_month:
                 switch_agent_log_file(month_str)
@@ -57,21 +67,16 @@ def run_backtest():
             if capital < 0:
                 logger.warning(f"⚠️ Capital dropped below zero: ₹{capital:.2f}")
 
-            current_check_time = current_date.replace(hour=9, minute=30)
-            if not is_market_active(current_check_time):
-                current_date += timedelta(days=1)
-                continue
+            context.set_date(current_date)
 
             # Exit logic for current holdings
             for symbol in list(open_positions.keys()):
                 position = open_positions[symbol]
                 buy_date = position["entry_date"]
-                df = broker.fetch_candles(symbol, interval="day", from_date=start_date, to_date=end_date)
+                df = context.fetch_candles(symbol, interval="day", from_date=start_date, to_date=current_date,
+                                          columns=["close", "low"])
                 if df is None or len(df) < 2:
                     continue
-                df = df[df.index <= current_date]
-                if len(df) < 2:
-                    continue
 
                 entry_price = position["entry_price"]
                 entry_score = position["score"]
@@ -131,7 +136,7 @@ def run_backtest():
                     recorder.record_exit(symbol, current_date.strftime("%Y-%m-%d"), exit_price)
                     del open_positions[symbol]
 
-            suggestions = entry_service.get_suggestions()
+            suggestions = entry_service.get_suggestions(as_of_date=current_date)
             top_picks = sorted([s for s in suggestions if s.get("score", 0) >= MIN_ENTRY_SCORE], key=lambda x: x.get("score", 0), reverse=True)
 
             for pick in top_picks:
@@ -154,7 +159,7 @@ def run_backtest():
                     logger.info(f"🔁 Rebalancing: Replacing {weakest_symbol} (Score: {weakest_score}) with {symbol} (Score: {score})")
                     weak_pos = open_positions[weakest_symbol]
                     qty = weak_pos["qty"]
-                    exit_price = broker.get_ltp(weakest_symbol)
+                    exit_price = context.get_ltp(weakest_symbol)
                     exit_service.execute_exit(position, result, current_date)
                     reason = {"filter": "forced_exit", "weight": 0, "reason": "🔁 Rebalanced for better candidate"}
                     pnl = qty * (exit_price - entry_price)
@@ -167,12 +172,10 @@ def run_backtest():
                 elif len(open_positions) >= MAX_TRADES_PER_DAY:
                     continue
 
-                df = broker.fetch_candles(symbol, interval="day", from_date=start_date, to_date=end_date)
+                df = context.fetch_candles(symbol, interval="day", from_date=start_date, to_date=current_date,
+                                          columns=["close"])
                 if df is None or len(df) < 2:
                     continue
-                df = df[df.index <= current_date]
-                if len(df) < 2:
-                    continue
 
                 entry_date = df.index[-2]
                 entry_price = df.iloc[-2]["close"]
@@ -197,11 +200,8 @@ def run_backtest():
                     "entry_indicators": pick.get("indicators", {})  # optional
                 }
 
-            current_date += timedelta(days=1)
-            current_date = current_date.replace(hour=9, minute=30, second=0)
-
         for symbol, pos in open_positions.items():
-            exit_price = broker.get_ltp(symbol)
+            exit_price = context.get_ltp(symbol)
             reason = {"filter": "forced_exit", "weight": 0, "reason": "Forced exit at end"}
             exit_service.execute_exit(position, result, current_date)
             pnl = qty * (exit_price - entry_price)
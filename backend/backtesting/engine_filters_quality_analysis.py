@@ -12,13 +12,15 @@ from pytz import timezone
 from services.entry_service import EntryService
 from services.exit_service import ExitService
 from brokers.mock.mock_broker import MockBroker
+from brokers.mock.backtest_data_context import BacktestDataContext
+from brokers.data.candidate_index import get_candidate_index
 from backtesting.trade_recorder import TradeRecorder
 from backtesting.backtest_config import BACKTEST_CONFIG
 from config.filters_setup import load_filters
 from db.tinydb.client import get_table
-from util.util import is_market_active
+from util.trading_calendar import get_trading_calendar
 from config.logging_config import get_loggers, switch_agent_log_file
-from backtesting.config_tracker import get_combined_config_hash
+from backtesting.config_tracker import get_cache_config_hash
 import subprocess
 from pathlib import Path
 
@@ -33,7 +35,7 @@ MAX_HOLD_DAYS = BACKTEST_CONFIG["maximum_holding_days"]
 logger, trade_logger = get_loggers()
 
 def ensure_fresh_score_cache():
-    current_hash = get_combined_config_hash()
+    current_hash = get_cache_config_hash()
     if HASH_PATH.exists() and HASH_PATH.read_text().strip() == current_hash:
         print("✅ Config unchanged. Using cached scores.")
         return
@@ -45,11 +47,9 @@ def ensure_fresh_score_cache():
 def run_quality_analysis():
     config = load_filters()
     broker = MockBroker(use_cache=True)
-    broker.get_ltp = lambda symbol: {symbol: broker.fetch_candles(symbol, interval="day").iloc[-1]["close"]}
+    broker.get_ltp = lambda symbol: {symbol: broker.fetch_candles(symbol, interval="day", columns=["close"]).iloc[-1]["close"]}
 
-    entry_service = EntryService(broker, config, "all", "swing")
     portfolio_db = get_table("portfolio")
-    exit_service = ExitService(config=config, portfolio_db=portfolio_db, data_provider=broker)
     recorder = TradeRecorder()
 
     capital = BACKTEST_CONFIG["capital"]
@@ -58,26 +58,33 @@ def run_quality_analysis():
     start_date = timezone("Asia/Kolkata").localize(datetime.strptime(BACKTEST_CONFIG["start_date"], "%Y-%m-%d"))
     end_date = timezone("Asia/Kolkata").localize(datetime.strptime(BACKTEST_CONFIG["end_date"], "%Y-%m-%d"))
     current_date = start_date.replace(hour=9, minute=30, second=0)
+
+    # Enrich + score the universe one date window at a time; every simulated day is an as-of view of it
+    candidate_index = get_candidate_index(config) if BACKTEST_CONFIG.get("use_candidate_index") else None
+    context = BacktestDataContext(broker, "all", config, start_date, end_date,
+                                  window_days=BACKTEST_CONFIG.get("data_window_days"),
+                                  candidate_index=candidate_index)
+    entry_service = EntryService(context, config, "all", "swing")
+    exit_service = ExitService(config=config, portfolio_db=portfolio_db, data_provider=context)
     last_logged_month = None
 
     try:
-        while current_date <= end_date:
+        # Only NSE sessions are simulated; weekends and holidays are never visited
+        for session in get_trading_calendar().sessions_between(start_date, end_date):
+            current_date = current_date.replace(year=session.year, month=session.month, day=session.day)
             month_str = current_date.strftime("%Y-%m")
             if month_str != last_logged_month:
                 switch_agent_log_file(month_str)
                 last_logged_month = month_str
             logger.info(f"🜕️ Processing {current_date.strftime('%Y-%m-%d')} | Open Positions: {len(open_positions)}")
-
-            if not is_market_active(current_date):
-                current_date += timedelta(days=1)
-                continue
+            context.set_date(current_date)
 
             # Exit logic for current holdings
             for symbol in list(open_positions.keys()):
                 position = open_positions[symbol]
                 lookback_days = config.get("exit_lookback_days", 30)
                 from_date = current_date - timedelta(days=lookback_days)
-                df = broker.fetch_candles(symbol, interval="day", from_date=from_date, to_date=current_date)
+                df = context.fetch_candles(symbol, interval="day", from_date=from_date, to_date=current_date)
                 if df is None or len(df) < 2:
                     continue
                 df = df[df.index <= current_date]
@@ -138,12 +145,10 @@ def run_quality_analysis():
                 if symbol in open_positions:
                     continue
 
-                df = broker.fetch_candles(symbol, interval="day", from_date=start_date, to_date=end_date)
+                df = context.fetch_candles(symbol, interval="day", from_date=start_date, to_date=current_date,
+                                          columns=["close"])
                 if df is None or len(df) < 2:
                     continue
-                df = df[df.index <= current_date]
-                if len(df) < 2:
-                    continue
 
                 entry_date = df.index[-2]
                 entry_price = df.iloc[-2]["close"]
@@ -166,12 +171,9 @@ def run_quality_analysis():
                 trade_logger.info(f"ENTRY | {symbol} | Qty: {qty} | Entry Price: ₹{entry_price:.2f} | Invested: ₹{invested:.2f} | Score: {score}")
                 recorder.record_entry(symbol, entry_date.strftime("%Y-%m-%d"), entry_price, invested)
 
-            current_date += timedelta(days=1)
-            current_date = current_date.replace(hour=9, minute=30, second=0)
-
         # Final exits
         for symbol, pos in list(open_positions.items()):
-            df = broker.fetch_candles(symbol, interval="day", from_date=start_date, to_date=end_date)
+            df = context.fetch_candles(symbol, interval="day", from_date=start_date, to_date=end_date)
             df = df[df.index <= current_date]
             result = exit_service._build_exit_result(
                 df=df,
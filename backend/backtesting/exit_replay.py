@@ -0,0 +1,268 @@
+"""
+Exit-only backtest: replay a fixed entry ledger against the exit stack.
+
+Entries are taken as recorded — TradeRecorder's trades.csv (entry_date is
+the entry candle) or DiagnosticsTracker's diagnostic_report.csv (entry_date
+is the session the entry was made on) — so no entry scan runs. Only the
+ledger's symbols are loaded, and exits are decided by exit_signals.ExitStack
+over the signal matrices (signal_engine.py): ATR stop, early profit, profit
+target, trailing ATR, the exit filter score against the dynamic threshold
+and score collapse, plus maximum_holding_days.
+
+Positions are walked session by session in entry order, as simulate() walks
+them, because profit-target escalation compounds across every position the
+stack evaluates. Each position runs until its own exit: a recorded position
+that was rebalanced away is held on under the exit stack.
+
+Comparing exit configs uses param_sweep's spec format over exit settings,
+e.g. {"grid": {"stop_loss_exit.stop_loss_pct": [0.03, 0.05], "trailing_stop.atr_multiplier": [2, 3]}}.
+Stack settings and exit filter weights reuse the matrices; other exit
+settings rebuild them over the ledger's symbols only.
+
+Run from the repo root:
+    python backend/backtesting/exit_replay.py [--ledger trades.csv] [--spec exits.json] [--mode portfolio|quality]
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+# Ensure the root directory is in sys.path for module imports
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+import numpy as np
+import pandas as pd
+from backtesting.backtest_config import BACKTEST_CONFIG
+from backtesting.signal_engine import MARKET_TZ, session_times, build_signal_matrices, reweight_exit_signals
+from backtesting.param_sweep import BACKTEST_KEYS, expand_spec, apply_params, path_kind
+from config.filters_setup import load_filters
+from services.exit_signals import ExitStack
+from services.panel_enrichment import build_candle_cache
+from services.strategies.strategy_factory import get_strategy
+from config.logging_config import get_loggers, get_log_directory
+
+logger, trade_logger = get_loggers()
+
+# Backtest keys that still matter once entries are fixed
+REPLAY_KEYS = {"maximum_holding_days", "capital_per_trade"}
+DEFAULT_SPEC = {"grid": {"stop_loss_exit.stop_loss_pct": [0.03, 0.05, 0.07],
+                         "profit_target_exit.profit_target_pct": [0.04, 0.05, 0.06],
+                         "trailing_stop.atr_multiplier": [2, 3]}}
+
+
+def load_ledger(ledger) -> pd.DataFrame:
+    """
+    A trades.csv / diagnostic_report.csv path (or a frame of either) as one row
+    per entry: symbol, entry_price, investment, score (NaN when not recorded),
+    and entry_candle (trades) or entry_session (diagnostics) as YYYY-MM-DD.
+    """
+    df = pd.read_csv(ledger) if isinstance(ledger, (str, Path)) else pd.DataFrame(ledger)
+    missing = [col for col in ("symbol", "entry_date", "entry_price") if col not in df.columns]
+    if missing:
+        raise ValueError(f"Entry ledger is missing columns {missing}")
+    day = lambda values: pd.to_datetime(values.astype(str).str[:19]).dt.strftime("%Y-%m-%d")
+    diagnostics = "exit_time" in df.columns
+    return pd.DataFrame({
+        "symbol": df["symbol"].astype(str),
+        "entry_price": pd.to_numeric(df["entry_price"], errors="coerce"),
+        "investment": pd.to_numeric(df["investment"], errors="coerce") if "investment" in df.columns else np.nan,
+        "score": pd.to_numeric(df["score"], errors="coerce") if "score" in df.columns else np.nan,
+        "entry_candle": None if diagnostics else day(df["entry_date"]),
+        "entry_session": day(df["entry_date"]) if diagnostics else None,
+    })
+
+
+def ledger_positions(matrices: dict, ledger: pd.DataFrame, capital_per_trade: float = None):
+    """
+    (positions in entry order, unmatched ledger rows): each position with its
+    symbol column, entry session, quantity and entry score. Quantity is
+    investment // entry_price when recorded, else sized like simulate().
+    """
+    columns = {symbol: j for j, symbol in enumerate(matrices["symbols"])}
+    session_days = matrices["sessions"].strftime("%Y-%m-%d")
+    rows, scores = matrices["rows"], matrices["signals"]["ENTRY_SCORE"]
+    positions, unmatched = [], []
+    for entry in ledger.itertuples():
+        j = columns.get(entry.symbol)
+        if j is None or not entry.entry_price > 0:
+            unmatched.append(entry.Index)
+            continue
+        if entry.entry_candle is not None:
+            # The session that first sees the candle after the entry candle
+            candle = np.flatnonzero(matrices["dates"][j].strftime("%Y-%m-%d") == entry.entry_candle)
+            sessions = np.flatnonzero(rows[:, j] - 1 == candle[0]) if len(candle) else []
+        else:
+            sessions = np.flatnonzero(session_days == entry.entry_session)
+        if not len(sessions):
+            unmatched.append(entry.Index)
+            continue
+        t = int(sessions[0])
+
+        if entry.investment > 0:
+            qty = int(entry.investment // entry.entry_price)
+        else:
+            qty = 1 if capital_per_trade is None else int(capital_per_trade // entry.entry_price)
+        positions.append({
+            "j": j,
+            "t": t,
+            "symbol": entry.symbol,
+            "entry_date": entry.entry_candle or matrices["dates"][j][rows[t, j] - 1].strftime("%Y-%m-%d"),
+            "entry_price": float(entry.entry_price),
+            "qty": qty,
+            "investment": qty * float(entry.entry_price),
+            "score": float(entry.score) if not np.isnan(entry.score) else float(scores[t, j]),
+        })
+    # Same-session entries in pick order (highest score first): escalation depends on evaluation order
+    positions.sort(key=lambda p: (p["t"], -p["score"]))
+    return positions, unmatched
+
+
+def replay_exits(matrices: dict, positions: list, config: dict, maximum_holding_days: int) -> list:
+    """
+    Close every position through the exit stack; one trade dict per position
+    (simulate()'s trade fields plus days_held), in exit order.
+    """
+    sessions, days, signals = matrices["sessions"], matrices["session_days"], matrices["signals"]
+    close, exit_ready = signals["close"], matrices["exit_ready"]
+    stack = ExitStack(config)
+    open_positions = {}
+    trades = []
+
+    def close_position(key, t, reason, exit_date=None):
+        position = open_positions.pop(key)
+        price = close[t, position["j"]]
+        trades.append({field: value for field, value in position.items() if field not in ("j", "t")} | {
+            "exit_date": exit_date or sessions[t].strftime("%Y-%m-%d"),
+            "exit_price": price,
+            "pnl": position["qty"] * (price - position["entry_price"]),
+            "days_held": int(days[t] - days[position["t"]]),
+            "reason": reason,
+        })
+
+    pending = 0
+    first = positions[0]["t"] if positions else len(sessions)
+    for t in range(first, len(sessions)):
+        for key in list(open_positions):
+            position = open_positions[key]
+            if not exit_ready[t, position["j"]]:
+                continue
+            days_held = int(days[t] - days[position["t"]])
+            reason = stack.decide(position["entry_price"], position["score"], days_held, signals, (t, position["j"]))
+            if reason is None and days_held >= maximum_holding_days:
+                reason = "forced_max_hold"
+            if reason is not None:
+                close_position(key, t, reason)
+
+        while pending < len(positions) and positions[pending]["t"] == t:
+            open_positions[pending] = positions[pending]
+            pending += 1
+
+    last = len(sessions) - 1
+    for key in list(open_positions):
+        close_position(key, last, "Forced exit at end", exit_date=sessions[last].strftime("%Y-%m-%d"))
+    return trades
+
+
+def summarize_exits(trades: list) -> dict:
+    pnl = np.array([t["pnl"] for t in trades], dtype=float)
+    returns = np.array([t["pnl"] / t["investment"] * 100 for t in trades if t["investment"]], dtype=float)
+    reasons = pd.Series([t["reason"] for t in trades], dtype=object).value_counts()
+    return {
+        "trades": len(trades),
+        "win_rate": float((pnl > 0).mean() * 100) if len(pnl) else 0.0,
+        "avg_trade_pct": float(returns.mean()) if len(returns) else 0.0,
+        "total_pnl": float(pnl.sum()),
+        "avg_days_held": float(np.mean([t["days_held"] for t in trades])) if trades else 0.0,
+        **{f"exits_{reason}": int(count) for reason, count in reasons.items()},
+    }
+
+
+def _get(config: dict, path: str):
+    for key in path.split("."):
+        config = config.get(key) if isinstance(config, dict) else None
+    return config
+
+
+def ledger_matrices(frames: dict, config: dict, start_date, end_date) -> dict:
+    return build_signal_matrices(frames, config, get_strategy("swing", config), session_times(start_date, end_date),
+                                 start_date, config.get("exit_lookback_days", 30))
+
+
+def compare_exit_configs(frames: dict, ledger: pd.DataFrame, config: dict, runs: list, start_date, end_date,
+                         mode: str = "portfolio", backtest_config: dict = BACKTEST_CONFIG) -> pd.DataFrame:
+    """
+    Replay the ledger once per run of exit parameters (param_sweep run dicts);
+    one row of parameters and exit metrics per run.
+    """
+    for params in runs:
+        fixed = [name for name in params if name in BACKTEST_KEYS - REPLAY_KEYS]
+        if fixed:
+            raise ValueError(f"{fixed} only affect entries, which the ledger fixes")
+        for path in apply_params(config, params, backtest_config)[2]:
+            path_kind(path)
+
+    started = time.perf_counter()
+    # Matrices per combination of rebuilding settings; runs differing only in stack settings share them
+    built = {"{}": ledger_matrices(frames, config, start_date, end_date)}
+    rows = []
+    for run_id, params in enumerate(runs):
+        run_config, run_backtest_config, paths = apply_params(config, params, backtest_config)
+        rebuild = json.dumps({path: _get(run_config, path) for path in paths if path_kind(path) == "rebuild"},
+                             sort_keys=True)
+        if rebuild not in built:
+            built[rebuild] = ledger_matrices(frames, run_config, start_date, end_date)
+        run_matrices = built[rebuild]
+        if any(path_kind(path) == "reweight" for path in paths):
+            run_matrices = reweight_exit_signals(run_matrices, run_config)
+        capital_per_trade = run_backtest_config["capital_per_trade"] if mode == "portfolio" else None
+        positions, unmatched = ledger_positions(run_matrices, ledger, capital_per_trade)
+        trades = replay_exits(run_matrices, positions, run_config, run_backtest_config["maximum_holding_days"])
+        rows.append({"run": run_id, **params, **summarize_exits(trades), "unmatched": len(unmatched)})
+
+    elapsed = time.perf_counter() - started
+    names = list(dict.fromkeys(name for params in runs for name in params))
+    table = pd.DataFrame(rows)
+    reasons = [col for col in table.columns if col.startswith("exits_")]
+    table[reasons] = table[reasons].fillna(0).astype(int)
+    table = table[["run"] + names + [col for col in table.columns if col not in names and col != "run"]]
+    logger.info(f"✅ Exit replay: {len(runs)} exit configs over {len(ledger)} entries in {elapsed:.1f}s")
+    return table
+
+
+def load_ledger_universe(ledger: pd.DataFrame, config: dict, start_date, end_date) -> dict:
+    """Scored, date-indexed frames of the ledger's symbols from the archive."""
+    from brokers.mock.mock_broker import MockBroker
+    return build_candle_cache(MockBroker(use_cache=True), sorted(ledger["symbol"].unique()), config,
+                              start_date - timedelta(days=config.get("lookback_days", 180)), end_date)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exit-only backtest over a recorded entry ledger")
+    parser.add_argument("--ledger", default=None, help="trades.csv or diagnostic_report.csv (default: trades.csv in the log directory)")
+    parser.add_argument("--spec", default=None, help="JSON grid / random-search spec over exit settings (default: a small grid)")
+    parser.add_argument("--mode", choices=["portfolio", "quality"], default="portfolio",
+                        help="How ledger rows without an investment are sized (capital_per_trade or 1 share)")
+    parser.add_argument("--output", default=None, help="Results CSV (default: exit_replay_results.csv in the log directory)")
+    args = parser.parse_args()
+
+    spec = DEFAULT_SPEC
+    if args.spec:
+        with open(args.spec) as f:
+            spec = json.load(f)
+    config = load_filters()
+    ledger = load_ledger(args.ledger or get_log_directory() / "trades.csv")
+    first_entry = min(ledger["entry_candle"].dropna().tolist() + ledger["entry_session"].dropna().tolist())
+    start_date = datetime.strptime(first_entry, "%Y-%m-%d").replace(tzinfo=ZoneInfo(MARKET_TZ))
+    end_date = datetime.strptime(BACKTEST_CONFIG["end_date"], "%Y-%m-%d").replace(tzinfo=ZoneInfo(MARKET_TZ))
+
+    frames = load_ledger_universe(ledger, config, start_date, end_date)
+    table = compare_exit_configs(frames, ledger, config, expand_spec(spec), start_date, end_date, args.mode)
+    output = Path(args.output) if args.output else get_log_directory() / "exit_replay_results.csv"
+    table.to_csv(output, index=False)
+    print(table.sort_values("total_pnl", ascending=False).head(10).to_string(index=False))
+    print(f"\n🚪 {len(table)} exit configs over {len(ledger)} entries → {output}")
@@ -0,0 +1,125 @@
+"""
+Memory ceiling check for long, full-universe backtests.
+
+Streams a synthetic multi-year universe through the windowed
+BacktestDataContext the way the engines do (one as-of view per trading day,
+results written out as they are produced) and fails if peak RSS exceeds the
+ceiling.
+
+--compact-report instead compares the bytes per symbol-year of the backtest
+candle cache in the default and the compact_dtypes schema.
+
+Run from the repo root:
+    python backend/backtesting/memory_checks.py [--symbols 200 --years 10 --window-days 90 --max-rss-mb 1500]
+    python backend/backtesting/memory_checks.py --compact-report [--symbols 50 --years 5]
+"""
+import sys
+import csv
+import argparse
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+
+# Ensure the root directory is in sys.path for module imports
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import pandas as pd
+from config.filters_setup import load_filters
+from brokers.mock.backtest_data_context import BacktestDataContext
+from services.panel_enrichment import build_candle_cache
+from services.compact_frames import frame_bytes
+from backtesting.synthetic_ohlcv import SyntheticBroker
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (None where unsupported)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def check_windowed_backtest_memory(symbols: int, years: int, window_days: int, max_rss_mb: float,
+                                   output: Path) -> bool:
+    config = load_filters("swing")
+    start = pd.Timestamp("2015-01-01", tz="Asia/Kolkata")
+    end = start + pd.DateOffset(years=years)
+    broker = SyntheticBroker(symbols, start=str(start.date()), end=str(end.date()))
+
+    # Simulation starts once the first lookback is covered, like a real run on the archive
+    start_date = (start + timedelta(days=config.get("lookback_days", 180))).to_pydatetime()
+    end_date = end.to_pydatetime()
+    context = BacktestDataContext(broker, "all", config, start_date, end_date, window_days=window_days or None)
+
+    days = 0
+    with open(output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["date", "symbol", "score"])
+        current_date = start_date.replace(hour=9, minute=30)
+        while current_date <= end_date:
+            if current_date.weekday() < 5:
+                context.set_date(current_date)
+                scores = {symbol: df["ENTRY_SCORE"].iloc[-1] for symbol, df in context.as_of_frames().items()
+                          if "ENTRY_SCORE" in df.columns}
+                if scores:
+                    best = max(scores, key=scores.get)
+                    writer.writerow([f"{current_date:%Y-%m-%d}", best, scores[best]])
+                days += 1
+            current_date += timedelta(days=1)
+
+    peak = peak_rss_mb()
+    if peak is None:
+        print("⚠️ [MEMORY] peak RSS not available on this platform; check skipped")
+        return True
+    ok = peak <= max_rss_mb
+    print(f"{'✅' if ok else '❌'} [MEMORY] {symbols} symbols x {years}y ({days} sessions, "
+          f"window {window_days or 'off'}): peak RSS {peak:.0f} MB (ceiling {max_rss_mb:.0f} MB)")
+    return ok
+
+
+def report_compact_dtypes(symbols: int, years: int) -> bool:
+    """Bytes per symbol-year of build_candle_cache output, default vs compact schema."""
+    config = load_filters("swing")
+    start = pd.Timestamp("2015-01-01", tz="Asia/Kolkata")
+    end = start + pd.DateOffset(years=years)
+    broker = SyntheticBroker(symbols, start=str(start.date()), end=str(end.date()))
+    names = [item["symbol"] for item in broker.get_symbols()]
+
+    sizes = {}
+    for label, compact in (("default", False), ("compact", True)):
+        frames = build_candle_cache(broker, names, {**config, "compact_dtypes": compact}, start, end)
+        sizes[label] = sum(frame_bytes(df) for df in frames.values()) / (len(frames) * years)
+        if compact:
+            dtypes = sorted({str(dtype) for df in frames.values() for dtype in df.dtypes})
+        del frames
+
+    print(f"{'schema':<10}{'bytes / symbol-year':>22}")
+    for label, size in sizes.items():
+        print(f"{label:<10}{size:>22,.0f}")
+    print(f"📉 compact schema: {sizes['compact'] / sizes['default']:.1%} of default ({', '.join(dtypes)})")
+    return sizes["compact"] < sizes["default"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that windowed backtests stay under an RSS ceiling")
+    parser.add_argument("--symbols", type=int, default=200, help="Synthetic universe size")
+    parser.add_argument("--years", type=int, default=10, help="Backtest length in years")
+    parser.add_argument("--window-days", type=int, default=90, help="Context window (0 = whole range)")
+    parser.add_argument("--max-rss-mb", type=float, default=1500, help="Peak RSS ceiling in MB")
+    parser.add_argument("--compact-report", action="store_true", help="Report bytes per symbol-year, default vs compact dtypes")
+    args = parser.parse_args()
+
+    if args.compact_report:
+        sys.exit(0 if report_compact_dtypes(args.symbols, args.years) else 1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ok = check_windowed_backtest_memory(args.symbols, args.years, args.window_days, args.max_rss_mb,
+                                            Path(tmp) / "daily_picks.csv")
+    sys.exit(0 if ok else 1)
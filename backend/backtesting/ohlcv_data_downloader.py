@@ -1,9 +1,16 @@
 import sys
 import yfinance as yf
+import numpy as np
 import pandas as pd
 import json
+import time
+import zlib
+import argparse
+import tempfile
+from collections import defaultdict
+from datetime import date, timedelta
+from functools import partial
 from pathlib import Path
-from concurrent.futures import ProcessPoolExecutor, as_completed
 
 # Ensure the root directory is in sys.path for module imports
 ROOT = Path(__file__).resolve().parents[1]
@@ -11,12 +18,23 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 from config.filters_setup import load_filters
-from services.indicator_enrichment_service import enrich_with_indicators_and_score
-from config_tracker import is_config_stale, update_config_hash
+from services.indicator_enrichment_service import enrich_with_indicators_and_score, calculate_entry_score
+from services.indicator_registry import required_columns
+from services.panel_enrichment import enrich_universe_and_score, RAW_COLUMNS
+from services.entry_score_engine import reweight_entry_score, contribution_column
+from services.indicator_state import (
+    build_indicator_frame, append_candles, load_indicator_state, save_indicator_state, OHLCV_COLUMNS
+)
+from brokers.data.ohlcv_store import OhlcvStore, migrate_feather_archive
+from brokers.data.candidate_index import CandidateIndex
+from backtesting.synthetic_ohlcv import make_synthetic_ohlcv
+from config_tracker import (
+    is_config_stale, is_indicator_stale, is_score_stale, is_weight_only_change, update_config_hash
+)
+from download_pipeline import run_pipeline, chunked
 
-# Archive directory to store historical backtest data
+# Legacy per-symbol feather archive (only read by --migrate); data now lives in the OhlcvStore
 ARCHIVE_DIR = Path(__file__).resolve().parent / "ohlcv_archive"
-ARCHIVE_DIR.mkdir(exist_ok=True)
 
 config = load_filters("swing")
 
@@ -30,47 +48,96 @@ with open(INDEX_FILE) as f:
 START_DATE = "2022-01-01"
 END_DATE = "2025-07-20"
 INTERVALS = ["1d"]
+# Columns written by scoring (as opposed to enrichment)
+SCORE_COLUMNS = ["ENTRY_SCORE", "volume_ratio", "breakout_ready"]
+# JSON breakdowns stored by archives written before breakdowns were built on demand
+LEGACY_COLUMNS = ["ENTRY_BREAKDOWN"]
+# Scored symbols collected from the workers before each store write
+WRITE_BATCH = 200
+# Download pipeline: symbols per yfinance request, concurrent requests, scoring processes, queued frames
+DOWNLOAD_BATCH = 50
+DOWNLOAD_WORKERS = 4
+CPU_WORKERS = 8  # Tune based on CPU core count
+QUEUE_SIZE = 64
+# Simulated request latency (seconds) of offline_download_batch
+OFFLINE_LATENCY = 0.5
 
-def process_and_save(df, file_path, symbol):
-    df = enrich_with_indicators_and_score(df, config)
-    for col in ["ENTRY_BREAKDOWN"]:
-        if col in df.columns:
-            df[col] = df[col].apply(lambda x: json.dumps(x) if isinstance(x, (list, dict)) else str(x) if x is not None else "")
-    df.to_feather(file_path)
-    update_config_hash(symbol)
-
-def download_and_save(symbol, interval="1d"):
-    file_name = f"{symbol}_{interval}_{START_DATE}_{END_DATE}.feather"
-    folder = ARCHIVE_DIR / symbol
-    file_path = folder / file_name
-
-    if file_path.exists():
-        if is_config_stale(symbol):
-            print(f"♻️  Recalculating score for {symbol} using cached data...")
-            try:
-                df = pd.read_feather(file_path)
-                process_and_save(df, file_path, symbol)
-                print(f"💾 Updated: {file_path.name}")
-            except Exception as e:
-                print(f"❌ Error rescoring {symbol}: {e}")
-            return
-        else:
-            print(f"✅ {symbol} already cached and config unchanged.")
-            return
+_STORES = {}
+
+def get_store(interval="1d", root=None):
+    """One OhlcvStore per (root, interval) per process (workers open their own, read-only)."""
+    key = (root, interval)
+    if key not in _STORES:
+        _STORES[key] = OhlcvStore(interval=interval) if root is None else OhlcvStore(root=Path(root), interval=interval)
+    return _STORES[key]
+
+def process(df):
+    return serialize_scored(enrich_with_indicators_and_score(df, config))
+
+def covers_indicators(columns):
+    return all(col in columns for col in required_columns(config))
+
+def indicators_current(df, symbol):
+    """The stored indicator layer can be reused: same indicator params, every needed column present."""
+    return not is_indicator_stale(symbol) and covers_indicators(df.columns)
+
+def can_reweight(df, symbol):
+    return is_weight_only_change(symbol) and contribution_column("late_entry_penalty") in df.columns
+
+def reweight(df):
+    """Weight-only config change: rescore from the stored CONTRIB_* columns, no re-enrichment."""
+    scores, filter_weights, _ = reweight_entry_score(df, config)
+    df["ENTRY_SCORE"] = scores
+    if "breakout_ready" in df.columns and "breakout_ready" in filter_weights:
+        df["breakout_ready"] = np.nan_to_num(filter_weights["breakout_ready"], nan=0.0)
+    return serialize_scored(df)
+
+def rescore(df):
+    """Filter thresholds changed but the stored indicators still cover the config: rescore only."""
+    scored_columns = [c for c in df.columns if c.startswith("CONTRIB_") or c in SCORE_COLUMNS + LEGACY_COLUMNS]
+    return serialize_scored(calculate_entry_score(df.drop(columns=scored_columns), config))
+
+def refresh_cached(df, symbol):
+    """
+    Cheapest refresh of a stale archived symbol: only the layers whose config
+    changed are rebuilt (reweight, rescore, or full re-enrichment).
+    """
+    if not indicators_current(df, symbol):
+        return process(df[["date"] + RAW_COLUMNS])
+    if can_reweight(df, symbol):
+        return reweight(df)
+    if is_score_stale(symbol):
+        return rescore(df)
+    return df
 
-    print(f"⬇️  Downloading {symbol} ({interval})...")
+def serialize_scored(df):
+    """Frame as written to the store: drops a legacy ENTRY_BREAKDOWN column when a symbol is rewritten."""
+    return df.drop(columns=[c for c in LEGACY_COLUMNS if c in df.columns])
+
+def save_scored(frames, interval="1d", root=None):
+    """Write scored frames ({symbol: df}) to the store as one segment, then record their config hashes."""
+    get_store(interval, root).write(frames)
+    if root is None:
+        for symbol in frames:
+            update_config_hash(symbol)
+
+def update_candidates(interval="1d", root=None):
+    """Recompute the candidate bitmap for the symbols whose archived candles changed."""
+    rebuilt = CandidateIndex(get_store(interval, root), config).update()
+    print(f"🗺️ Candidate index: {rebuilt} symbols recomputed")
+
+def download_raw(symbol, interval="1d", start=START_DATE, end=END_DATE):
+    print(f"⬇️  Downloading {symbol} ({interval}) {start} → {end}...")
     df = yf.download(
         symbol,
-        start=START_DATE,
-        end=END_DATE,
+        start=start,
+        end=end,
         interval=interval,
         auto_adjust=False
     )
     if df is None or df.empty:
         print(f"⚠️  No usable data for {symbol}")
-        return
-    folder.mkdir(parents=True, exist_ok=True)
-
+        return None
     df = df.rename(columns={
         "Open": "open", "High": "high", "Low": "low",
         "Close": "close", "Adj Close": "adj_close", "Volume": "volume"
@@ -85,27 +152,241 @@ def download_and_save(symbol, interval="1d"):
         raise ValueError(f"Length mismatch: got {len(df.columns)} columns, expected {len(expected_columns)}")
     df.columns = expected_columns
 
-    try:
-        process_and_save(df, file_path, symbol)
-        print(f"💾 Saved: {file_path.name}")
-    except Exception as e:
-        print(f"❌ Error saving {symbol}: {e}")
-        return
+    return df
+
+def normalize_download(df):
+    """yfinance frame for one ticker -> date + RAW_COLUMNS (IST dates), None if empty."""
+    if df is None:
+        return None
+    df = df.dropna(how="all")
+    if df.empty:
+        return None
+    df = df.rename(columns={
+        "Open": "open", "High": "high", "Low": "low",
+        "Close": "close", "Adj Close": "adj_close", "Volume": "volume"
+    })
+    dates = pd.to_datetime(df.index)
+    dates = dates.tz_localize("UTC") if dates.tz is None else dates
+    df = df[RAW_COLUMNS].reset_index(drop=True)
+    df.insert(0, "date", dates.tz_convert("Asia/Kolkata"))
+    return df
+
+def download_batch(symbols, interval="1d", start=START_DATE, end=END_DATE):
+    """One multi-ticker request: {symbol: raw frame or None}."""
+    print(f"⬇️  Downloading {len(symbols)} symbols ({interval}) {start} → {end}...")
+    df = yf.download(
+        symbols,
+        start=start,
+        end=end,
+        interval=interval,
+        group_by="ticker",
+        auto_adjust=False,
+        threads=False,
+        progress=False
+    )
+    if df is None or df.empty:
+        return {}
+    tickers = set(df.columns.get_level_values(0))
+    return {symbol: normalize_download(df[symbol]) for symbol in symbols if symbol in tickers}
+
+def offline_download_batch(symbols, interval="1d", start=START_DATE, end=END_DATE, latency=OFFLINE_LATENCY):
+    """
+    Stand-in for download_batch with no network: deterministic synthetic daily
+    candles per symbol (same candles for the same dates on every call, so
+    --append runs line up with earlier ones) after a simulated request latency.
+    """
+    time.sleep(latency)
+    rows = len(pd.bdate_range(START_DATE, end, inclusive="left"))
+    frames = {}
+    for symbol in symbols:
+        df = make_synthetic_ohlcv(rows, seed=zlib.crc32(symbol.encode()), start=START_DATE)
+        df = df[df["date"] >= pd.Timestamp(start, tz="Asia/Kolkata")]
+        frames[symbol] = df[["date"] + RAW_COLUMNS].reset_index(drop=True) if not df.empty else None
+    return frames
+
+def state_path(symbol, interval="1d", root=None):
+    return get_store(interval, root).path / "indicator_state" / f"{symbol}.json"
+
+def is_stale(symbol, interval="1d", root=None):
+    """
+    A stored symbol needs a refresh: indicator columns the config needs are
+    missing, or (default store only, where config hashes are tracked) a
+    config layer it was built from changed.
+    """
+    if not covers_indicators(get_store(interval, root).entry(symbol)["columns"]):
+        return True
+    return root is None and is_config_stale(symbol)
+
+def append_scored(symbol, stored, delta, interval="1d", root=None):
+    """
+    The stored frame extended with the delta candles after its last stored
+    date, None if there is nothing new. Only the new candles are enriched (from
+    the saved indicator state) and scored; history is kept as-is unless its
+    own config layers are stale.
+    """
+    last = stored["date"].iloc[-1]
+    if delta is not None:
+        delta = delta[delta["date"] > last].drop_duplicates(subset="date")
+    if delta is None or delta.empty:
+        if is_stale(symbol, interval, root):
+            return refresh_cached(stored, symbol)
+        if delta is None:
+            print(f"⚠️  No candles downloaded for {symbol}, stored data ends {last:%Y-%m-%d}")
+        else:
+            print(f"✅ {symbol} up to date ({last:%Y-%m-%d})")
+        return None
+    if is_stale(symbol, interval, root):
+        if not indicators_current(stored, symbol):
+            return process(pd.concat([stored[["date"] + RAW_COLUMNS], delta], ignore_index=True))
+        # Only the score layer changed: refresh it, then append as usual
+        stored = refresh_cached(stored, symbol)
+
+    cached = stored.set_index("date")
+    path = state_path(symbol, interval, root)
+    state = load_indicator_state(path)
+    if state is None or state.last_timestamp != last:
+        # Missing or out of sync: replay the stored candles once to rebuild it
+        state, _ = build_indicator_frame(cached[OHLCV_COLUMNS], config, tail_rows=1)
+
+    fresh = delta.set_index("date")
+    merged = append_candles(cached, fresh, state, config)
+    merged.loc[fresh.index, "adj_close"] = fresh["adj_close"]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    save_indicator_state(state, path)
+    print(f"➕ {symbol}: appended {len(fresh)} candles after {last:%Y-%m-%d}")
+    return serialize_scored(merged.reset_index())
+
+def score_downloaded(symbol, raw, interval="1d", append=False, root=None):
+    """
+    CPU stage worker: scored frame for one symbol given its downloaded candles
+    (None when nothing was downloaded), None if the store is already up to date.
+    """
+    store = get_store(interval, root)
+    if symbol in store:
+        stored = store.read(symbol)
+        if append:
+            return append_scored(symbol, stored, raw, interval, root)
+        if is_stale(symbol, interval, root):
+            print(f"♻️  Recalculating score for {symbol} using cached data...")
+            return refresh_cached(stored, symbol)
+        return None
+    if raw is None:
+        print(f"⚠️  No usable data for {symbol}")
+        return None
+    return process(raw)
+
+def plan_downloads(symbols, interval="1d", append=False, root=None):
+    """{download start (None = nothing to download): [symbols]} for the pipeline."""
+    store = get_store(interval, root)
+    plan = defaultdict(list)
+    for symbol in symbols:
+        if symbol not in store:
+            plan[START_DATE].append(symbol)
+        elif append:
+            plan[f"{store.last_date(symbol) + timedelta(days=1):%Y-%m-%d}"].append(symbol)
+        elif is_stale(symbol, interval, root):
+            plan[None].append(symbol)
+        else:
+            print(f"✅ {symbol} already cached and config unchanged.")
+    return plan
+
+def run_download_pipeline(symbols, interval="1d", fetch=download_batch, append=False, end=END_DATE, root=None):
+    """
+    Download in multi-ticker batches on DOWNLOAD_WORKERS threads while
+    CPU_WORKERS processes enrich and score, writing WRITE_BATCH symbols per
+    store segment as results arrive. Returns the failed symbols.
+    """
+    plan = plan_downloads(symbols, interval, append, root)
+    batches = [(start, group) for start, pending in plan.items() for group in chunked(pending, DOWNLOAD_BATCH)]
+    print(f"🚚 {sum(len(p) for p in plan.values())} symbols to process in {len(batches)} batches ({interval})")
+
+    def fetch_batch(batch, start):
+        return fetch(batch, interval, start, end) if start is not None else {}
+
+    written = {}
+    def on_result(symbol, df):
+        if df is None:
+            return
+        written[symbol] = df
+        if len(written) >= WRITE_BATCH:
+            save_scored(dict(written), interval, root)
+            written.clear()
+
+    failed = run_pipeline(batches, fetch_batch, partial(score_downloaded, interval=interval, append=append, root=root),
+                          on_result, download_workers=DOWNLOAD_WORKERS, cpu_workers=CPU_WORKERS,
+                          queue_size=QUEUE_SIZE)
+    if written:
+        save_scored(written, interval, root)
+    get_store(interval, root).compact()
+    update_candidates(interval, root)
+    return failed
+
+def panel_refresh(interval="1d"):
+    """
+    Same outcome as the per-symbol workers over ALL_SYMBOLS, but every stale or
+    new symbol is enriched and scored together in one panel pass.
+    """
+    store = get_store(interval)
+    frames = {}
+    rescored = {}
+    for symbol in ALL_SYMBOLS:
+        try:
+            if symbol in store:
+                if is_stale(symbol, interval):
+                    df = store.read(symbol)
+                    if indicators_current(df, symbol):
+                        rescored[symbol] = refresh_cached(df, symbol)
+                        print(f"♻️  Rescored without re-enrichment: {symbol}")
+                    else:
+                        frames[symbol] = df[["date"] + RAW_COLUMNS]
+            else:
+                df = download_raw(symbol, interval)
+                if df is not None:
+                    frames[symbol] = df
+        except Exception as e:
+            print(f"❌ Error loading {symbol}: {e}")
+
+    print(f"🧮 Scoring {len(frames)} symbols as one panel...")
+    scored = {symbol: serialize_scored(df) for symbol, df in enrich_universe_and_score(frames, config).items()}
+    save_scored({**rescored, **scored}, interval)
+    store.compact()
+    update_candidates(interval)
+    print(f"💾 Saved {len(rescored) + len(scored)} symbols")
+    return [symbol for symbol in frames if symbol not in scored]
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download and score the OHLCV archive")
+    parser.add_argument("--panel", action="store_true", help="Score all stale/new symbols in one panel pass")
+    parser.add_argument("--migrate", action="store_true", help="Import the legacy per-symbol feather archive into the store")
+    parser.add_argument("--append", action="store_true", help="Only fetch and score candles after each symbol's last stored date")
+    parser.add_argument("--end", default=None, help="Exclusive end date (default: today with --append, else END_DATE)")
+    parser.add_argument("--offline", action="store_true", help="Use synthetic candles instead of yfinance (no network)")
+    parser.add_argument("--store-root", default=None, help="Store directory (default: the OHLCV store; a temp dir with --offline)")
+    args = parser.parse_args()
+
+    if args.migrate:
+        for interval in INTERVALS:
+            migrated = migrate_feather_archive(ARCHIVE_DIR, get_store(interval), interval)
+            print(f"📦 Migrated {migrated} symbols ({interval}) into {get_store(interval).path}")
+        sys.exit(0)
+
+    if args.panel:
+        for interval in INTERVALS:
+            failed = panel_refresh(interval)
+        print(f"\n🎯 Panel refresh completed with {len(failed)} failures")
+        sys.exit(0)
+
+    if args.offline and args.store_root is None:
+        args.store_root = tempfile.mkdtemp(prefix="ohlcv_offline_")
+    fetch = offline_download_batch if args.offline else download_batch
+    # Today's daily bar is still forming during market hours, and append never revisits stored candles
+    end = args.end or (f"{date.today():%Y-%m-%d}" if args.append else END_DATE)
     failed = []
-    max_workers = 8  # Tune based on CPU core count
 
     for interval in INTERVALS:
-        with ProcessPoolExecutor(max_workers=max_workers) as executor:
-            future_to_symbol = {executor.submit(download_and_save, symbol, interval): symbol for symbol in ALL_SYMBOLS}
-            for future in as_completed(future_to_symbol):
-                symbol = future_to_symbol[future]
-                try:
-                    future.result()
-                except Exception as e:
-                    failed.append(symbol)
-                    print(f"❌ Fatal error for {symbol}: {e}")
+        failed += run_download_pipeline(ALL_SYMBOLS, interval, fetch, append=args.append, end=end, root=args.store_root)
+        if args.store_root:
+            print(f"💾 Store written to {get_store(interval, args.store_root).path}")
 
     print(f"\n🎯 Completed with {len(failed)} failures out of {len(ALL_SYMBOLS)}")
     if failed:
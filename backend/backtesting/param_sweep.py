@@ -0,0 +1,264 @@
+"""
+Parallel parameter sweep over the signal-matrix backtest (signal_engine.py).
+
+The universe is loaded, enriched and scored once and written to a temporary
+OhlcvStore, i.e. a memory-mapped Arrow IPC file. Worker processes map it
+read-only (the numeric columns are views over the shared pages, not copies),
+build the signal matrices once each, and then run their share of the sweep
+against them; only run parameters and summary rows cross process boundaries.
+
+Sweepable parameters:
+- BACKTEST_CONFIG keys: minimum_entry_score, maximum_holding_days, capital,
+  capital_per_trade, max_trades_per_day, min_score_gap_to_replace
+- exit stack settings, e.g. stop_loss_exit.stop_loss_pct or
+  profit_target_exit.profit_target_pct (fractions, close-based like
+  ExitService). BACKTEST_CONFIG's stop_loss_threshold / profit_target are
+  engine.py's own checks (a stop on the day's low filled at the stop price,
+  a close-based target) which the signal engine does not model, so they are
+  rejected rather than swept
+- any other dotted filter-config path, e.g. exit_filters.macd_exit_filter.weight
+  or trailing_stop.atr_multiplier. Exit filter weights only re-sum the exit
+  score matrix and settings the exit stack reads per decision cost nothing;
+  any other path rebuilds that run's matrices. Entry filter settings are
+  fixed by the scored panel.
+
+Spec file (JSON), a grid or a random search:
+    {"grid": {"minimum_entry_score": [1.5, 1.9, 2.3], "profit_target_exit.profit_target_pct": [0.04, 0.05]}}
+    {"random": {"runs": 50, "seed": 7, "params": {
+        "stop_loss_exit.stop_loss_pct": {"min": 0.03, "max": 0.08},
+        "maximum_holding_days": {"min": 5, "max": 20, "integer": true},
+        "exit_filters.rsi_drop_filter.weight": {"choices": [1, 2, 3, 4]}}}}
+
+Run from the repo root:
+    python backend/backtesting/param_sweep.py --spec sweep.json [--mode portfolio|quality] [--workers 8]
+"""
+import sys
+import copy
+import json
+import time
+import argparse
+import itertools
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+# Ensure the root directory is in sys.path for module imports
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+import numpy as np
+import pandas as pd
+from brokers.data.ohlcv_store import OhlcvStore
+from backtesting.backtest_config import BACKTEST_CONFIG
+from backtesting.signal_engine import (
+    MARKET_TZ, session_times, build_signal_matrices, reweight_exit_signals, simulate, backtest_params
+)
+from config.filters_setup import load_filters
+from services.panel_enrichment import build_candle_cache
+from services.strategies.strategy_factory import get_strategy
+from services.exit_signals import EXIT_FILTER_RULES
+from config.logging_config import get_loggers, get_log_directory
+
+logger, trade_logger = get_loggers()
+
+BACKTEST_KEYS = {"capital", "capital_per_trade", "minimum_entry_score", "max_trades_per_day",
+                 "maximum_holding_days", "min_score_gap_to_replace"}
+# Read by engine.py's day loop only; simulate() has no equivalent
+ENGINE_ONLY_KEYS = {"stop_loss_threshold", "profit_target"}
+# Config read by ExitStack per decision rather than baked into the matrices
+STACK_PATHS = ("stop_loss_exit", "profit_target_exit", "profit_target_escalation", "dynamic_threshold",
+               "minimum_holding_days", "exit_filters.exit_time_decay_filter")
+# Baked into ENTRY_SCORE when the panel is scored
+SCORED_PATHS = ("entry_filters", "late_entry_penalty")
+DEFAULT_SPEC = {"grid": {"minimum_entry_score": [1.5, 1.9, 2.3],
+                         "profit_target_exit.profit_target_pct": [0.04, 0.05, 0.06],
+                         "stop_loss_exit.stop_loss_pct": [0.03, 0.05, 0.07]}}
+
+_worker = {}
+
+
+def expand_spec(spec: dict) -> list:
+    """The runs of a grid / random-search spec: one {param: value} dict per run."""
+    if "grid" in spec:
+        names = list(spec["grid"])
+        return [dict(zip(names, values)) for values in itertools.product(*(spec["grid"][n] for n in names))]
+    if "random" in spec:
+        random = spec["random"]
+        rng = np.random.default_rng(random.get("seed"))
+        runs = []
+        for _ in range(random["runs"]):
+            run = {}
+            for name, dist in random["params"].items():
+                if "choices" in dist:
+                    run[name] = dist["choices"][int(rng.integers(len(dist["choices"])))]
+                elif dist.get("integer"):
+                    run[name] = int(rng.integers(dist["min"], dist["max"] + 1))
+                else:
+                    run[name] = round(float(rng.uniform(dist["min"], dist["max"])), 4)
+            runs.append(run)
+        return runs
+    raise ValueError("Sweep spec needs a 'grid' or a 'random' section")
+
+
+def _set_path(config: dict, path: str, value):
+    keys = path.split(".")
+    node = config
+    for key in keys[:-1]:
+        node = node.setdefault(key, {})
+    node[keys[-1]] = value
+
+
+def path_kind(path: str) -> str:
+    """How a run reaches a config path: 'stack' (read per decision), 'reweight' or 'rebuild'."""
+    if path in ENGINE_ONLY_KEYS:
+        raise ValueError(f"'{path}' is engine.py's own exit check, not modelled by the signal engine; "
+                         "sweep stop_loss_exit.stop_loss_pct / profit_target_exit.profit_target_pct instead")
+    if path.startswith(SCORED_PATHS):
+        raise ValueError(f"'{path}' is scored into the panel once and cannot be swept here")
+    if path == "minimum_holding_days" or path.startswith(tuple(f"{p}." for p in STACK_PATHS)):
+        return "stack"
+    keys = path.split(".")
+    if len(keys) == 3 and keys[0] == "exit_filters" and keys[1] in EXIT_FILTER_RULES and keys[2] == "weight":
+        return "reweight"
+    return "rebuild"
+
+
+def apply_params(config: dict, params: dict, backtest_config: dict = BACKTEST_CONFIG):
+    """(filter config, backtest config, config paths set) for one run's parameters."""
+    config = copy.deepcopy(config)
+    backtest_config = dict(backtest_config)
+    paths = []
+    for name, value in params.items():
+        if name in BACKTEST_KEYS:
+            backtest_config[name] = value
+            continue
+        _set_path(config, name, value)
+        paths.append(name)
+    return config, backtest_config, paths
+
+
+def summarize(result: dict, capital: float) -> dict:
+    trades = result["trades"]
+    pnl = np.array([t["pnl"] for t in trades], dtype=float)
+    returns = np.array([t["pnl"] / t["investment"] * 100 for t in trades if t["investment"]], dtype=float)
+    equity = np.asarray(result["equity"], dtype=float)
+    peak = np.maximum.accumulate(equity) if len(equity) else equity
+    drawdown = ((peak - equity) / peak * 100).max() if len(equity) else 0.0
+    return {
+        "trades": len(trades),
+        "win_rate": float((pnl > 0).mean() * 100) if len(pnl) else 0.0,
+        "avg_trade_pct": float(returns.mean()) if len(returns) else 0.0,
+        "total_pnl": float(pnl.sum()),
+        "final_capital": float(result["capital"]),
+        "return_pct": float((result["capital"] - capital) / capital * 100),
+        "max_drawdown_pct": float(drawdown),
+    }
+
+
+def share_universe(frames: dict, root: Path) -> Path:
+    """Write the scored universe to a store under root for the workers to map."""
+    OhlcvStore(root=root).write({symbol: df.reset_index() for symbol, df in frames.items()})
+    return Path(root)
+
+
+def _init_worker(store_root, config: dict, start_date, end_date, mode: str, backtest_config: dict):
+    store = OhlcvStore(root=store_root)
+    frames = {symbol: store.read(symbol, date_index=True) for symbol in store.symbols()}
+    sessions = session_times(start_date, end_date)
+    _worker.update(
+        store=store, frames=frames, config=config, mode=mode, backtest_config=backtest_config,
+        sessions=sessions, start_date=start_date,
+        matrices=build_signal_matrices(frames, config, get_strategy("swing", config), sessions, start_date,
+                                       config.get("exit_lookback_days", 30)),
+    )
+
+
+def run_one(run_id: int, params: dict) -> dict:
+    """One sweep run in a worker set up by _init_worker."""
+    started = time.perf_counter()
+    config, backtest_config, paths = apply_params(_worker["config"], params, _worker["backtest_config"])
+    kinds = {path_kind(path) for path in paths}
+    matrices = _worker["matrices"]
+    if "rebuild" in kinds:
+        matrices = build_signal_matrices(_worker["frames"], config, get_strategy("swing", config),
+                                         _worker["sessions"], _worker["start_date"],
+                                         config.get("exit_lookback_days", 30))
+    elif "reweight" in kinds:
+        matrices = reweight_exit_signals(matrices, config)
+    result = simulate(matrices, config, **backtest_params(_worker["mode"], backtest_config))
+    return {"run": run_id, **params, **summarize(result, backtest_config["capital"]),
+            "seconds": time.perf_counter() - started}
+
+
+def run_sweep(frames: dict, config: dict, runs: list, start_date, end_date, mode: str = "portfolio",
+              workers: int = None, backtest_config: dict = BACKTEST_CONFIG) -> pd.DataFrame:
+    """
+    Every run in `runs` over the scored universe `frames`, fanned out over a
+    process pool; one row of parameters and summary metrics per run.
+    """
+    # Reject parameters that cannot be swept before any worker starts
+    for params in runs:
+        for path in apply_params(config, params, backtest_config)[2]:
+            path_kind(path)
+    started = time.perf_counter()
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="param_sweep_") as tmp:
+        store_root = share_universe(frames, Path(tmp))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(store_root, config, start_date, end_date, mode, backtest_config)) as pool:
+            futures = [pool.submit(run_one, run_id, params) for run_id, params in enumerate(runs)]
+            for done, future in enumerate(as_completed(futures), 1):
+                rows.append(future.result())
+                if done % 10 == 0 or done == len(runs):
+                    elapsed = time.perf_counter() - started
+                    logger.info(f"🧪 Sweep: {done}/{len(runs)} runs, {done / elapsed * 60:.1f} runs/min")
+
+    elapsed = time.perf_counter() - started
+    names = list(dict.fromkeys(name for params in runs for name in params))
+    table = pd.DataFrame(rows).sort_values("run").reset_index(drop=True)
+    table = table[["run"] + names + [col for col in table.columns if col not in names and col != "run"]]
+    table.attrs["runs_per_minute"] = len(runs) / elapsed * 60 if elapsed else float("inf")
+    logger.info(f"✅ Sweep finished: {len(runs)} runs in {elapsed:.1f}s "
+                f"({table.attrs['runs_per_minute']:.1f} runs/min, {workers or 'all'} workers)")
+    return table
+
+
+def load_universe(config: dict, start_date, end_date, synthetic: int = None) -> dict:
+    """Scored, date-indexed frames from the archive (or a synthetic universe of that many symbols)."""
+    if synthetic:
+        from backtesting.synthetic_ohlcv import SyntheticBroker
+        broker = SyntheticBroker(synthetic, start=f"{start_date.year - 2}-01-01", end=f"{end_date:%Y-%m-%d}")
+    else:
+        from brokers.mock.mock_broker import MockBroker
+        broker = MockBroker(use_cache=True)
+    return build_candle_cache(broker, broker.get_symbols("all") or [], config,
+                              start_date - timedelta(days=config.get("lookback_days", 180)), end_date)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel parameter sweep over the signal-matrix backtest")
+    parser.add_argument("--spec", default=None, help="JSON grid / random-search spec (default: a small grid)")
+    parser.add_argument("--mode", choices=["portfolio", "quality"], default="portfolio")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--synthetic", type=int, default=None, help="Sweep a synthetic universe of N symbols")
+    parser.add_argument("--output", default=None, help="Results CSV (default: sweep_results.csv in the log directory)")
+    args = parser.parse_args()
+
+    spec = DEFAULT_SPEC
+    if args.spec:
+        with open(args.spec) as f:
+            spec = json.load(f)
+    config = load_filters()
+    start_date = datetime.strptime(BACKTEST_CONFIG["start_date"], "%Y-%m-%d").replace(tzinfo=ZoneInfo(MARKET_TZ))
+    end_date = datetime.strptime(BACKTEST_CONFIG["end_date"], "%Y-%m-%d").replace(tzinfo=ZoneInfo(MARKET_TZ))
+
+    runs = expand_spec(spec)
+    frames = load_universe(config, start_date, end_date, args.synthetic)
+    table = run_sweep(frames, config, runs, start_date, end_date, args.mode, args.workers)
+    output = Path(args.output) if args.output else get_log_directory() / "sweep_results.csv"
+    table.to_csv(output, index=False)
+    print(table.sort_values("return_pct", ascending=False).head(10).to_string(index=False))
+    print(f"\n🧪 {len(table)} runs at {table.attrs['runs_per_minute']:.1f} runs/min → {output}")
@@ -0,0 +1,1069 @@
+"""
+Parity checks between the optimized paths and the reference implementations.
+
+Run from the repo root:
+    python backend/backtesting/parity_checks.py [--archive 50]
+"""
+import sys
+import copy
+import json
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from pathlib import Path
+
+# Ensure the root directory is in sys.path for module imports
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import numpy as np
+import pandas as pd
+from config.filters_setup import load_filters
+from services.technical_analysis import calculate_score
+from services.indicator_enrichment_service import enrich_with_indicators, calculate_entry_score, KERNEL_FUNCTIONS
+from services.indicator_registry import INDICATORS, required_columns
+from services.indicator_state import build_indicator_frame, append_candles, IndicatorState, OHLCV_COLUMNS
+from services.panel_enrichment import enrich_universe_and_score
+from services.entry_score_engine import CONTRIBUTION_SPECS, reweight_entry_score, explain_entry_rows, breakdown_at
+from services.compact_frames import compact_frame
+from brokers.data.ohlcv_store import OhlcvStore
+from brokers.data.candidate_index import CandidateIndex
+from backtesting.synthetic_ohlcv import make_synthetic_ohlcv, SyntheticBroker
+from brokers.mock.backtest_data_context import BacktestDataContext
+from services.entry_service import EntryService
+from services.exit_service import ExitService
+from services.panel_enrichment import build_candle_cache
+from backtesting.backtest_config import BACKTEST_CONFIG, WALK_FORWARD_CONFIG
+from services.strategies.strategy_factory import get_strategy
+from backtesting.signal_engine import (
+    session_times, build_signal_matrices, reweight_entry_signals, reweight_exit_signals, slice_sessions, simulate,
+    backtest_params
+)
+from backtesting.param_sweep import run_sweep, apply_params, summarize
+from backtesting.walk_forward import run_walk_forward, evaluate
+from backtesting.exit_replay import (
+    load_ledger, ledger_positions, replay_exits, compare_exit_configs, DEFAULT_SPEC as EXIT_REPLAY_SPEC
+)
+from backtesting.param_sweep import expand_spec
+from intraday.candle_cache_builder import merge_candles, trim_to_lookback
+
+SYNTHETIC_SEEDS = range(20)
+SYNTHETIC_ROWS = [30, 180, 900]
+INDICATOR_COLUMNS = [
+    "RSI", "EMA_FAST", "EMA_SLOW", "MACD", "MACD_SIGNAL", "MACD_HIST", "ADX_14", "DMP_14", "DMN_14",
+    "OBV", "VOLUME_AVG", "ATR", "STOCHASTIC_K", "STOCHASTIC_D", "SMA_50", "SMA_20",
+    "BB_MIDDLE", "BB_UPPER", "BB_LOWER", "BB_%B", "AVG_RSI",
+    "FIB_0", "FIB_236", "FIB_382", "FIB_50", "FIB_618", "FIB_786", "FIB_100",
+]
+
+
+def rowwise_entry_score(df: pd.DataFrame, config: dict) -> pd.DataFrame:
+    """Reference per-row scorer (the original iterrows loop over calculate_score)."""
+    df = df.copy()
+    df.set_index("date", inplace=True)
+    scores, breakdowns = [], []
+    for i, (index, row) in enumerate(df.iterrows()):
+        score, breakdown, extras = calculate_score(row, config, full_df=df.iloc[:i+1])
+        scores.append(score)
+        breakdowns.append(breakdown if isinstance(breakdown, list) else [])
+        for key, val in extras.items():
+            if val is not None:
+                df.at[row.name, key] = val
+    df["ENTRY_SCORE"] = scores
+    df["ENTRY_BREAKDOWN"] = breakdowns
+    df.reset_index(inplace=True)
+    return df
+
+
+def _baseline_hard_filters(config: dict, df: pd.DataFrame) -> bool:
+    """SwingStrategy.apply_hard_filters as it was before hard_filter_mask (whole-column reads)."""
+    try:
+        rsi, macd, macd_signal = df.get("RSI"), df.get("MACD"), df.get("MACD_SIGNAL")
+        dmp, dmn = df.get("DMP_14"), df.get("DMN_14")
+        if not (config.get('rsi_min') <= rsi <= config.get('rsi_max')): return False
+        if macd <= macd_signal: return False
+        if dmp <= dmn: return False
+        return True
+    except Exception:
+        return False
+
+
+def check_hard_filter_change(enriched: pd.DataFrame, config: dict) -> dict:
+    """
+    Swing hard filters before and after hard_filter_mask: how many rows each
+    passes, and the mask against a per-row scalar reading of the same rules.
+    """
+    strategy = get_strategy("swing", config)
+    mask = strategy.hard_filter_mask(enriched)
+    reference = []
+    for row in enriched.itertuples(index=False):
+        rsi, macd, macd_signal, dmp, dmn = (float(getattr(row, c)) for c in ["RSI", "MACD", "MACD_SIGNAL", "DMP_14", "DMN_14"])
+        passed = macd > macd_signal and dmp > dmn
+        if config.get("rsi_min") is not None:
+            passed = passed and rsi >= config["rsi_min"]
+        if config.get("rsi_max") is not None:
+            passed = passed and rsi <= config["rsi_max"]
+        reference.append(passed)
+    return {
+        "rows": len(enriched),
+        "before_passed": sum(_baseline_hard_filters(config, enriched.iloc[i:i + 1]) for i in range(len(enriched))),
+        "after_passed": int(mask.sum()),
+        "mask_mismatches": int((mask != np.array(reference, dtype=bool)).sum()),
+        "live_mismatches": sum(strategy.apply_hard_filters("", enriched.iloc[:i + 1]) != mask[i]
+                               for i in range(len(enriched))),
+    }
+
+
+def _same(a, b, tol=1e-9) -> bool:
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_same(a[k], b[k], tol) for k in a)
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_same(x, y, tol) for x, y in zip(a, b))
+    if isinstance(a, (int, float, np.number)) and isinstance(b, (int, float, np.number)):
+        if np.isnan(a) and np.isnan(b):
+            return True
+        return abs(a - b) <= tol
+    return a == b
+
+
+def _breakdowns(scored: pd.DataFrame, config: dict, rows=None) -> list:
+    """Breakdowns the way callers get them: built on demand from the scored frame."""
+    return explain_entry_rows(scored, config, range(len(scored)) if rows is None else rows)
+
+
+def check_entry_score_parity(enriched: pd.DataFrame, config: dict, tol: float = 1e-9) -> dict:
+    """Compare calculate_entry_score against the per-row reference on one enriched frame."""
+    expected = rowwise_entry_score(enriched, config)
+    actual = calculate_entry_score(enriched, config)
+
+    score_diff = (expected["ENTRY_SCORE"].astype(float) - actual["ENTRY_SCORE"].astype(float)).abs()
+    breakdown_mismatch = [
+        i for i, (a, b) in enumerate(zip(expected["ENTRY_BREAKDOWN"], _breakdowns(actual, config)))
+        if not _same(a, b, tol)
+    ]
+    extra_mismatch = []
+    for col in ["volume_ratio", "breakout_ready"]:
+        if (col in expected.columns) != (col in actual.columns):
+            extra_mismatch.append(col)
+        elif col in expected.columns and not np.allclose(expected[col], actual[col], atol=tol, equal_nan=True):
+            extra_mismatch.append(col)
+
+    return {
+        "rows": len(enriched),
+        "max_score_diff": float(score_diff.max()) if len(score_diff) else 0.0,
+        "score_mismatches": int((score_diff > tol).sum()),
+        "breakdown_mismatches": len(breakdown_mismatch),
+        "extra_mismatches": extra_mismatch,
+    }
+
+
+def _max_column_diff(expected: pd.DataFrame, actual: pd.DataFrame, columns) -> dict:
+    diffs = {}
+    for col in columns:
+        a = expected[col].astype(float).to_numpy()
+        b = actual[col].astype(float).to_numpy()
+        nan_mismatch = np.isnan(a) != np.isnan(b)
+        delta = np.abs(np.where(np.isnan(a) | np.isnan(b), 0.0, a - b))
+        diffs[col] = np.inf if nan_mismatch.any() else float(delta.max(initial=0.0))
+    return diffs
+
+
+def check_incremental_parity(df: pd.DataFrame, config: dict, chunk: int = 37, tol: float = 1e-8) -> dict:
+    """
+    Compare the streaming IndicatorState against a full recompute: once replaying the
+    whole frame, and once appending it chunk by chunk through a JSON state round trip.
+    """
+    candles = df.set_index("date")
+    expected = enrich_with_indicators(df)
+    expected = calculate_entry_score(expected, config).set_index("date")
+
+    _, full = build_indicator_frame(candles, config)
+    split = max(len(candles) // 2, 1)
+    state, incremental = build_indicator_frame(candles.iloc[:split], config)
+    for start in range(split, len(candles), chunk):
+        state = IndicatorState.from_dict(state.to_dict())
+        incremental = append_candles(incremental, candles.iloc[start:start + chunk], state, config)
+
+    full_diff = _max_column_diff(expected, full, INDICATOR_COLUMNS + ["ENTRY_SCORE"])
+    append_diff = _max_column_diff(full, incremental, INDICATOR_COLUMNS + ["ENTRY_SCORE"])
+    return {
+        "rows": len(candles),
+        "full_max_diff": max(full_diff.values()),
+        "append_max_diff": max(append_diff.values()),
+        "bad_columns": sorted(c for c in full_diff if full_diff[c] > tol or append_diff[c] > tol),
+        "breakdown_mismatches": sum(
+            not _same(a, b, 1e-6) for a, b in zip(_breakdowns(expected, config), _breakdowns(incremental, config))
+        ),
+    }
+
+
+def _intraday_candles(days: int, seed: int, start: str = "2024-02-01") -> pd.DataFrame:
+    """Synthetic 15-minute candles (09:15-15:15, naive timestamps) over `days` business days."""
+    bars = pd.timedelta_range("09:15:00", "15:15:00", freq="15min")
+    dates = [day + bar for day in pd.bdate_range(start, periods=days) for bar in bars]
+    df = make_synthetic_ohlcv(len(dates), seed=seed)
+    df["date"] = pd.DatetimeIndex(dates)
+    return df
+
+
+def check_intraday_cache_parity(candles: pd.DataFrame, config: dict, cold_days: int = 8, tol: float = 1e-8) -> dict:
+    """
+    candle_cache_builder.merge_candles over day-by-day fetches (each overlapping
+    the last cached candle, as fetch_and_update requests them): rebuilds must
+    enrich exactly the trimmed window, as full enrichment of that window does,
+    and appends must match a rebuild over the same candles since the state began.
+    """
+    days = candles["date"].dt.normalize().unique()
+    columns = [c for c in INDICATOR_COLUMNS if c in required_columns(config)]
+
+    def diff(expected, actual):
+        scored = actual["ENTRY_SCORE"].notna()
+        diffs = _max_column_diff(expected, actual, columns)
+        diffs["ENTRY_SCORE"] = _max_column_diff(expected[scored.to_numpy()], actual[scored], ["ENTRY_SCORE"])["ENTRY_SCORE"]
+        return diffs
+
+    def baseline(cache):
+        window = cache[OHLCV_COLUMNS].reset_index()
+        return calculate_entry_score(enrich_with_indicators(window, config), config).set_index("date")
+
+    state, cache = merge_candles(pd.DataFrame(), candles[candles["date"] < days[cold_days]], None, config)
+    cold_diff = diff(baseline(cache), cache)
+
+    origin = cache.index[0]
+    for day in days[cold_days:]:
+        fetched = candles[(candles["date"] >= cache.index.max() - timedelta(minutes=15))
+                          & (candles["date"] < day + pd.Timedelta(days=1))]
+        state = IndicatorState.from_dict(state.to_dict())
+        state, cache = merge_candles(cache.reset_index(), fetched, state, config)
+    _, full = build_indicator_frame(candles[candles["date"] >= origin].set_index("date")[OHLCV_COLUMNS], config)
+    append_diff = diff(full.loc[cache.index], cache)
+
+    # State lost: the cache is rebuilt from its own window
+    _, rebuilt = merge_candles(cache.reset_index(), candles.iloc[-1:], None, config)
+    rebuild_diff = diff(baseline(rebuilt), rebuilt)
+
+    return {
+        "rows": len(cache),
+        "days": len(cache.index.normalize().unique()),
+        "bad_columns": {name: sorted(c for c in d if d[c] > tol)
+                        for name, d in {"cold": cold_diff, "append": append_diff, "rebuild": rebuild_diff}.items()
+                        if any(v > tol for v in d.values())},
+        "rebuild_rows": len(rebuilt),
+    }
+
+
+def check_selective_parity(df: pd.DataFrame, config: dict) -> dict:
+    """Config-driven enrichment must score exactly like full enrichment."""
+    expected = calculate_entry_score(enrich_with_indicators(df), config)
+    actual = calculate_entry_score(enrich_with_indicators(df, config), config)
+    columns = [c for c in required_columns(config) if c != "CANDLE_PATTERN"]
+    return {
+        "rows": len(df),
+        "missing_columns": [c for c in required_columns(config) if c not in actual.columns],
+        "column_diff": max(_max_column_diff(expected, actual, columns + ["ENTRY_SCORE"]).values()),
+        "breakdown_mismatches": sum(
+            not _same(a, b) for a, b in zip(_breakdowns(expected, config), _breakdowns(actual, config))
+        ),
+    }
+
+
+def check_selective_append_parity(df: pd.DataFrame, config: dict, chunk: int = 37, tol: float = 1e-8) -> dict:
+    """Appending to a config-driven (selectively enriched) frame must match enriching it whole."""
+    expected = calculate_entry_score(enrich_with_indicators(df, config), config).set_index("date")
+    candles = df.set_index("date")
+    split = max(len(candles) // 2, 1)
+    incremental = calculate_entry_score(enrich_with_indicators(df.iloc[:split], config), config).set_index("date")
+    state, _ = build_indicator_frame(candles.iloc[:split], config, tail_rows=1)
+    for start in range(split, len(candles), chunk):
+        state = IndicatorState.from_dict(state.to_dict())
+        incremental = append_candles(incremental, candles.iloc[start:start + chunk], state, config)
+
+    columns = [c for c in required_columns(config) if c != "CANDLE_PATTERN"]
+    diff = _max_column_diff(expected, incremental, columns + ["ENTRY_SCORE"])
+    return {
+        "rows": len(candles),
+        "extra_columns": sorted(set(incremental.columns) - set(expected.columns)),
+        "bad_columns": sorted(c for c in diff if diff[c] > tol),
+        "breakdown_mismatches": sum(
+            not _same(a, b, 1e-6) for a, b in zip(_breakdowns(expected, config), _breakdowns(incremental, config))
+        ),
+    }
+
+
+def check_kernel_parity(df: pd.DataFrame, tol: float = 1e-8) -> dict:
+    """NumPy kernels against the pandas_ta calls they replace (same TA-Lib/native path)."""
+    expected = enrich_with_indicators(df, use_kernels=False)
+    actual = enrich_with_indicators(df, use_kernels=True)
+    columns = [c for name in KERNEL_FUNCTIONS for c in INDICATORS[name]["columns"] if c in expected.columns]
+    diffs = _max_column_diff(expected, actual, columns)
+    return {
+        "rows": len(df),
+        "max_diff": max(diffs.values(), default=0.0),
+        "bad_columns": sorted(c for c, d in diffs.items() if d > tol),
+    }
+
+
+def check_tail_parity(enriched: pd.DataFrame, config: dict, tail_rows: int) -> dict:
+    """Tail-only scoring (and tail-only explanations) must match the full frame on the tail rows."""
+    expected = calculate_entry_score(enriched, config).iloc[-tail_rows:]
+    actual = calculate_entry_score(enriched, config, tail_rows=tail_rows).iloc[-tail_rows:]
+    extras = [c for c in ["volume_ratio", "breakout_ready"] if c in expected.columns]
+    return {
+        "rows": len(enriched),
+        "score_mismatches": int((~np.isclose(expected["ENTRY_SCORE"], actual["ENTRY_SCORE"])).sum()),
+        "breakdown_mismatches": sum(
+            not _same(a, b) for a, b in zip(
+                _breakdowns(enriched, config)[-tail_rows:],
+                _breakdowns(enriched, config, range(len(enriched) - len(expected), len(enriched)))
+            )
+        ),
+        "extra_diff": max(_max_column_diff(expected, actual, extras).values(), default=0.0),
+    }
+
+
+def _reweighted_config(config: dict, seed: int) -> dict:
+    """Copy of config with every entry weight scaled by a random factor."""
+    rng = np.random.default_rng(seed)
+    new = json.loads(json.dumps(config))
+    for parts in CONTRIBUTION_SPECS.values():
+        for _, path in parts:
+            if path is None:
+                continue
+            section = new
+            for key in path[:-1]:
+                section = section.get(key) or {}
+            if path[-1] in section:
+                section[path[-1]] = round(section[path[-1]] * float(rng.uniform(0.2, 3.0)), 2)
+    return new
+
+
+def check_reweight_parity(enriched: pd.DataFrame, config: dict, seed: int = 0) -> dict:
+    """Rescoring stored contributions with new weights must match a full rescore."""
+    new_config = _reweighted_config(config, seed)
+    stored = calculate_entry_score(enriched, config)
+    expected = calculate_entry_score(enriched, new_config)
+    scores, filter_weights, saturated = reweight_entry_score(stored, new_config)
+    weights = [
+        [("signal_blocked", 0)] if saturated[i] else
+        [(name, w[i].item()) for name, w in filter_weights.items() if not np.isnan(w[i])]
+        for i in range(len(stored))
+    ]
+    strip = lambda rows: [[(e["filter"], e["weight"]) for e in row] for row in rows]
+    return {
+        "rows": len(enriched),
+        "score_mismatches": int((np.abs(expected["ENTRY_SCORE"].to_numpy() - scores) > 1e-9).sum()),
+        "max_score_diff": float(np.abs(expected["ENTRY_SCORE"].to_numpy() - scores).max()) if len(scores) else 0.0,
+        "breakdown_mismatches": sum(
+            not _same(a, b) for a, b in zip(strip(_breakdowns(expected, new_config)), weights)
+        ),
+    }
+
+
+def check_compact_parity(enriched: pd.DataFrame, config: dict) -> dict:
+    """
+    Scoring the compact (float32) indicators must reproduce the float64 scores,
+    and breakdown_at on a compact scored frame the float64 breakdown's weights.
+    """
+    expected = calculate_entry_score(enriched, config)
+    actual = calculate_entry_score(compact_frame(enriched), config)
+    compact = compact_frame(expected)
+    strip = lambda row: [(e["filter"], e["weight"]) for e in row]
+    last_rows = range(max(len(expected) - 20, 0), len(expected))
+    diff = np.abs(expected["ENTRY_SCORE"].to_numpy() - actual["ENTRY_SCORE"].to_numpy())
+    return {
+        "rows": len(enriched),
+        "score_mismatches": int((diff > 1e-9).sum()),
+        "max_score_diff": float(diff.max()) if len(diff) else 0.0,
+        "breakdown_mismatches": sum(
+            not _same(strip(breakdown_at(expected, config, i)), strip(breakdown_at(compact, config, i)), 0.01 + 1e-9)
+            for i in last_rows
+        ),
+    }
+
+
+def check_panel_parity(frames: dict, config: dict, tol: float = 1e-8) -> dict:
+    """Universe panel enrichment + scoring against enrich_with_indicators_and_score per symbol."""
+    panel = enrich_universe_and_score(frames, config)
+    bad = {}
+    for symbol, df in frames.items():
+        expected = calculate_entry_score(enrich_with_indicators(df, config), config) if len(df) >= 15 \
+            else enrich_with_indicators(df, config)
+        actual = panel.get(symbol)
+        if actual is None or list(actual.columns) != list(expected.columns) or len(actual) != len(expected):
+            bad[symbol] = "shape"
+            continue
+        columns = [c for c in INDICATOR_COLUMNS + ["ENTRY_SCORE"] if c in expected.columns]
+        worst = max(_max_column_diff(expected, actual, columns).values(), default=0.0)
+        if worst > tol:
+            bad[symbol] = f"max diff {worst:.2e}"
+        elif "CANDLE_PATTERN" in expected.columns and not expected["CANDLE_PATTERN"].equals(actual["CANDLE_PATTERN"]):
+            bad[symbol] = "CANDLE_PATTERN"
+        elif "ENTRY_SCORE" in expected.columns and not all(
+            _same(a, b, 1e-6) for a, b in zip(_breakdowns(expected, config), _breakdowns(actual, config))
+        ):
+            bad[symbol] = "breakdowns"
+    return {"symbols": len(frames), "bad_symbols": bad}
+
+
+def reference_backtest(broker, config: dict, start_date: datetime, end_date: datetime, capital: float,
+                       minimum_entry_score: float, maximum_holding_days: int, capital_per_trade: float = None,
+                       max_positions: int = None, min_score_gap_to_replace: float = None) -> dict:
+    """
+    The event-driven engines' day loop: EntryService.get_suggestions and
+    ExitService.evaluate_exit_decision over a BacktestDataContext, with the
+    portfolio rules simulate() takes.
+    """
+    config = copy.deepcopy(config)  # evaluate_exit_decision escalates profit_target_pct in place
+    context = BacktestDataContext(broker, "all", config, start_date, end_date)
+    entry_service = EntryService(context, config, "all", "swing")
+    exit_service = ExitService(config=config, portfolio_db=None, data_provider=context)
+    lookback = timedelta(days=config.get("exit_lookback_days", 30))
+    open_positions, trades = {}, []
+
+    def close_position(symbol, price, reason, exit_date):
+        nonlocal capital
+        position = open_positions.pop(symbol)
+        capital += position["qty"] * price
+        trades.append((symbol, position["recorded_entry"], position["entry_price"], position["qty"],
+                       exit_date, float(price), reason))
+
+    current_date = start_date.replace(hour=9, minute=30)
+    for session in session_times(start_date, end_date):
+        current_date = current_date.replace(year=session.year, month=session.month, day=session.day)
+        context.set_date(current_date)
+        today = current_date.strftime("%Y-%m-%d")
+
+        for symbol in list(open_positions):
+            position = open_positions[symbol]
+            df = context.fetch_candles(symbol, interval="day", from_date=current_date - lookback, to_date=current_date)
+            if df is None or len(df) < 2:
+                continue
+            result = exit_service.evaluate_exit_decision(position, current_date=current_date, df=df)
+            if result["recommendation"] == "EXIT":
+                close_position(symbol, result["current_price"], result["exit_reason"], today)
+            elif (current_date - position["entry_date"]).days >= maximum_holding_days:
+                close_position(symbol, df["close"].iloc[-1], "forced_max_hold", today)
+
+        suggestions = entry_service.get_suggestions(as_of_date=current_date)
+        top_picks = sorted([s for s in suggestions if s.get("score", 0) >= minimum_entry_score],
+                           key=lambda x: x.get("score", 0), reverse=True)
+        for pick in top_picks:
+            symbol, score = pick["symbol"], pick["score"]
+            if symbol in open_positions:
+                continue
+            weakest = min(open_positions, key=lambda held: open_positions[held]["score"], default=None)
+            if (min_score_gap_to_replace is not None and weakest is not None
+                    and score - open_positions[weakest]["score"] >= min_score_gap_to_replace):
+                close_position(weakest, context.get_ltp(weakest), "rebalanced", today)
+            elif max_positions is not None and len(open_positions) >= max_positions:
+                continue
+            df = context.fetch_candles(symbol, interval="day", from_date=start_date, to_date=current_date,
+                                       columns=["close"])
+            if df is None or len(df) < 2:
+                continue
+            entry_price = float(df.iloc[-2]["close"])
+            qty = 1 if capital_per_trade is None else int(capital_per_trade // entry_price)
+            if qty == 0:
+                continue
+            capital -= qty * entry_price
+            open_positions[symbol] = {"symbol": symbol, "entry_date": current_date, "entry_price": entry_price,
+                                      "qty": qty, "score": score, "recorded_entry": df.index[-2].strftime("%Y-%m-%d")}
+
+    for symbol in list(open_positions):
+        close_position(symbol, context.get_ltp(symbol), "Forced exit at end", end_date.strftime("%Y-%m-%d"))
+    return {"trades": trades, "capital": capital}
+
+
+def check_signal_engine_parity(broker, config: dict, start_date: datetime, end_date: datetime, params: dict) -> dict:
+    """Signal-matrix engine against reference_backtest on the same universe, config and portfolio rules."""
+    expected = reference_backtest(broker, config, start_date, end_date, **params)
+    frames = build_candle_cache(broker, broker.get_symbols("all"), config,
+                                start_date - timedelta(days=config.get("lookback_days", 180)), end_date)
+    matrices = build_signal_matrices(frames, config, get_strategy("swing", config), session_times(start_date, end_date),
+                                     start_date, config.get("exit_lookback_days", 30))
+    result = simulate(matrices, copy.deepcopy(config), **params)
+    actual = [(t["symbol"], t["entry_date"], t["entry_price"], t["qty"], t["exit_date"], float(t["exit_price"]),
+               t["reason"]) for t in result["trades"]]
+    key = lambda trade: (trade[4], trade[0], trade[1])
+    mismatches = [(e, a) for e, a in zip(sorted(expected["trades"], key=key), sorted(actual, key=key))
+                  if e[:2] + e[3:5] + e[6:] != a[:2] + a[3:5] + a[6:] or abs(e[2] - a[2]) > 1e-9 or abs(e[5] - a[5]) > 1e-9]
+    return {
+        "trades": len(expected["trades"]),
+        "signal_trades": len(actual),
+        "mismatches": mismatches[:5],
+        "capital_diff": abs(expected["capital"] - result["capital"]),
+    }
+
+
+def check_candidate_index_parity(broker, config: dict, store_root: Path, split_date: str,
+                                 start_date: datetime, end_date: datetime) -> dict:
+    """
+    Candidate bitmap over an archive that grows after split_date: the
+    incrementally updated index against a rebuilt one, and candidate-only
+    EntryService scans against full scans on the same data.
+    """
+    symbols = [item["symbol"] for item in broker.get_symbols("all")]
+    frames = {symbol: broker.fetch_candles(symbol).reset_index() for symbol in symbols}
+    grown = symbols[::2]  # these get the candles after split_date; the rest stop there
+    store = OhlcvStore(root=store_root)
+    store.write({symbol: df[df["date"] <= split_date] for symbol, df in frames.items() if symbol != symbols[-1]})
+
+    index = CandidateIndex(store, config)
+    initial = index.update()
+    store.write({symbol: frames[symbol] for symbol in grown + [symbols[-1]]})
+    recomputed = CandidateIndex(store, config).update()
+    unchanged = CandidateIndex(store, config).update()
+    incremental = CandidateIndex(store, config)
+    fresh = CandidateIndex(store, config)
+    fresh.rebuild()
+    refingerprinted = CandidateIndex(store, dict(config, min_atr_pct=config.get("min_atr_pct", 0) + 0.1)).update()
+
+    # Scans: complete the archive so the index and the broker serve the same candles
+    store.write({symbol: frames[symbol] for symbol in symbols if symbol not in grown})
+    candidates = CandidateIndex(store, config)
+    candidates.update()
+    full = BacktestDataContext(broker, "all", config, start_date, end_date)
+    narrowed = BacktestDataContext(broker, "all", config, start_date, end_date, candidate_index=candidates)
+    full_service = EntryService(full, config, "all", "swing")
+    narrowed_service = EntryService(narrowed, config, "all", "swing")
+    days = mismatched = scanned = 0
+    for session in session_times(start_date, end_date):
+        full.set_date(session)
+        narrowed.set_date(session)
+        expected = [(s["symbol"], s["score"]) for s in full_service.get_suggestions(as_of_date=session)]
+        actual = [(s["symbol"], s["score"]) for s in narrowed_service.get_suggestions(as_of_date=session)]
+        scanned += len(narrowed.as_of_frames(session, candidates_only=True))
+        mismatched += expected != actual
+        days += 1
+
+    return {
+        "initial": initial,
+        "recomputed": recomputed,
+        "expected_recomputed": len(grown) + 1,
+        "unchanged": unchanged,
+        "refingerprinted": refingerprinted,
+        "symbols": len(symbols),
+        "bitmap_equal": (np.array_equal(incremental.dates, fresh.dates) and incremental.symbols == fresh.symbols
+                         and np.array_equal(incremental.bits, fresh.bits)),
+        "days": days,
+        "mismatched_days": mismatched,
+        "loaded": len(narrowed.frames),
+        "scanned_share": scanned / (days * len(full.frames)) if days and full.frames else 0.0,
+    }
+
+
+def check_sweep_parity(frames: dict, config: dict, runs: list, start_date: datetime, end_date: datetime,
+                       workers: int = 2) -> dict:
+    """Pooled sweep over the shared-store universe against each run simulated serially from scratch."""
+    table = run_sweep(frames, config, runs, start_date, end_date, "portfolio", workers)
+    mismatches = []
+    for run_id, params in enumerate(runs):
+        run_config, backtest_config, _ = apply_params(config, params)
+        matrices = build_signal_matrices(frames, run_config, get_strategy("swing", run_config),
+                                         session_times(start_date, end_date), start_date,
+                                         run_config.get("exit_lookback_days", 30))
+        expected = summarize(simulate(matrices, run_config, **backtest_params("portfolio", backtest_config)),
+                             backtest_config["capital"])
+        row = table.iloc[run_id]
+        if any(abs(row[key] - value) > 1e-6 for key, value in expected.items()):
+            mismatches.append((params, expected, row.to_dict()))
+    return {"runs": len(table), "mismatches": mismatches[:3], "runs_per_minute": table.attrs["runs_per_minute"]}
+
+
+def _trade_keys(result: dict) -> list:
+    return [(t["symbol"], t["entry_date"], t["exit_date"], t["qty"], round(t["pnl"], 6), t["reason"])
+            for t in result["trades"]]
+
+
+def check_walk_forward_parity(frames: dict, config: dict, start_date: datetime, end_date: datetime,
+                              settings: dict, seed: int = 0) -> dict:
+    """
+    The walk-forward fast paths against rebuilt matrices: entries rescored from
+    the contribution matrices vs matrices built from rescored frames, a session
+    slice vs a backtest started on its first session, and the pooled windows'
+    test metrics vs serial re-evaluation of the chosen weights.
+    """
+    params = backtest_params("portfolio")
+    sessions = session_times(start_date, end_date)
+    strategy = get_strategy("swing", config)
+    lookback = config.get("exit_lookback_days", 30)
+    matrices = build_signal_matrices(frames, config, strategy, sessions, start_date, lookback,
+                                     entry_contributions=True)
+
+    new_config = _reweighted_config(config, seed)
+    new_config["exit_filters"]["macd_exit_filter"]["weight"] = 6
+    rescored = {symbol: calculate_entry_score(df.reset_index(), new_config).set_index("date")
+                for symbol, df in frames.items()}
+    expected = build_signal_matrices(rescored, new_config, get_strategy("swing", new_config), sessions, start_date,
+                                     lookback)
+    actual = reweight_entry_signals(reweight_exit_signals(matrices, new_config), new_config)
+    reweight_trades = (_trade_keys(simulate(expected, copy.deepcopy(new_config), **params)),
+                       _trade_keys(simulate(actual, copy.deepcopy(new_config), **params)))
+
+    slice_mismatches = 0
+    for lo, hi in [(0, len(sessions) // 2), (len(sessions) // 3, len(sessions))]:
+        fresh = build_signal_matrices(frames, config, strategy, sessions[lo:hi],
+                                      sessions[lo].normalize().to_pydatetime(), lookback)
+        sliced = simulate(slice_sessions(matrices, lo, hi), copy.deepcopy(config), **params)
+        slice_mismatches += _trade_keys(simulate(fresh, copy.deepcopy(config), **params)) != _trade_keys(sliced)
+
+    trajectory, equity = run_walk_forward(frames, config, start_date, end_date, settings, workers=2)
+    test_mismatches = 0
+    for _, row in trajectory.iterrows():
+        lo, hi = sessions.strftime("%Y-%m-%d").get_indexer([row["test_start"], row["test_end"]])
+        weights = {path: row[path] for path in trajectory.columns if path.startswith(("entry_filters.", "exit_filters."))}
+        serial = evaluate(slice_sessions(matrices, lo, hi + 1), config, weights, "portfolio", BACKTEST_CONFIG)
+        test_mismatches += any(abs(row[f"test_{key}"] - value) > 1e-6 for key, value in serial.items() if key != "equity")
+    return {
+        "reweight_trades": len(reweight_trades[0]),
+        "reweight_equal": reweight_trades[0] == reweight_trades[1],
+        "picks_equal": bool((expected["picks"] == actual["picks"]).all()),
+        "slice_mismatches": slice_mismatches,
+        "windows": len(trajectory),
+        "test_mismatches": test_mismatches,
+        "oos_sessions": len(equity),
+        "test_sessions": int(sum(len(sessions[(sessions.strftime("%Y-%m-%d") >= r["test_start"])
+                                              & (sessions.strftime("%Y-%m-%d") <= r["test_end"])])
+                                 for _, r in trajectory.iterrows())),
+    }
+
+
+def check_exit_replay_parity(frames: dict, config: dict, start_date: datetime, end_date: datetime,
+                             params: dict, folder: Path) -> dict:
+    """
+    The signal engine's trades replayed as a fixed entry ledger, from its own
+    trade dicts, a trades.csv and a diagnostic_report.csv, must exit exactly
+    as they did in the full simulation.
+    """
+    matrices = build_signal_matrices(frames, config, get_strategy("swing", config),
+                                     session_times(start_date, end_date), start_date,
+                                     config.get("exit_lookback_days", 30))
+    expected = simulate(matrices, copy.deepcopy(config), **params)["trades"]
+    key = lambda t: (t["symbol"], t["entry_date"], t["exit_date"], round(float(t["exit_price"]), 6), t["reason"])
+
+    trades_csv, diagnostics_csv = folder / "trades.csv", folder / "diagnostic_report.csv"
+    pd.DataFrame(expected)[["symbol", "entry_date", "entry_price", "investment", "exit_date", "exit_price",
+                            "pnl"]].to_csv(trades_csv, index=False)
+    diagnostics = pd.DataFrame({
+        "symbol": [t["symbol"] for t in expected],
+        "entry_date": [str(matrices["sessions"][matrices["session_days"] == t["day"]][0]) for t in expected],
+        "entry_price": [t["entry_price"] for t in expected],
+        "score": [t["score"] for t in expected],
+        "exit_time": [t["exit_date"] for t in expected],
+    })
+    diagnostics.to_csv(diagnostics_csv, index=False)
+
+    ledgers = {"trades": pd.DataFrame(expected), "trades.csv": trades_csv, "diagnostic_report.csv": diagnostics_csv}
+    mismatches, unmatched = {}, {}
+    for name, source in ledgers.items():
+        positions, unmatched[name] = ledger_positions(matrices, load_ledger(source))
+        replayed = replay_exits(matrices, positions, copy.deepcopy(config), params["maximum_holding_days"])
+        mismatches[name] = len(set(map(key, expected)) ^ set(map(key, replayed)))
+
+    runs = expand_spec(EXIT_REPLAY_SPEC)
+    started = datetime.now()
+    table = compare_exit_configs(frames, load_ledger(trades_csv), config, runs, start_date, end_date, "quality")
+    seconds = (datetime.now() - started).total_seconds()
+    return {
+        "trades": len(expected),
+        "mismatches": mismatches,
+        "unmatched": {name: len(rows) for name, rows in unmatched.items()},
+        "configs": len(table),
+        "configs_per_second": len(table) / seconds if seconds else float("inf"),
+        "distinct_outcomes": table["total_pnl"].round(6).nunique(),
+    }
+
+
+def _archive_frames(limit: int):
+    store = OhlcvStore(interval="1d")
+    for symbol in sorted(store.symbols())[:limit]:
+        yield symbol, store.read(symbol, columns=["open", "high", "low", "close", "volume"])
+
+
+def _edge_case_configs(config: dict) -> dict:
+    """
+    Configs hitting calculate_score's bug-fixed paths: entry filters missing
+    from the config, rsi/macd filters disabled while the late-entry penalty
+    still reads them, and weights high enough to trip signal saturation.
+    """
+    disabled = copy.deepcopy(config)
+    for name in ["rsi", "macd"]:
+        disabled["entry_filters"][name]["enabled"] = False
+    saturating = copy.deepcopy(config)
+    for fcfg in saturating["entry_filters"].values():
+        if "weight" in fcfg:
+            fcfg["weight"] *= 10
+    return {"missing filters": _trimmed_config(config), "rsi/macd disabled": disabled, "saturating": saturating}
+
+
+def run_entry_score_parity(config: dict, archive_limit: int = 0) -> bool:
+    frames = [(f"synthetic-{seed}-{rows}", make_synthetic_ohlcv(rows, seed=seed))
+              for seed in SYNTHETIC_SEEDS for rows in SYNTHETIC_ROWS]
+    if archive_limit:
+        frames += list(_archive_frames(archive_limit))
+
+    ok = True
+    for name, df in frames:
+        result = check_entry_score_parity(enrich_with_indicators(df), config)
+        passed = not (result["score_mismatches"] or result["breakdown_mismatches"] or result["extra_mismatches"])
+        ok &= passed
+        if not passed:
+            print(f"❌ [ENTRY_SCORE] {name}: {result}")
+    print(f"{'✅' if ok else '❌'} [ENTRY_SCORE] parity over {len(frames)} frames")
+
+    edge_frames = [(name, enrich_with_indicators(df)) for name, df in frames[:15]]
+    for config_name, edge_config in _edge_case_configs(config).items():
+        blocked = 0
+        for name, enriched in edge_frames:
+            result = check_entry_score_parity(enriched, edge_config)
+            passed = not (result["score_mismatches"] or result["breakdown_mismatches"] or result["extra_mismatches"])
+            ok &= passed
+            if not passed:
+                print(f"❌ [ENTRY_SCORE] {config_name} {name}: {result}")
+            blocked += sum(any(b["filter"] == "signal_blocked" for b in breakdown)
+                           for breakdown in _breakdowns(calculate_entry_score(enriched, edge_config), edge_config))
+        print(f"{'✅' if ok else '❌'} [ENTRY_SCORE] {config_name}: parity over {len(edge_frames)} frames "
+              f"({blocked} saturated rows)")
+    return ok
+
+
+def run_incremental_parity(config: dict, archive_limit: int = 0) -> bool:
+    frames = [(f"synthetic-{seed}-{rows}", make_synthetic_ohlcv(rows, seed=seed))
+              for seed in SYNTHETIC_SEEDS for rows in SYNTHETIC_ROWS if rows >= 15]
+    if archive_limit:
+        frames += list(_archive_frames(archive_limit))
+
+    ok = True
+    for name, df in frames:
+        result = check_incremental_parity(df, config)
+        passed = not (result["bad_columns"] or result["breakdown_mismatches"])
+        ok &= passed
+        if not passed:
+            print(f"❌ [INCREMENTAL] {name}: {result}")
+    print(f"{'✅' if ok else '❌'} [INCREMENTAL] parity over {len(frames)} frames")
+    return ok
+
+
+def run_intraday_cache_parity(config: dict, seeds: int = 5, days: int = 15) -> bool:
+    ok = True
+    for seed in SYNTHETIC_SEEDS[:seeds]:
+        result = check_intraday_cache_parity(_intraday_candles(days, seed), config)
+        passed = not result["bad_columns"] and result["rows"] == result["rebuild_rows"]
+        ok &= passed
+        if not passed:
+            print(f"❌ [INTRADAY_CACHE] seed {seed}: {result}")
+    print(f"{'✅' if ok else '❌'} [INTRADAY_CACHE] rebuild vs append parity over {seeds} symbols x {days} days")
+    return ok
+
+
+def run_kernel_parity(archive_limit: int = 0) -> bool:
+    frames = [(f"synthetic-{seed}-{rows}", make_synthetic_ohlcv(rows, seed=seed))
+              for seed in SYNTHETIC_SEEDS for rows in SYNTHETIC_ROWS]
+    if archive_limit:
+        frames += list(_archive_frames(archive_limit))
+
+    ok = True
+    worst = 0.0
+    for name, df in frames:
+        result = check_kernel_parity(df)
+        worst = max(worst, result["max_diff"])
+        ok &= not result["bad_columns"]
+        if result["bad_columns"]:
+            print(f"❌ [KERNELS] {name}: {result}")
+    print(f"{'✅' if ok else '❌'} [KERNELS] parity over {len(frames)} frames (max diff {worst:.2e})")
+    return ok
+
+
+def run_reweight_parity(config: dict, archive_limit: int = 0) -> bool:
+    frames = [(f"synthetic-{seed}-{rows}", make_synthetic_ohlcv(rows, seed=seed))
+              for seed in SYNTHETIC_SEEDS for rows in SYNTHETIC_ROWS]
+    if archive_limit:
+        frames += list(_archive_frames(archive_limit))
+
+    ok = True
+    rows = flips = 0
+    for i, (name, df) in enumerate(frames):
+        result = check_reweight_parity(enrich_with_indicators(df), config, seed=i)
+        rows += result["rows"]
+        flips += result["score_mismatches"]
+        # float32 signals can flip a round2() at an exact half-cent; anything larger is a bug
+        passed = result["max_score_diff"] <= 0.01 * len(CONTRIBUTION_SPECS)
+        ok &= passed
+        if not passed:
+            print(f"❌ [REWEIGHT] {name}: {result}")
+    print(f"{'✅' if ok else '❌'} [REWEIGHT] parity over {len(frames)} frames ({flips}/{rows} rows off by rounding)")
+    return ok
+
+
+def run_compact_parity(config: dict, archive_limit: int = 0) -> bool:
+    frames = [(f"synthetic-{seed}-{rows}", make_synthetic_ohlcv(rows, seed=seed))
+              for seed in SYNTHETIC_SEEDS for rows in SYNTHETIC_ROWS]
+    if archive_limit:
+        frames += list(_archive_frames(archive_limit))
+
+    ok = True
+    rows = flips = 0
+    for name, df in frames:
+        result = check_compact_parity(enrich_with_indicators(df), config)
+        rows += result["rows"]
+        flips += result["score_mismatches"]
+        # A float32 indicator can land on the other side of a threshold or a round2() half-cent;
+        # breakdown weights are recomputed from the float32 indicators, so they may differ by one cent
+        passed = result["max_score_diff"] <= 0.01 * len(CONTRIBUTION_SPECS) and not result["breakdown_mismatches"]
+        ok &= passed
+        if not passed:
+            print(f"❌ [COMPACT] {name}: {result}")
+    print(f"{'✅' if ok else '❌'} [COMPACT] parity over {len(frames)} frames ({flips}/{rows} rows off by float32 rounding)")
+    return ok
+
+
+def run_tail_parity(config: dict, archive_limit: int = 0) -> bool:
+    frames = [(f"synthetic-{seed}-{rows}", make_synthetic_ohlcv(rows, seed=seed))
+              for seed in SYNTHETIC_SEEDS for rows in SYNTHETIC_ROWS]
+    if archive_limit:
+        frames += list(_archive_frames(archive_limit))
+
+    ok = True
+    for name, df in frames:
+        enriched = enrich_with_indicators(df)
+        for tail_rows in (1, 5):
+            result = check_tail_parity(enriched, config, tail_rows)
+            passed = not (result["score_mismatches"] or result["breakdown_mismatches"] or result["extra_diff"])
+            ok &= passed
+            if not passed:
+                print(f"❌ [TAIL] {name} tail={tail_rows}: {result}")
+    print(f"{'✅' if ok else '❌'} [TAIL] parity over {len(frames)} frames")
+    return ok
+
+
+def _ragged_universe(size: int = 12, rows: int = 300) -> dict:
+    """Synthetic universe with late listings, dropped sessions and one too-short symbol."""
+    rng = np.random.default_rng(0)
+    frames = {}
+    for seed in range(size):
+        df = make_synthetic_ohlcv(rows, seed=seed)
+        if seed % 3 == 1:
+            df = df.iloc[int(rng.integers(20, rows // 2)):]
+        if seed % 3 == 2:
+            df = df.drop(df.index[rng.choice(len(df), size=15, replace=False)])
+        frames[f"synthetic-{seed}"] = df.reset_index(drop=True)
+    frames["synthetic-short"] = make_synthetic_ohlcv(10, seed=99)
+    return frames
+
+
+def run_panel_parity(configs: dict, archive_limit: int = 0) -> bool:
+    universes = {"synthetic": _ragged_universe()}
+    if archive_limit:
+        universes["archive"] = dict(_archive_frames(archive_limit))
+
+    ok = True
+    for config_name, config in configs.items():
+        for name, frames in universes.items():
+            result = check_panel_parity(frames, config)
+            ok &= not result["bad_symbols"]
+            if result["bad_symbols"]:
+                print(f"❌ [PANEL] {config_name} {name}: {result}")
+    print(f"{'✅' if ok else '❌'} [PANEL] parity over {len(universes)} universes x {len(configs)} configs")
+    return ok
+
+
+def _trimmed_config(config: dict) -> dict:
+    """Only a handful of entry filters and no exit filters enabled."""
+    trimmed = dict(config)
+    keep = {"adx", "rsi", "macd", "volume_surge"}
+    trimmed["entry_filters"] = {k: v for k, v in config["entry_filters"].items() if k in keep}
+    trimmed["exit_filters"] = {}
+    return trimmed
+
+
+def run_selective_parity(configs: dict, archive_limit: int = 0) -> bool:
+    frames = [(f"synthetic-{seed}-{rows}", make_synthetic_ohlcv(rows, seed=seed))
+              for seed in SYNTHETIC_SEEDS[:5] for rows in SYNTHETIC_ROWS if rows >= 15]
+    if archive_limit:
+        frames += list(_archive_frames(archive_limit))
+
+    ok = True
+    for config_name, config in configs.items():
+        for name, df in frames:
+            result = check_selective_parity(df, config)
+            passed = not (result["missing_columns"] or result["column_diff"] or result["breakdown_mismatches"])
+            ok &= passed
+            if not passed:
+                print(f"❌ [SELECTIVE] {config_name} {name}: {result}")
+            result = check_selective_append_parity(df, config)
+            passed = not (result["extra_columns"] or result["bad_columns"] or result["breakdown_mismatches"])
+            ok &= passed
+            if not passed:
+                print(f"❌ [SELECTIVE] {config_name} {name} (append): {result}")
+    print(f"{'✅' if ok else '❌'} [SELECTIVE] parity (full + append) over {len(frames)} frames x {len(configs)} configs")
+    return ok
+
+
+def _collapse_config(config: dict) -> dict:
+    """Copy of config with ExitService's score-collapse exit enabled."""
+    return dict(config, core_filter_loss_exit={"enabled": True, "min_hold_days": 4, "score_drop_pct": 60,
+                                               "core_filters": ["adx", "macd"], "swing_lookback": 3})
+
+
+def run_signal_engine_parity(config: dict, symbols: int = 20) -> bool:
+    # Exits must see the same indicator history in both engines (see signal_engine)
+    config = dict(config, exit_lookback_days=10_000)
+    broker = SyntheticBroker(symbols, start="2021-01-01", end="2022-12-31")
+    start_date = datetime(2022, 1, 3, tzinfo=ZoneInfo("Asia/Kolkata"))
+    end_date = datetime(2022, 6, 30, tzinfo=ZoneInfo("Asia/Kolkata"))
+    quality = dict(capital=100000, minimum_entry_score=1.9, maximum_holding_days=15)
+    modes = {
+        "quality": (config, quality),
+        "portfolio": (config, dict(quality, capital_per_trade=20000, max_positions=2, min_score_gap_to_replace=0.2)),
+        # The shipped configs leave score collapse off
+        "score collapse": (_collapse_config(config), quality),
+    }
+
+    ok = True
+    for name, (mode_config, params) in modes.items():
+        result = check_signal_engine_parity(broker, mode_config, start_date, end_date, params)
+        passed = (not result["mismatches"] and result["trades"] == result["signal_trades"]
+                  and result["capital_diff"] < 1e-6)
+        ok &= passed
+        if not passed:
+            print(f"❌ [SIGNAL_ENGINE] {name}: {result}")
+    print(f"{'✅' if ok else '❌'} [SIGNAL_ENGINE] parity over {len(modes)} portfolio modes")
+    return ok
+
+
+def run_hard_filter_change(config: dict, archive_limit: int = 0) -> bool:
+    """Not a parity check: reports the swing hard-filter behaviour change and checks the new mask."""
+    frames = [(f"synthetic-{seed}-{rows}", make_synthetic_ohlcv(rows, seed=seed))
+              for seed in SYNTHETIC_SEEDS[:5] for rows in SYNTHETIC_ROWS]
+    if archive_limit:
+        frames += list(_archive_frames(archive_limit))
+    configs = {"swing": config, "rsi band": dict(config, rsi_min=40, rsi_max=70)}
+
+    ok = True
+    for config_name, cfg in configs.items():
+        rows = before = after = 0
+        for name, df in frames:
+            result = check_hard_filter_change(enrich_with_indicators(df), cfg)
+            rows, before, after = rows + result["rows"], before + result["before_passed"], after + result["after_passed"]
+            passed = not (result["mask_mismatches"] or result["live_mismatches"])
+            ok &= passed
+            if not passed:
+                print(f"❌ [HARD_FILTERS] {config_name} {name}: {result}")
+        print(f"{'✅' if ok else '❌'} [HARD_FILTERS] {config_name}: rows passing {before}/{rows} before, "
+              f"{after}/{rows} after (mask == per-row rules over {len(frames)} frames)")
+    return ok
+
+
+def run_candidate_index_parity(config: dict, symbols: int = 30) -> bool:
+    # A hard prefilter (not the soft default) so both halves of the bitmap reject rows
+    configs = {"swing": config, "hard prefilter": dict(config, enable_soft_prefilter=False, min_atr_pct=2.6,
+                                                       max_price=900)}
+    broker = SyntheticBroker(symbols, start="2021-01-01", end="2022-06-30")
+    start_date = datetime(2022, 4, 1, tzinfo=ZoneInfo("Asia/Kolkata"))
+    end_date = datetime(2022, 6, 30, tzinfo=ZoneInfo("Asia/Kolkata"))
+
+    ok = True
+    shares = []
+    for name, cfg in configs.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            result = check_candidate_index_parity(broker, cfg, Path(tmp), "2022-03-31", start_date, end_date)
+        passed = (result["initial"] == result["symbols"] - 1 and result["recomputed"] == result["expected_recomputed"]
+                  and result["unchanged"] == 0 and result["refingerprinted"] == result["symbols"]
+                  and result["bitmap_equal"] and result["mismatched_days"] == 0)
+        ok &= passed
+        shares.append(f"{name} {result['scanned_share']:.0%}")
+        if not passed:
+            print(f"❌ [CANDIDATES] {name}: {result}")
+    print(f"{'✅' if ok else '❌'} [CANDIDATES] parity over {len(configs)} configs (symbols scanned: {', '.join(shares)})")
+    return ok
+
+
+def run_sweep_parity(config: dict, symbols: int = 20) -> bool:
+    broker = SyntheticBroker(symbols, start="2021-01-01", end="2022-06-30")
+    start_date = datetime(2022, 1, 3, tzinfo=ZoneInfo("Asia/Kolkata"))
+    end_date = datetime(2022, 6, 30, tzinfo=ZoneInfo("Asia/Kolkata"))
+    frames = build_candle_cache(broker, broker.get_symbols("all"), config,
+                                start_date - timedelta(days=config.get("lookback_days", 180)), end_date)
+    # One run per way a parameter reaches the simulation: backtest key, exit stack, reweight, rebuild
+    runs = [
+        {},
+        {"minimum_entry_score": 2.3, "max_trades_per_day": 3},
+        {"stop_loss_exit.stop_loss_pct": 0.03, "profit_target_exit.profit_target_pct": 0.04},
+        {"exit_filters.macd_exit_filter.weight": 6, "exit_filters.rsi_drop_filter.weight": 1},
+        {"trailing_stop.atr_multiplier": 2, "dynamic_threshold.min_threshold": 4},
+    ]
+    result = check_sweep_parity(frames, config, runs, start_date, end_date)
+    ok = not result["mismatches"] and result["runs"] == len(runs)
+    if not ok:
+        print(f"❌ [SWEEP] {result}")
+    print(f"{'✅' if ok else '❌'} [SWEEP] parity over {len(runs)} runs ({result['runs_per_minute']:.0f} runs/min)")
+    return ok
+
+
+def run_walk_forward_parity(config: dict, symbols: int = 20) -> bool:
+    broker = SyntheticBroker(symbols, start="2021-01-01", end="2022-06-30")
+    start_date = datetime(2022, 1, 3, tzinfo=ZoneInfo("Asia/Kolkata"))
+    end_date = datetime(2022, 6, 30, tzinfo=ZoneInfo("Asia/Kolkata"))
+    frames = build_candle_cache(broker, broker.get_symbols("all"), config,
+                                start_date - timedelta(days=config.get("lookback_days", 180)), end_date)
+    settings = dict(WALK_FORWARD_CONFIG, train_days=60, test_days=20, search="random", random_runs=4, min_trades=1)
+    result = check_walk_forward_parity(frames, config, start_date, end_date, settings)
+    ok = (result["reweight_equal"] and result["picks_equal"] and result["slice_mismatches"] == 0
+          and result["windows"] > 0 and result["test_mismatches"] == 0
+          and result["oos_sessions"] == result["test_sessions"])
+    if not ok:
+        print(f"❌ [WALK_FORWARD] {result}")
+    print(f"{'✅' if ok else '❌'} [WALK_FORWARD] parity over {result['windows']} windows "
+          f"({result['reweight_trades']} reweighted trades)")
+    return ok
+
+
+def run_exit_replay_parity(config: dict, symbols: int = 20) -> bool:
+    broker = SyntheticBroker(symbols, start="2021-01-01", end="2022-06-30")
+    start_date = datetime(2022, 1, 3, tzinfo=ZoneInfo("Asia/Kolkata"))
+    end_date = datetime(2022, 6, 30, tzinfo=ZoneInfo("Asia/Kolkata"))
+    frames = build_candle_cache(broker, broker.get_symbols("all"), config,
+                                start_date - timedelta(days=config.get("lookback_days", 180)), end_date)
+    # Quality rules: no rebalancing, so every recorded position exits through the stack
+    ok = True
+    for name, replay_config in {"swing": config, "score collapse": _collapse_config(config)}.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            result = check_exit_replay_parity(frames, replay_config, start_date, end_date, backtest_params("quality"),
+                                              Path(tmp))
+        passed = (result["trades"] > 0 and not any(result["mismatches"].values())
+                  and not any(result["unmatched"].values()) and result["distinct_outcomes"] > 1)
+        ok &= passed
+        if not passed:
+            print(f"❌ [EXIT_REPLAY] {name}: {result}")
+    print(f"{'✅' if ok else '❌'} [EXIT_REPLAY] parity over {result['trades']} trades x {len(result['mismatches'])} "
+          f"ledger formats x 2 configs ({result['configs']} exit configs at {result['configs_per_second']:.1f}/s)")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parity checks for optimized scoring/indicator paths")
+    parser.add_argument("--archive", type=int, default=0, help="Also check the first N archived symbols")
+    args = parser.parse_args()
+
+    config = load_filters("swing")
+    results = [
+        run_entry_score_parity(config, args.archive),
+        run_incremental_parity(load_filters("intraday"), args.archive),
+        run_intraday_cache_parity(load_filters("intraday")),
+        run_kernel_parity(args.archive),
+        run_selective_parity({"swing": config, "intraday": load_filters("intraday"), "trimmed": _trimmed_config(config)}, args.archive),
+        run_tail_parity(config, args.archive),
+        run_reweight_parity(config, args.archive),
+        run_compact_parity(config, args.archive),
+        run_panel_parity({"swing": config, "trimmed": _trimmed_config(config),
+                          "kernels": dict(config, use_indicator_kernels=True)}, args.archive),
+        run_hard_filter_change(config, args.archive),
+        run_signal_engine_parity(config),
+        run_candidate_index_parity(config),
+        run_sweep_parity(config),
+        run_walk_forward_parity(config),
+        run_exit_replay_parity(config),
+    ]
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,384 @@
+"""
+Vectorized signal-matrix backtest engine.
+
+Instead of re-running EntryService.get_suggestions over the universe and
+ExitService.evaluate_exit_decision per position on every simulated day, the
+universe is enriched and scored once and laid out as (sessions x symbols)
+matrices, each row an as-of view of the candles on or before that session:
+- entry side: the ranked suggestion list per session (candidate mask from
+  evaluate_symbol's prefilter + the strategy's hard filters, ordered by
+  EntryService.tie_breaker, capped at SUGGESTION_LIMIT) and the entry price
+  (the previous candle's close)
+- exit side: close/ATR/MACD/ENTRY_SCORE and the exit_signals columns
+
+The portfolio is then simulated in a plain loop over those arrays (capital,
+max positions, min-score-gap rebalancing, max hold days) with
+exit_signals.ExitStack deciding exits, the same stack and order as
+ExitService.evaluate_exit_decision.
+
+Modes:
+- portfolio: engine.py's rules (capital_per_trade sizing, max_trades_per_day
+  open positions, min_score_gap_to_replace rebalancing)
+- quality: engine_filters_quality_analysis.py's rules (1 share per pick, no
+  position cap, no rebalancing)
+
+Both exit through the ExitService stack plus maximum_holding_days; engine.py's
+own stop_loss_threshold (on the day's low, filled at the stop price) and
+profit_target checks are not modelled. Exits read the same full-history
+indicators as entries; the event-driven engines re-enrich only the last
+exit_lookback_days of candles, so set that to cover the run's lookback when
+comparing the two.
+
+Run from the repo root:
+    python backend/backtesting/signal_engine.py [--mode portfolio|quality]
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Ensure the root directory is in sys.path for module imports
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+import numpy as np
+import pandas as pd
+from brokers.mock.mock_broker import MockBroker
+from backtesting.trade_recorder import TradeRecorder
+from backtesting.backtest_config import BACKTEST_CONFIG
+from config.filters_setup import load_filters
+from services.panel_enrichment import build_candle_cache
+from services.strategies.strategy_factory import get_strategy
+from services.entry_candidates import SUGGESTION_LIMIT, candidate_mask, ranking_keys
+from services.entry_score_engine import CONTRIB_DTYPE, reweight_contributions
+from services.exit_signals import (
+    ExitStack, exit_signal_columns, exit_filter_hits, combine_exit_hits
+)
+from util.trading_calendar import get_trading_calendar
+from config.logging_config import get_loggers
+
+logger, trade_logger = get_loggers()
+
+MARKET_TZ = "Asia/Kolkata"
+SESSION_CHECK_TIME = timedelta(hours=9, minutes=30)
+VALUE_COLUMNS = ["close", "ATR", "MACD", "ENTRY_SCORE"]
+
+
+def session_times(start_date, end_date) -> pd.DatetimeIndex:
+    """The simulated 'now' of every session in [start_date, end_date], as the engines step it (09:30 IST)."""
+    sessions = get_trading_calendar().sessions_between(start_date, end_date)
+    return (sessions + SESSION_CHECK_TIME).tz_localize(MARKET_TZ)
+
+
+def _aligned(times: pd.DatetimeIndex, index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    """times in the frame index's timezone convention (BacktestDataContext._timestamp)."""
+    if index.tz is None:
+        return times.tz_convert(None)
+    return times.tz_convert(index.tz)
+
+
+def build_signal_matrices(frames: dict, config: dict, strategy, sessions: pd.DatetimeIndex, start_date,
+                          exit_lookback_days: int = None, entry_contributions: bool = False) -> dict:
+    """
+    frames: date-indexed enriched + scored frames (panel_enrichment.build_candle_cache).
+    Returns the (sessions x symbols) matrices simulate() runs on.
+    entry_contributions: also keep the CONTRIB_* columns as matrices, so
+    reweight_entry_signals can rescore entries for other entry weights.
+    """
+    symbols = list(frames)
+    n_sessions, n_symbols = len(sessions), len(symbols)
+    values = {col: np.full((n_sessions, n_symbols), np.nan) for col in VALUE_COLUMNS}
+    signals, hits, contributions = {}, {}, {}
+    rows = np.full((n_sessions, n_symbols), -1, dtype=np.int32)
+    entry_price = np.full((n_sessions, n_symbols), np.nan)
+    exit_ready = np.zeros((n_sessions, n_symbols), dtype=bool)
+    rank_score = np.full((n_sessions, n_symbols), np.inf)
+    rank_adx = np.full((n_sessions, n_symbols), np.nan)
+    rank_rsi = np.full((n_sessions, n_symbols), np.nan)
+    rank_volume = np.full((n_sessions, n_symbols), np.nan)
+    dates = []
+
+    for j, symbol in enumerate(symbols):
+        df = frames[symbol]
+        index = df.index
+        dates.append(index)
+        times = _aligned(sessions, index)
+        offsets = index.searchsorted(times, side="right")
+        row = offsets - 1
+        seen = row >= 0
+        at = row[seen]
+        rows[:, j] = row
+
+        for col in VALUE_COLUMNS:
+            if col in df.columns:
+                values[col][seen, j] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)[at]
+        symbol_hits = exit_filter_hits(df, config)
+        for col, column in exit_signal_columns(df, config, symbol_hits).items():
+            if col not in signals:
+                signals[col] = np.zeros((n_sessions, n_symbols), dtype=column.dtype)
+            signals[col][seen, j] = column[at]
+        # Score collapse's structural break looks up a candle stamped at the evaluation time itself
+        signals.setdefault("SESSION_CANDLE", np.zeros((n_sessions, n_symbols), dtype=bool))
+        signals["SESSION_CANDLE"][seen, j] = index[at] == times[seen]
+        for key, fired in symbol_hits.items():
+            if key not in hits:
+                hits[key] = np.zeros((n_sessions, n_symbols), dtype=bool)
+            hits[key][seen, j] = fired[at]
+        if entry_contributions:
+            for col in df.columns:
+                if str(col).startswith("CONTRIB_"):
+                    if col not in contributions:
+                        contributions[col] = np.full((n_sessions, n_symbols), np.nan, dtype=CONTRIB_DTYPE)
+                    contributions[col][seen, j] = df[col].to_numpy(dtype=CONTRIB_DTYPE)[at]
+
+        # The engines buy at the previous candle's close, once two candles of the run exist
+        first_live = index.searchsorted(_aligned(pd.DatetimeIndex([start_date]), index)[0], side="left")
+        can_enter = row - 1 >= first_live
+        entry_price[can_enter, j] = df["close"].to_numpy(dtype=float)[row[can_enter] - 1]
+
+        # ...and only evaluate exits with two candles in the exit lookback
+        if exit_lookback_days:
+            window_start = index.searchsorted(_aligned(sessions - timedelta(days=exit_lookback_days), index),
+                                              side="left")
+        else:
+            window_start = np.zeros(n_sessions, dtype=np.int64)
+        exit_ready[:, j] = offsets - window_start >= 2
+
+        candidates = candidate_mask(df, config, strategy)
+        keys = ranking_keys(df)
+        listed = seen.copy()
+        listed[seen] = candidates[at]
+        picked = row[listed]
+        rank_score[listed, j] = -keys["score"][picked]
+        rank_adx[listed, j] = -keys["adx"][picked]
+        rank_rsi[listed, j] = keys["rsi_distance"][picked]
+        rank_volume[listed, j] = -keys["volume"][picked]
+
+    ranking = {"listed": np.isfinite(rank_score), "adx": rank_adx, "rsi_distance": rank_rsi, "volume": rank_volume}
+    picks, pick_scores = _rank_picks(ranking, -rank_score)
+
+    signals.update(values)
+    logger.info(f"🧮 Signal matrices: {n_sessions} sessions x {n_symbols} symbols")
+    return {
+        "symbols": symbols,
+        "sessions": sessions,
+        "session_days": sessions.tz_localize(None).normalize().to_numpy().astype("datetime64[D]").astype(np.int64),
+        "dates": dates,
+        "rows": rows,
+        "signals": signals,
+        "exit_hits": hits,
+        "entry_price": entry_price,
+        "exit_ready": exit_ready,
+        "picks": picks,
+        "pick_scores": pick_scores,
+        "ranking": ranking,
+        "entry_contributions": contributions if entry_contributions else None,
+    }
+
+
+def _rank_picks(ranking: dict, scores: np.ndarray):
+    """
+    EntryService.tie_breaker per session over the listed symbols (score, ADX,
+    RSI nearest 50, volume), capped at SUGGESTION_LIMIT: (picks, pick_scores),
+    -1 / NaN padded. ranking holds the other keys already negated for ascending order.
+    """
+    rank_score = np.where(ranking["listed"], -scores, np.inf)
+    order = np.lexsort((ranking["volume"], ranking["rsi_distance"], ranking["adx"], rank_score),
+                       axis=1)[:, :SUGGESTION_LIMIT]
+    ranked = np.take_along_axis(rank_score, order, axis=1)
+    picks = np.where(np.isfinite(ranked), order, -1).astype(np.int32)
+    return picks, np.where(picks >= 0, -ranked, np.nan)
+
+
+def reweight_exit_signals(matrices: dict, config: dict) -> dict:
+    """
+    The matrices with EXIT_FILTER_SCORE re-summed for the exit filter weights
+    in `config` (filters enabled and thresholds as the matrices were built with).
+    """
+    signals = dict(matrices["signals"])
+    signals["EXIT_FILTER_SCORE"] = combine_exit_hits(matrices["exit_hits"], config, matrices["rows"].shape)
+    return {**matrices, "signals": signals}
+
+
+def reweight_entry_signals(matrices: dict, config: dict) -> dict:
+    """
+    The matrices with entries rescored for the entry weights in `config`
+    (entry_score_engine.reweight_contributions over the CONTRIB_* matrices):
+    ENTRY_SCORE and the ranked picks. Needs matrices built with
+    entry_contributions=True.
+    """
+    contributions = matrices["entry_contributions"]
+    if contributions is None:
+        raise ValueError("Entry reweighting needs matrices built with entry_contributions=True")
+    shape = matrices["rows"].shape
+    current = matrices["signals"]["ENTRY_SCORE"]
+    scores = np.where(np.isnan(current), np.nan, reweight_contributions(contributions, config, shape)[0])
+    signals = dict(matrices["signals"], ENTRY_SCORE=scores)
+    picks, pick_scores = _rank_picks(matrices["ranking"], np.where(np.isnan(scores), -np.inf, scores))
+    return {**matrices, "signals": signals, "picks": picks, "pick_scores": pick_scores}
+
+
+def slice_sessions(matrices: dict, start: int, stop: int) -> dict:
+    """
+    Sessions [start, stop) of the matrices as a backtest of its own: as in a
+    run starting there, a symbol can only be bought once it has two candles
+    inside the slice.
+    """
+    rows = matrices["rows"]
+    entry_price = matrices["entry_price"][start:stop]
+    if start > 0:
+        # The slice's first live candle: on its first session if one was added there, else the next one
+        first_live = rows[start] + (rows[start] <= rows[start - 1])
+        entry_price = np.where(rows[start:stop] - 1 >= first_live, entry_price, np.nan)
+    by_session = lambda values: values[start:stop]
+    return {
+        **matrices,
+        "sessions": matrices["sessions"][start:stop],
+        "session_days": matrices["session_days"][start:stop],
+        "rows": rows[start:stop],
+        "signals": {col: by_session(values) for col, values in matrices["signals"].items()},
+        "exit_hits": {key: by_session(values) for key, values in matrices["exit_hits"].items()},
+        "entry_price": entry_price,
+        "exit_ready": matrices["exit_ready"][start:stop],
+        "picks": matrices["picks"][start:stop],
+        "pick_scores": matrices["pick_scores"][start:stop],
+        "ranking": {key: by_session(values) for key, values in matrices["ranking"].items()},
+        "entry_contributions": None if matrices["entry_contributions"] is None else
+        {col: by_session(values) for col, values in matrices["entry_contributions"].items()},
+    }
+
+
+def simulate(matrices: dict, config: dict, capital: float, minimum_entry_score: float,
+             maximum_holding_days: int, capital_per_trade: float = None, max_positions: int = None,
+             min_score_gap_to_replace: float = None) -> dict:
+    """
+    Run the portfolio over the matrices. capital_per_trade None buys 1 share
+    per pick, max_positions None leaves the book uncapped, min_score_gap_to_replace
+    None disables rebalancing.
+    Returns trades (one dict per closed trade), final capital and the
+    per-session equity (capital + open positions at the session's close).
+    """
+    symbols, sessions, days = matrices["symbols"], matrices["sessions"], matrices["session_days"]
+    signals, rows, dates = matrices["signals"], matrices["rows"], matrices["dates"]
+    close, entry_prices, exit_ready = signals["close"], matrices["entry_price"], matrices["exit_ready"]
+    picks, pick_scores = matrices["picks"], matrices["pick_scores"]
+    stack = ExitStack(config)
+    open_positions = {}
+    trades = []
+    equity = np.zeros(len(sessions))
+
+    def close_position(j, t, price, reason, exit_date=None):
+        nonlocal capital
+        position = open_positions.pop(j)
+        capital += position["qty"] * price
+        trades.append(position | {
+            "exit_date": exit_date or sessions[t].strftime("%Y-%m-%d"),
+            "exit_price": price,
+            "pnl": position["qty"] * (price - position["entry_price"]),
+            "reason": reason,
+        })
+
+    for t in range(len(sessions)):
+        for j in list(open_positions):
+            if not exit_ready[t, j]:
+                continue
+            position = open_positions[j]
+            days_held = int(days[t] - position["day"])
+            reason = stack.decide(position["entry_price"], position["score"], days_held, signals, (t, j))
+            if reason is None and days_held >= maximum_holding_days:
+                reason = "forced_max_hold"
+            if reason is not None:
+                close_position(j, t, close[t, j], reason)
+
+        for k in range(picks.shape[1]):
+            j, score = picks[t, k], pick_scores[t, k]
+            if j < 0 or not score >= minimum_entry_score:
+                break
+            if j in open_positions:
+                continue
+
+            weakest = min(open_positions, key=lambda held: open_positions[held]["score"], default=None)
+            if (min_score_gap_to_replace is not None and weakest is not None
+                    and score - open_positions[weakest]["score"] >= min_score_gap_to_replace):
+                close_position(weakest, t, close[t, weakest], "rebalanced")
+            elif max_positions is not None and len(open_positions) >= max_positions:
+                continue
+
+            price = entry_prices[t, j]
+            if np.isnan(price):
+                continue
+            qty = 1 if capital_per_trade is None else int(capital_per_trade // price)
+            if qty == 0:
+                continue
+            capital -= qty * price
+            open_positions[j] = {
+                "symbol": symbols[j],
+                "entry_date": dates[j][rows[t, j] - 1].strftime("%Y-%m-%d"),
+                "entry_price": price,
+                "qty": qty,
+                "investment": qty * price,
+                "score": score,
+                "day": days[t],
+            }
+
+        equity[t] = capital + sum(p["qty"] * close[t, j] for j, p in open_positions.items())
+
+    last = len(sessions) - 1
+    end_date = sessions[last].strftime("%Y-%m-%d") if len(sessions) else None
+    for j in list(open_positions):
+        close_position(j, last, close[last, j], "Forced exit at end", exit_date=end_date)
+
+    return {"trades": trades, "capital": capital, "equity": equity}
+
+
+def backtest_params(mode: str, backtest_config: dict = BACKTEST_CONFIG) -> dict:
+    params = {
+        "capital": backtest_config["capital"],
+        "minimum_entry_score": backtest_config["minimum_entry_score"],
+        "maximum_holding_days": backtest_config["maximum_holding_days"],
+    }
+    if mode == "portfolio":
+        params.update(
+            capital_per_trade=backtest_config["capital_per_trade"],
+            max_positions=backtest_config["max_trades_per_day"],
+            min_score_gap_to_replace=backtest_config.get("min_score_gap_to_replace"),
+        )
+    return params
+
+
+def run_signal_backtest(mode: str = "portfolio"):
+    config = load_filters()
+    broker = MockBroker(use_cache=True)
+    start_date = datetime.strptime(BACKTEST_CONFIG["start_date"], "%Y-%m-%d").replace(tzinfo=ZoneInfo(MARKET_TZ))
+    end_date = datetime.strptime(BACKTEST_CONFIG["end_date"], "%Y-%m-%d").replace(tzinfo=ZoneInfo(MARKET_TZ))
+
+    started = time.perf_counter()
+    frames = build_candle_cache(broker, broker.get_symbols("all") or [], config,
+                                start_date - timedelta(days=config.get("lookback_days", 180)), end_date)
+    sessions = session_times(start_date, end_date)
+    matrices = build_signal_matrices(frames, config, get_strategy("swing", config), sessions, start_date,
+                                     config.get("exit_lookback_days", 30))
+    built = time.perf_counter()
+    result = simulate(matrices, config, **backtest_params(mode))
+    finished = time.perf_counter()
+
+    recorder = TradeRecorder()
+    for trade in result["trades"]:
+        recorder.record_entry(trade["symbol"], trade["entry_date"], trade["entry_price"], trade["investment"])
+        recorder.record_exit(trade["symbol"], trade["exit_date"], trade["exit_price"])
+    recorder.export_csv()
+    logger.info(f"⚡ Signal backtest ({mode}): {len(result['trades'])} trades over {len(sessions)} sessions | "
+                f"load+matrices {built - started:.1f}s, simulation {finished - built:.2f}s")
+    logger.info("✅ Backtest finished. Final capital: ₹{:.2f}".format(result["capital"]))
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vectorized signal-matrix backtest")
+    parser.add_argument("--mode", choices=["portfolio", "quality"], default="portfolio",
+                        help="engine.py portfolio rules or engine_filters_quality_analysis.py rules")
+    args = parser.parse_args()
+    run_signal_backtest(args.mode)
@@ -0,0 +1,66 @@
+"""
+Synthetic daily OHLCV generator for offline checks and benchmarks.
+"""
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+
+@lru_cache(maxsize=32)
+def _calendar(start: str, rows: int, freq: str) -> pd.DatetimeIndex:
+    # Business-day ranges are generated element by element; reuse them across seeds
+    return pd.date_range(start=start, periods=rows, freq=freq, tz="Asia/Kolkata")
+
+
+def make_synthetic_ohlcv(rows: int = 500, seed: int = 0, start: str = "2022-01-03", freq: str = "B",
+                         start_price: float = 500.0) -> pd.DataFrame:
+    """Random-walk candles with a 'date' column, shaped like the archive frames."""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0005, 0.02, rows)
+    close = start_price * np.exp(np.cumsum(returns))
+    open_ = close * (1 + rng.normal(0, 0.006, rows))
+    spread = np.abs(rng.normal(0, 0.012, rows)) * close
+    high = np.maximum(open_, close) + spread * rng.uniform(0.1, 1.0, rows)
+    low = np.minimum(open_, close) - spread * rng.uniform(0.1, 1.0, rows)
+    volume = rng.integers(50_000, 3_000_000, rows) * rng.choice([1, 1, 1, 2, 4], rows)
+
+    dates = _calendar(start, rows, freq)
+    return pd.DataFrame({
+        "date": dates,
+        "open": open_.round(2),
+        "high": high.round(2),
+        "low": low.round(2),
+        "close": close.round(2),
+        "adj_close": close.round(2),
+        "volume": volume.astype("int64"),
+    })
+
+
+class SyntheticBroker:
+    """
+    Broker stand-in serving deterministic synthetic daily candles for a
+    numbered universe (SYN0000, SYN0001, ...), for offline checks.
+    """
+    def __init__(self, symbols: int = 50, start: str = "2015-01-01", end: str = "2025-01-01"):
+        self.symbol_names = [f"SYN{i:04d}" for i in range(symbols)]
+        self.start = start
+        self.rows = len(pd.bdate_range(start, end))
+
+    def get_symbols(self, index=None) -> list:
+        return [{"symbol": symbol, "instrument_token": i} for i, symbol in enumerate(self.symbol_names)]
+
+    def fetch_candles(self, symbol: str, interval: str = "day", days: int = None, from_date=None, to_date=None):
+        df = make_synthetic_ohlcv(self.rows, seed=int(symbol[3:]), start=self.start).set_index("date")
+        if from_date is not None:
+            df = df[df.index >= from_date]
+        if to_date is not None:
+            df = df[df.index <= to_date]
+        if days and len(df) >= days:
+            df = df.iloc[-days:]
+        return df
+
+    def get_ltp(self, symbol: str) -> float:
+        return float(self.fetch_candles(symbol)["close"].iloc[-1])
+
+    def place_order(self, symbol: str, quantity: int, action: str, **kwargs) -> dict:
+        return {"status": "success", "symbol": symbol, "qty": quantity, "action": action.upper()}
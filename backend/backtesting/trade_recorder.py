@@ -3,14 +3,29 @@ from config.logging_config import get_loggers, get_log_directory
 from util.diagnostic_report_generator import diagnostics_tracker
 logger, trade_logger = get_loggers()
 
+FIELDS = ["symbol", "entry_date", "entry_price", "investment", "status", "exit_date", "exit_price", "pnl"]
+
 class TradeRecorder:
+    """
+    Closed trades are appended to trades.csv.part as soon as they close, so only
+    open positions stay in memory however long the backtest runs. export_csv
+    renames it to trades.csv, so an earlier trades.csv is kept until then.
+    """
     def __init__(self):
         self.log_folder_path = get_log_directory()
         self.output_path = self.log_folder_path / "trades.csv"
+        self.partial_path = self.log_folder_path / "trades.csv.part"
         self.trades = []
+        self.closed_count = 0
 
-        # Ensure the directory exists
+        # Ensure the directory exists and start a fresh partial file
         self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.partial_path, "w", newline="") as f:
+            csv.DictWriter(f, fieldnames=FIELDS).writeheader()
+
+    def _append(self, rows):
+        with open(self.partial_path, "a", newline="") as f:
+            csv.DictWriter(f, fieldnames=FIELDS).writerows(rows)
 
     def record_entry(self, symbol, date, price, investment):
         self.trades.append({
@@ -28,16 +43,22 @@ class TradeRecorder:
                 trade["exit_price"] = exit_price
                 trade["status"] = "closed"
                 trade["pnl"] = (exit_price - trade["entry_price"]) * (trade["investment"] // trade["entry_price"])
+        closed = [trade for trade in self.trades if trade["status"] == "closed"]
+        if closed:
+            self._append(closed)
+            self.closed_count += len(closed)
+            self.trades = [trade for trade in self.trades if trade["status"] != "closed"]
 
     def export_csv(self):
-        if not self.trades:
+        if not self.trades and not self.closed_count:
+            self.partial_path.unlink(missing_ok=True)
             print("⚠️ No trades recorded — skipping CSV export.")
             return
 
-        with open(self.output_path, "w", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=self.trades[0].keys())
-            writer.writeheader()
-            writer.writerows(self.trades)
+        # Positions still open at the end of the run
+        self._append(self.trades)
+        self.trades = []
+        self.partial_path.replace(self.output_path)
 
         output_csv_path = str(self.log_folder_path / "diagnostic_report.csv")
         diagnostics_tracker.export(output_csv_path)
@@ -0,0 +1,284 @@
+"""
+Walk-forward optimization of the entry and exit filter weights over the
+signal-matrix backtest (signal_engine.py).
+
+The session range is cut into rolling windows: train on `train_days`
+sessions, then trade the next `test_days` sessions out of sample with the
+weights that won the training window, and roll forward by `test_days`.
+Weights never cause a re-enrichment or rebuild: entries are rescored from
+the CONTRIB_* matrices (reweight_entry_signals) and the exit score is
+re-summed from the per-filter hit matrices (reweight_exit_signals), so one
+training evaluation is a rescoring plus a simulation over the window.
+
+The universe is scored once and shared with the workers through a
+memory-mapped store (param_sweep.share_universe); every worker builds the
+full-span matrices once and optimizes whole windows, one window per task.
+
+Searched weights: the weight of every enabled entry filter (the
+entry_filters paths in CONTRIBUTION_SPECS) and of every enabled exit filter
+(exit_filters.<filter>.weight). Searches (WALK_FORWARD_CONFIG["search"]):
+- grid: every combination of WALK_FORWARD_CONFIG["grid"] ({path: [values]})
+- random: `random_runs` draws, each weight its configured value times one of `scales`
+- coordinate: from the configured weights, try each weight at each of
+  `scales` in turn, keeping improvements, for up to `coordinate_rounds` rounds
+The configured weights are always evaluated first and win ties.
+
+Outputs (log directory): oos_equity.csv, the out-of-sample equity of the
+test windows chained end to end, and weights_trajectory.csv, the chosen
+weights with train and test metrics per window.
+
+Run from the repo root:
+    python backend/backtesting/walk_forward.py [--search coordinate|random|grid] [--workers 8]
+"""
+import sys
+import time
+import argparse
+import itertools
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+# Ensure the root directory is in sys.path for module imports
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import numpy as np
+import pandas as pd
+from brokers.data.ohlcv_store import OhlcvStore
+from backtesting.backtest_config import BACKTEST_CONFIG, WALK_FORWARD_CONFIG
+from backtesting.signal_engine import (
+    MARKET_TZ, session_times, build_signal_matrices, reweight_entry_signals, reweight_exit_signals,
+    slice_sessions, simulate, backtest_params
+)
+from backtesting.param_sweep import apply_params, summarize, share_universe, load_universe
+from config.filters_setup import load_filters
+from services.entry_score_engine import CONTRIBUTION_SPECS
+from services.exit_signals import EXIT_FILTER_RULES
+from services.strategies.strategy_factory import get_strategy
+from config.logging_config import get_loggers, get_log_directory
+
+logger, trade_logger = get_loggers()
+
+SEARCHES = ("grid", "random", "coordinate")
+
+_worker = {}
+
+
+def _get_path(config: dict, path: str):
+    node = config
+    for key in path.split("."):
+        node = node.get(key) if isinstance(node, dict) else None
+    return node
+
+
+def weight_paths(config: dict) -> dict:
+    """{dotted path: configured weight} of the enabled entry and exit filters."""
+    weights = {}
+    for name, parts in CONTRIBUTION_SPECS.items():
+        for _, path in parts:
+            if path is None or path[0] != "entry_filters":
+                continue
+            if not config.get("entry_filters", {}).get(name, {}).get("enabled", False):
+                continue
+            value = _get_path(config, ".".join(path))
+            if isinstance(value, (int, float)):
+                weights[".".join(path)] = value
+    for key in EXIT_FILTER_RULES:
+        settings = config.get("exit_filters", {}).get(key, {})
+        if settings.get("enabled", False) and isinstance(settings.get("weight"), (int, float)):
+            weights[f"exit_filters.{key}.weight"] = settings["weight"]
+    return weights
+
+
+def make_windows(n_sessions: int, train_days: int, test_days: int) -> list:
+    """(train_start, train_stop, test_start, test_stop) session indices of each rolling window."""
+    if n_sessions <= train_days:
+        raise ValueError(f"{n_sessions} sessions leave no test window after {train_days} training sessions")
+    return [(test_start - train_days, test_start, test_start, min(test_start + test_days, n_sessions))
+            for test_start in range(train_days, n_sessions, test_days)]
+
+
+def _scaled(base: float, scale: float) -> float:
+    return round(base * scale, 4)
+
+
+def search_runs(search: str, base: dict, settings: dict, seed=None) -> list:
+    """The weight sets a grid / random search evaluates, configured weights first."""
+    if search == "grid":
+        grid = settings.get("grid")
+        if not grid:
+            raise ValueError("Grid search needs WALK_FORWARD_CONFIG['grid'] ({path: [weights]})")
+        names = list(grid)
+        return [{}] + [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+    if search == "random":
+        rng = np.random.default_rng(seed)
+        scales = settings["scales"]
+        return [{}] + [{path: _scaled(value, scales[int(rng.integers(len(scales)))]) for path, value in base.items()}
+                       for _ in range(settings["random_runs"])]
+    raise ValueError(f"Unknown search '{search}', expected one of {SEARCHES}")
+
+
+def evaluate(matrices: dict, config: dict, params: dict, mode: str, backtest_config: dict) -> dict:
+    """Summary metrics of one weight set over (a slice of) the matrices."""
+    run_config = apply_params(config, params)[0]
+    matrices = reweight_entry_signals(reweight_exit_signals(matrices, run_config), run_config)
+    result = simulate(matrices, run_config, **backtest_params(mode, backtest_config))
+    return {**summarize(result, backtest_config["capital"]), "equity": result["equity"]}
+
+
+def _score(metrics: dict, settings: dict) -> float:
+    if metrics["trades"] < settings["min_trades"]:
+        return -np.inf
+    return metrics[settings["objective"]]
+
+
+def optimize(matrices: dict, config: dict, base: dict, settings: dict, mode: str, backtest_config: dict,
+             seed=None):
+    """(best weights, their metrics, evaluations) of the configured search over the matrices."""
+    run = lambda params: evaluate(matrices, config, params, mode, backtest_config)
+    best, best_metrics = {}, run({})
+    best_score = _score(best_metrics, settings)
+    evaluations = 1
+
+    if settings["search"] == "coordinate":
+        for _ in range(settings["coordinate_rounds"]):
+            improved = False
+            for path, value in base.items():
+                for scale in settings["scales"]:
+                    candidate = dict(best, **{path: _scaled(value, scale)})
+                    if candidate.get(path, value) == best.get(path, value):
+                        continue
+                    metrics = run(candidate)
+                    evaluations += 1
+                    if _score(metrics, settings) > best_score:
+                        best, best_metrics, best_score = candidate, metrics, _score(metrics, settings)
+                        improved = True
+            if not improved:
+                break
+    else:
+        for candidate in search_runs(settings["search"], base, settings, seed)[1:]:
+            metrics = run(candidate)
+            evaluations += 1
+            if _score(metrics, settings) > best_score:
+                best, best_metrics, best_score = candidate, metrics, _score(metrics, settings)
+
+    return {**base, **best}, best_metrics, evaluations
+
+
+def _init_worker(store_root, config: dict, start_date, end_date, mode: str, backtest_config: dict, settings: dict):
+    store = OhlcvStore(root=store_root)
+    frames = {symbol: store.read(symbol, date_index=True) for symbol in store.symbols()}
+    _worker.update(
+        config=config, mode=mode, backtest_config=backtest_config, settings=settings,
+        base=weight_paths(config),
+        matrices=build_signal_matrices(frames, config, get_strategy("swing", config),
+                                       session_times(start_date, end_date), start_date,
+                                       config.get("exit_lookback_days", 30), entry_contributions=True),
+    )
+
+
+def run_window(window_id: int, window: tuple) -> dict:
+    """Train, then test, one window in a worker set up by _init_worker."""
+    started = time.perf_counter()
+    train_start, train_stop, test_start, test_stop = window
+    matrices, config, settings = _worker["matrices"], _worker["config"], _worker["settings"]
+    mode, backtest_config = _worker["mode"], _worker["backtest_config"]
+
+    weights, train, evaluations = optimize(slice_sessions(matrices, train_start, train_stop), config,
+                                           _worker["base"], settings, mode, backtest_config,
+                                           seed=[settings.get("seed") or 0, window_id])
+    test = evaluate(slice_sessions(matrices, test_start, test_stop), config, weights, mode, backtest_config)
+    day = lambda t: matrices["sessions"][t].strftime("%Y-%m-%d")
+    return {
+        "window": window_id,
+        "train_start": day(train_start), "train_end": day(train_stop - 1),
+        "test_start": day(test_start), "test_end": day(test_stop - 1),
+        "weights": weights,
+        "evaluations": evaluations,
+        "train": {key: value for key, value in train.items() if key != "equity"},
+        "test": {key: value for key, value in test.items() if key != "equity"},
+        "test_sessions": [day(t) for t in range(test_start, test_stop)],
+        "test_equity": test["equity"],
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def run_walk_forward(frames: dict, config: dict, start_date, end_date, settings: dict = WALK_FORWARD_CONFIG,
+                     mode: str = "portfolio", workers: int = None, backtest_config: dict = BACKTEST_CONFIG):
+    """
+    Walk-forward optimization over the scored universe `frames`, windows fanned
+    out over a process pool. Returns (weights trajectory, out-of-sample equity):
+    one row per window, and one row per test session with every window's
+    equity rescaled to the capital the previous windows ended on.
+    """
+    if settings["search"] not in SEARCHES:
+        raise ValueError(f"Unknown search '{settings['search']}', expected one of {SEARCHES}")
+    if settings["search"] == "grid":
+        search_runs("grid", {}, settings)
+    windows = make_windows(len(session_times(start_date, end_date)), settings["train_days"], settings["test_days"])
+    started = time.perf_counter()
+    results = []
+    with tempfile.TemporaryDirectory(prefix="walk_forward_") as tmp:
+        store_root = share_universe(frames, Path(tmp))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(store_root, config, start_date, end_date, mode, backtest_config,
+                                           settings)) as pool:
+            futures = [pool.submit(run_window, window_id, window) for window_id, window in enumerate(windows)]
+            for done, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                results.append(result)
+                logger.info(f"🚶 Walk-forward: window {result['window']} ({result['test_start']} → "
+                            f"{result['test_end']}) done, {done}/{len(windows)}, {result['evaluations']} "
+                            f"evaluations in {result['seconds']:.1f}s")
+    results.sort(key=lambda r: r["window"])
+
+    capital = backtest_config["capital"]
+    growth = 1.0
+    trajectory, equity = [], []
+    for result in results:
+        trajectory.append({
+            "window": result["window"],
+            "train_start": result["train_start"], "train_end": result["train_end"],
+            "test_start": result["test_start"], "test_end": result["test_end"],
+            "evaluations": result["evaluations"],
+            **result["weights"],
+            **{f"train_{key}": value for key, value in result["train"].items()},
+            **{f"test_{key}": value for key, value in result["test"].items()},
+        })
+        for date, value in zip(result["test_sessions"], result["test_equity"]):
+            equity.append({"date": date, "window": result["window"], "equity": growth * value})
+        growth *= result["test"]["final_capital"] / capital
+
+    elapsed = time.perf_counter() - started
+    trajectory, equity = pd.DataFrame(trajectory), pd.DataFrame(equity, columns=["date", "window", "equity"])
+    logger.info(f"✅ Walk-forward finished: {len(windows)} windows, "
+                f"{sum(r['evaluations'] for r in results)} evaluations in {elapsed:.1f}s "
+                f"({workers or 'all'} workers), out-of-sample return {(growth - 1) * 100:.2f}%")
+    return trajectory, equity
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward optimization of the entry/exit filter weights")
+    parser.add_argument("--search", choices=SEARCHES, default=None, help="Override WALK_FORWARD_CONFIG['search']")
+    parser.add_argument("--mode", choices=["portfolio", "quality"], default="portfolio")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--synthetic", type=int, default=None, help="Optimize over a synthetic universe of N symbols")
+    args = parser.parse_args()
+
+    settings = dict(WALK_FORWARD_CONFIG, search=args.search or WALK_FORWARD_CONFIG["search"])
+    config = load_filters()
+    start_date = datetime.strptime(settings["start_date"], "%Y-%m-%d").replace(tzinfo=ZoneInfo(MARKET_TZ))
+    end_date = datetime.strptime(settings["end_date"], "%Y-%m-%d").replace(tzinfo=ZoneInfo(MARKET_TZ))
+
+    frames = load_universe(config, start_date, end_date, args.synthetic)
+    trajectory, equity = run_walk_forward(frames, config, start_date, end_date, settings, args.mode, args.workers)
+    log_dir = get_log_directory()
+    trajectory.to_csv(log_dir / "weights_trajectory.csv", index=False)
+    equity.to_csv(log_dir / "oos_equity.csv", index=False)
+    print(trajectory[["window", "test_start", "test_end", "evaluations",
+                      f"train_{settings['objective']}", "test_return_pct", "test_trades"]].to_string(index=False))
+    final = equity["equity"].iloc[-1] if len(equity) else BACKTEST_CONFIG["capital"]
+    print(f"\n🚶 Out-of-sample equity {final:,.0f} over {len(trajectory)} windows → {log_dir}")
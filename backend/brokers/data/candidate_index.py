@@ -0,0 +1,196 @@
+# @role: Per-date candidate bitmap stored beside the OHLCV archive
+# @used_by: backtest_data_context.py, ohlcv_data_downloader.py, engine.py, engine_filters_quality_analysis.py, parity_checks.py
+# @filter_type: utility
+# @tags: archive, prefilter, bitmap, backtest
+"""
+For every archived date, one bit per symbol: could the symbol pass the cheap
+entry gates (evaluate_symbol's prefilter and the strategy's hard filters) as
+of that date. A backtest day then only scans the symbols whose bit is set
+instead of the whole universe.
+
+Layout (beside the store segments):
+    <root>/<interval>/candidates/<strategy>.npz   dates, symbols, packed bits,
+                                                  filter fingerprint, archive stamp per symbol
+
+A symbol's bit on a date it has no candle for is the bit of its last candle
+before it (the candle an as-of view would end on). update() only recomputes
+the symbols whose archived candles changed (new symbols, appended candles)
+and carries the other columns over onto the grown date axis; a change to the
+filter config (the fingerprint) rebuilds everything.
+
+Indicators are taken from the archive (or, for raw archives, enriched once
+over each symbol's full history). The backtest context re-enriches from its
+own warm-up window, so a row sitting right on a filter threshold can land
+on the other side and a symbol the full scan would pick can be skipped.
+Backtests therefore only use the index when BACKTEST_CONFIG sets
+use_candidate_index; parity_checks measures candidate scans against full scans.
+"""
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+from brokers.data.ohlcv_store import OhlcvStore, STORE_ROOT
+from services.entry_candidates import prefilter_mask
+from services.panel_enrichment import enrich_universe, RAW_COLUMNS
+from services.strategies.strategy_factory import get_strategy
+from config.logging_config import get_loggers
+
+logger, trade_logger = get_loggers()
+
+CANDIDATE_DIR = "candidates"
+MARKET_TZ = "Asia/Kolkata"
+# Columns the prefilter and the swing hard filters read
+FILTER_COLUMNS = ["close", "volume", "ATR", "RSI", "MACD", "MACD_SIGNAL", "DMP_14", "DMN_14"]
+# Config keys the bits depend on (prefilter thresholds, hard-filter bands, indicator implementation)
+FILTER_KEYS = ["min_volume", "min_price", "max_price", "min_atr_pct", "enable_soft_prefilter",
+               "rsi_min", "rsi_max", "use_indicator_kernels"]
+# Symbols read (and, for raw archives, enriched) together per update step
+UPDATE_BATCH = 200
+
+
+def _days(index: pd.DatetimeIndex) -> np.ndarray:
+    if index.tz is not None:
+        index = index.tz_convert(MARKET_TZ).tz_localize(None)
+    return index.values.astype("datetime64[D]")
+
+
+def _day(value) -> np.datetime64:
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert(MARKET_TZ).tz_localize(None)
+    return np.datetime64(ts.date(), "D")
+
+
+def candidate_fingerprint(config: dict, strategy: str = "swing") -> str:
+    parts = {"strategy": strategy, **{key: config.get(key) for key in FILTER_KEYS}}
+    return hashlib.md5(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class CandidateIndex:
+    def __init__(self, store: OhlcvStore, config: dict, strategy: str = "swing"):
+        self.store = store
+        self.config = config
+        self.strategy_name = strategy
+        self.strategy = get_strategy(strategy, config)
+        self.file = store.path / CANDIDATE_DIR / f"{strategy}.npz"
+        self.fingerprint = candidate_fingerprint(config, strategy)
+        self._load()
+
+    # ---------- persistence ----------
+
+    def _reset(self):
+        self.dates = np.array([], dtype="datetime64[D]")
+        self.symbols = []
+        self.bits = np.zeros((0, 0), dtype=bool)
+        self.stamps = {}
+        self._column = {}
+
+    def _load(self):
+        self._reset()
+        if not self.file.exists():
+            return
+        with np.load(self.file) as data:
+            if str(data["fingerprint"]) != self.fingerprint:
+                logger.info(f"♻️ Candidate index [{self.strategy_name}]: filter config changed, rebuilding")
+                return
+            self.dates = data["dates"]
+            self.symbols = [str(s) for s in data["symbols"]]
+            self.bits = np.unpackbits(data["bits"], axis=1, count=len(self.symbols)).astype(bool)
+            self.stamps = dict(zip(self.symbols, (str(s) for s in data["stamps"])))
+        self._column = {symbol: j for j, symbol in enumerate(self.symbols)}
+
+    def _save(self):
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.file.with_name(f"{self.file.name}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, fingerprint=np.array(self.fingerprint), dates=self.dates,
+                     symbols=np.array(self.symbols, dtype=str),
+                     bits=np.packbits(self.bits, axis=1),
+                     stamps=np.array([self.stamps[s] for s in self.symbols], dtype=str))
+        os.replace(tmp_path, self.file)
+
+    # ---------- building ----------
+
+    def _stamp(self, symbol: str) -> str:
+        entry = self.store.entry(symbol)
+        return f"{entry['first']}|{entry['last']}|{entry['rows']}"
+
+    def _read(self, symbols: list) -> dict:
+        """Date-indexed filter columns per symbol, enriching symbols whose archive lacks them."""
+        frames, raw = {}, {}
+        for symbol in symbols:
+            if all(col in self.store.entry(symbol)["columns"] for col in FILTER_COLUMNS):
+                frames[symbol] = self.store.read(symbol, columns=FILTER_COLUMNS, date_index=True)
+            else:
+                raw[symbol] = self.store.read(symbol, columns=RAW_COLUMNS)
+        core = {"entry_filters": {}, "exit_filters": {},
+                "use_indicator_kernels": self.config.get("use_indicator_kernels", False)}
+        for symbol, df in enrich_universe(raw, core).items():
+            frames[symbol] = df.set_index("date")
+        return frames
+
+    def _symbol_bits(self, df: pd.DataFrame, dates: np.ndarray) -> np.ndarray:
+        """The symbol's mask on `dates`, each date taking its last candle on or before it."""
+        mask = prefilter_mask(df, self.config) & self.strategy.hard_filter_mask(df)
+        rows = np.searchsorted(_days(df.index), dates, side="right") - 1
+        return np.where(rows >= 0, mask[np.maximum(rows, 0)], False)
+
+    def update(self) -> int:
+        """Bring the bitmap in line with the archive; returns the number of symbols recomputed."""
+        self.store.refresh()
+        symbols = sorted(self.store.symbols())
+        stale = [s for s in symbols if self.stamps.get(s) != self._stamp(s)]
+        if not stale and symbols == self.symbols:
+            return 0
+
+        stale_frames = {}
+        for start in range(0, len(stale), UPDATE_BATCH):
+            stale_frames.update(self._read(stale[start:start + UPDATE_BATCH]))
+        dates = np.unique(np.concatenate([self.dates] + [_days(df.index) for df in stale_frames.values()]))
+
+        # Unchanged columns carry over: each new date takes the row of the last old date before it
+        rows = np.searchsorted(self.dates, dates, side="right") - 1
+        bits = np.zeros((len(dates), len(symbols)), dtype=bool)
+        for j, symbol in enumerate(symbols):
+            if symbol in stale_frames:
+                bits[:, j] = self._symbol_bits(stale_frames[symbol], dates)
+            elif symbol in self.stamps and symbol not in stale:
+                old = self.bits[:, self._column[symbol]]
+                bits[:, j] = np.where(rows >= 0, old[np.maximum(rows, 0)], False)
+
+        self.dates, self.symbols, self.bits = dates, symbols, bits
+        self._column = {symbol: j for j, symbol in enumerate(symbols)}
+        self.stamps = {s: self._stamp(s) for s in symbols}
+        self._save()
+        logger.info(f"🗺️ Candidate index [{self.strategy_name}]: {len(stale)} of {len(symbols)} symbols recomputed, "
+                    f"{len(dates)} dates, {bits.mean() if bits.size else 0:.0%} of rows are candidates")
+        return len(stale)
+
+    def rebuild(self) -> int:
+        """Recompute every symbol (e.g. after archived candles were revised in place)."""
+        self._reset()
+        return self.update()
+
+    # ---------- queries ----------
+
+    def _row(self, as_of_date) -> int:
+        return int(np.searchsorted(self.dates, _day(as_of_date), side="right")) - 1
+
+    def select(self, symbols, as_of_date) -> list:
+        """The symbols that can pass the entry gates as of as_of_date (symbols not indexed are kept)."""
+        row = self._row(as_of_date)
+        return [s for s in symbols if s not in self._column or (row >= 0 and self.bits[row, self._column[s]])]
+
+    def select_range(self, symbols, start_date, end_date) -> list:
+        """The symbols that are candidates on at least one date in [start_date, end_date] (not indexed: kept)."""
+        lo, hi = max(self._row(start_date), 0), self._row(end_date) + 1
+        seen = self.bits[lo:hi].any(axis=0) if hi > lo else np.zeros(len(self.symbols), dtype=bool)
+        return [s for s in symbols if s not in self._column or seen[self._column[s]]]
+
+
+def get_candidate_index(config: dict, interval: str = "day", strategy: str = "swing", root=STORE_ROOT) -> CandidateIndex:
+    """The archive's candidate index for `config`, updated to the archive's current contents."""
+    index = CandidateIndex(OhlcvStore(root=root, interval=interval), config, strategy)
+    index.update()
+    return index
@@ -0,0 +1,272 @@
+# @role: Consolidated, memory-mapped Arrow IPC store for archived OHLCV/enriched candles
+# @used_by: mock_broker.py, ohlcv_data_downloader.py, candidate_index.py, parity_checks.py
+# @filter_type: utility
+# @tags: ohlcv, archive, arrow, storage
+"""
+Columnar candle store replacing the one-feather-file-per-symbol archive.
+
+Layout (one directory per interval):
+    <root>/<interval>/part-00001.arrow   Arrow IPC files ("segments"), one
+    <root>/<interval>/part-00002.arrow   record batch per symbol, rows sorted by date
+    <root>/<interval>/index.json         segment -> rows, symbol -> segment, batch, rows, first/last date
+
+Segments are memory-mapped once per store instance and read zero-copy; a
+symbol lookup is a dict access plus a batch fetch, with no filesystem globbing.
+Date ranges are resolved by binary search on the sorted date column and only
+the requested columns are materialized.
+
+Writes never modify a segment: write() puts the given symbols into a new
+segment and repoints the index, compact() folds every live batch into a
+single segment and deletes the rest.
+"""
+import json
+import os
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from config.logging_config import get_loggers
+
+logger, trade_logger = get_loggers()
+
+STORE_ROOT = Path(__file__).resolve().parents[2] / "backtesting" / "ohlcv_store"
+INDEX_FILE = "index.json"
+INTERVAL_ALIASES = {"day": "1d", "15minute": "15m"}
+UNIT_NS = {"s": 1_000_000_000, "ms": 1_000_000, "us": 1_000, "ns": 1}
+
+
+def _to_table(df: pd.DataFrame) -> pa.Table:
+    """pa.Table with float NaN kept as NaN rather than null, so float columns read back zero-copy."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_floating(field.type) and table.column(i).null_count:
+            table = table.set_column(i, field.name, pa.array(df[field.name].to_numpy(), from_pandas=False))
+    return table
+
+
+def _date_index(dates: pa.Array) -> pd.DatetimeIndex:
+    """DatetimeIndex over the mapped int64 timestamps (a view for naive dates)."""
+    values = dates.view(pa.int64()).to_numpy().view(f"datetime64[{dates.type.unit}]")
+    index = pd.DatetimeIndex(values, name="date")
+    return index.tz_localize("UTC").tz_convert(dates.type.tz) if dates.type.tz else index
+
+
+def _to_timestamp(value, tz) -> pd.Timestamp:
+    ts = pd.Timestamp(value)
+    if tz is not None and ts.tzinfo is None:
+        return ts.tz_localize(tz)
+    if tz is None and ts.tzinfo is not None:
+        return ts.tz_convert(None)
+    return ts
+
+
+class OhlcvStore:
+    def __init__(self, root: Path = STORE_ROOT, interval: str = "1d"):
+        self.interval = INTERVAL_ALIASES.get(interval, interval)
+        self.path = Path(root) / self.interval
+        self._maps = {}
+        self._readers = {}
+        self.index = self._load_index()
+
+    # ---------- index ----------
+
+    def _load_index(self) -> dict:
+        index_path = self.path / INDEX_FILE
+        if index_path.exists():
+            with open(index_path) as f:
+                return json.load(f)
+        return {"segments": {}, "symbols": {}}
+
+    def _save_index(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path / f"{INDEX_FILE}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_path, self.path / INDEX_FILE)
+
+    def refresh(self):
+        """Reload the index (e.g. after another process wrote to the store)."""
+        self.index = self._load_index()
+
+    def symbols(self) -> list:
+        return list(self.index["symbols"])
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.index["symbols"]
+
+    def __len__(self) -> int:
+        return len(self.index["symbols"])
+
+    def entry(self, symbol: str) -> dict:
+        return self.index["symbols"].get(symbol)
+
+    def last_date(self, symbol: str):
+        entry = self.entry(symbol)
+        return pd.Timestamp(entry["last"]) if entry else None
+
+    # ---------- reads ----------
+
+    def _reader(self, segment: str):
+        reader = self._readers.get(segment)
+        if reader is None:
+            self._maps[segment] = pa.memory_map(str(self.path / segment), "r")
+            reader = pa.ipc.open_file(self._maps[segment])
+            self._readers[segment] = reader
+        return reader
+
+    def close(self):
+        """Release the memory maps (batches already read keep their mapping alive)."""
+        for source in self._maps.values():
+            source.close()
+        self._maps.clear()
+        self._readers.clear()
+
+    def read_batch(self, symbol: str) -> pa.RecordBatch:
+        """The symbol's whole record batch (zero-copy view over the mapped segment)."""
+        entry = self.entry(symbol)
+        if entry is None:
+            return None
+        return self._reader(entry["segment"]).get_batch(entry["batch"])
+
+    def _row_range(self, batch: pa.RecordBatch, start=None, end=None):
+        if start is None and end is None:
+            return 0, batch.num_rows
+        date_type = batch.schema.field("date").type
+        tz = getattr(date_type, "tz", None)
+        scale = UNIT_NS[date_type.unit]
+        dates = batch.column(batch.schema.get_field_index("date")).view(pa.int64()).to_numpy()
+        lo = 0 if start is None else int(np.searchsorted(dates, _to_timestamp(start, tz).value // scale, "left"))
+        hi = len(dates) if end is None else int(np.searchsorted(dates, _to_timestamp(end, tz).value // scale, "right"))
+        return lo, max(hi, lo)
+
+    def read_arrow(self, symbol: str, columns: list = None, start=None, end=None) -> pa.RecordBatch:
+        """
+        Rows with start <= date <= end and only `columns` (+ date; default: the
+        columns the symbol was written with), still zero-copy.
+        """
+        batch = self.read_batch(symbol)
+        if batch is None:
+            return None
+        lo, hi = self._row_range(batch, start, end)
+        own = self.entry(symbol)["columns"]
+        wanted = own if columns is None else ["date"] + [c for c in columns if c != "date" and c in own]
+        return batch.slice(lo, hi - lo).select(wanted)
+
+    def read(self, symbol: str, columns: list = None, start=None, end=None, date_index: bool = False) -> pd.DataFrame:
+        """
+        Like read_arrow, as a DataFrame with a date column (or a date index);
+        None for unknown symbols. Numeric columns without nulls are read-only
+        views over the mapped segment: copy before writing values in place.
+        """
+        batch = self.read_arrow(symbol, columns, start, end)
+        if batch is None:
+            return None
+        if not date_index:
+            return batch.to_pandas(split_blocks=True)
+        df = batch.select([name for name in batch.schema.names if name != "date"]).to_pandas(split_blocks=True)
+        df.index = _date_index(batch.column(batch.schema.get_field_index("date")))
+        return df
+
+    # ---------- writes ----------
+
+    def _next_segment(self) -> str:
+        numbers = [int(name.split("-")[1].split(".")[0]) for name in self.index["segments"]]
+        return f"part-{max(numbers, default=0) + 1:05d}.arrow"
+
+    def _write_segment(self, tables: dict) -> str:
+        """Write {symbol: pa.Table} as one segment with a shared schema; returns its name."""
+        symbols = list(tables)
+        combined = pa.concat_tables([tables[s] for s in symbols], promote_options="permissive")
+        combined = combined.unify_dictionaries().combine_chunks().replace_schema_metadata(None)
+
+        segment = self._next_segment()
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path / f"{segment}.tmp"
+        entries = {}
+        offset = 0
+        with pa.ipc.new_file(str(tmp_path), combined.schema) as writer:
+            for i, symbol in enumerate(symbols):
+                rows = tables[symbol].num_rows
+                batch = combined.slice(offset, rows).combine_chunks().to_batches()
+                writer.write_batch(batch[0] if batch else pa.RecordBatch.from_pylist([], schema=combined.schema))
+                dates = tables[symbol].column("date")
+                entries[symbol] = {
+                    "segment": segment,
+                    "batch": i,
+                    "rows": rows,
+                    "columns": tables[symbol].column_names,
+                    "first": str(dates[0].as_py()) if rows else None,
+                    "last": str(dates[-1].as_py()) if rows else None,
+                }
+                offset += rows
+        os.replace(tmp_path, self.path / segment)
+
+        self.index["segments"][segment] = offset
+        self.index["symbols"].update(entries)
+        return segment
+
+    def write(self, frames: dict):
+        """
+        Insert or replace symbols: {symbol: DataFrame with a date column}.
+        Written as one new segment; earlier copies become garbage until compact().
+        """
+        tables = {}
+        for symbol, df in frames.items():
+            if df is None or df.empty:
+                continue
+            df = df.reset_index() if "date" not in df.columns else df
+            df = df.sort_values("date").drop_duplicates(subset="date", keep="last")
+            tables[symbol] = _to_table(df)
+        if not tables:
+            return None
+        segment = self._write_segment(tables)
+        self._save_index()
+        logger.info(f"💾 OHLCV store [{self.interval}]: wrote {len(tables)} symbols to {segment}")
+        return segment
+
+    def garbage_ratio(self) -> float:
+        """Share of stored rows that no symbol points at any more."""
+        live = sum(entry["rows"] for entry in self.index["symbols"].values())
+        total = sum(self.index["segments"].values())
+        return 1 - live / total if total else 0.0
+
+    def compact(self):
+        """Rewrite every live batch into a single segment and delete the old segment files."""
+        old_segments = list(self.index["segments"])
+        if len(old_segments) <= 1 and self.garbage_ratio() == 0:
+            return
+        tables = {symbol: pa.Table.from_batches([self.read_batch(symbol)]) for symbol in self.symbols()}
+        segment = self._write_segment(tables)
+        self.index["segments"] = {segment: self.index["segments"][segment]}
+        self._save_index()
+
+        self.close()
+        for name in old_segments:
+            try:
+                (self.path / name).unlink()
+            except OSError as e:
+                logger.warning(f"⚠️ Could not delete old segment {name}: {e}")
+        logger.info(f"🧹 OHLCV store [{self.interval}]: compacted {len(old_segments)} segments into {segment}")
+
+
+def migrate_feather_archive(archive_dir: Path, store: OhlcvStore, interval: str = "1d", chunk: int = 200) -> int:
+    """
+    One-off import of the legacy ohlcv_archive/<SYMBOL>/<SYMBOL>_<interval>_*.feather
+    files (latest file per symbol) into `store`. Returns the number of symbols migrated.
+    """
+    frames = {}
+    migrated = 0
+    for folder in sorted(Path(archive_dir).iterdir()):
+        matches = sorted(folder.glob(f"{folder.name}_{interval}_*.feather")) if folder.is_dir() else []
+        if not matches:
+            continue
+        frames[folder.name] = pd.read_feather(matches[-1])
+        if len(frames) >= chunk:
+            store.write(frames)
+            migrated += len(frames)
+            frames = {}
+    if frames:
+        store.write(frames)
+        migrated += len(frames)
+    store.compact()
+    return migrated
@@ -0,0 +1,168 @@
+# @role: In-memory, as-of data provider for backtests (stands in for a broker)
+# @used_by: engine.py, engine_filters_quality_analysis.py, entry_service.py
+# @filter_type: utility
+# @tags: broker, mock, backtest, panel
+"""
+Backtest data context: the universe is loaded, enriched and scored up front
+and every simulated day is served from memory.
+
+The symbols' date-indexed frames are aligned on the union trading calendar by
+an offset table: offsets[i, j] is how many candles of symbol j are dated on or
+before calendar[i]. An as-of view is then frame.iloc[:offsets[i, j]] — an
+integer slice, no date mask, no disk read.
+
+With window_days set, only a rolling window is held: the indicator warm-up
+lookback plus the next window_days of the run. When the simulated date moves
+past the window, the next one is loaded in its place, so memory stays bounded
+however long the backtest range is. Indicators are warmed up from each
+window's own lookback, the same way a single-window run warms up from the
+run's start.
+
+With a candidate_index (brokers/data/candidate_index.py), only symbols that
+are entry candidates on some date from the run's start to the window's end
+are loaded (a held position was a candidate when it was entered), and
+as_of_frames(candidates_only=True) narrows the daily scan to the symbols
+that are candidates on that date.
+
+EntryService and ExitService take the context in place of a broker: it
+implements fetch_candles/get_ltp/get_symbols and forwards orders to the
+wrapped broker.
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+import numpy as np
+import pandas as pd
+from brokers.base_broker import BaseBroker
+from services.panel_enrichment import build_candle_cache
+from config.logging_config import get_loggers
+
+logger, trade_logger = get_loggers()
+
+
+class BacktestDataContext(BaseBroker):
+    def __init__(self, broker, index: str, config: dict, start_date: datetime, end_date: datetime,
+                 interval: str = "day", window_days: int = None, candidate_index=None):
+        self.broker = broker
+        self.index = index
+        self.config = config
+        self.interval = interval
+        self.lookback = timedelta(days=config.get("lookback_days", 180))
+        self.window = timedelta(days=window_days) if window_days else None
+        self.start_date = start_date
+        self.end_date = end_date
+        self.as_of_date = start_date
+        self.symbols = broker.get_symbols(index) or []
+        self.candidate_index = candidate_index
+        self._load(start_date)
+
+    def _load(self, window_start: datetime):
+        window_end = min(window_start + self.window, self.end_date) if self.window else self.end_date
+        # Drop the previous window before building the next one
+        self.frames = {}
+        self.offsets = None
+        symbols = self.symbols
+        if self.candidate_index is not None:
+            names = [item.get("symbol") if isinstance(item, dict) else item for item in symbols]
+            keep = set(self.candidate_index.select_range(names, self.start_date, window_end))
+            symbols = [item for item, name in zip(symbols, names) if name in keep]
+        self.frames = build_candle_cache(self.broker, symbols, self.config,
+                                         window_start - self.lookback, window_end, self.interval)
+        if hasattr(self.broker, "release_memory_maps"):
+            self.broker.release_memory_maps()
+        self.window_start, self.window_end = window_start, window_end
+
+        names = list(self.frames)
+        self._column = {symbol: j for j, symbol in enumerate(names)}
+        self.calendar = (self.frames[names[0]].index.append([self.frames[s].index for s in names[1:]])
+                         .unique().sort_values()) if names else pd.DatetimeIndex([])
+        self.offsets = np.zeros((len(self.calendar), len(names)), dtype=np.int32)
+        for j, symbol in enumerate(names):
+            self.offsets[:, j] = self.frames[symbol].index.searchsorted(self.calendar, side="right")
+        logger.info(f"🗂️ Backtest data context: {len(names)} symbols x {len(self.calendar)} sessions loaded "
+                    f"({window_start:%Y-%m-%d} → {window_end:%Y-%m-%d})")
+
+    def _ensure_window(self, as_of_date: datetime):
+        if self.window and not (self.window_start <= as_of_date <= self.window_end):
+            self._load(as_of_date)
+
+    def _timestamp(self, value) -> pd.Timestamp:
+        ts = pd.Timestamp(value)
+        tz = self.calendar.tz
+        if tz is not None and ts.tzinfo is None:
+            return ts.tz_localize(tz)
+        if tz is None and ts.tzinfo is not None:
+            return ts.tz_convert(None)
+        return ts
+
+    def set_date(self, as_of_date: datetime):
+        """Simulated 'now' used when a read does not pass its own to_date; moves the window if needed."""
+        self._ensure_window(as_of_date)
+        self.as_of_date = as_of_date
+
+    def _session(self, as_of_date) -> int:
+        """Calendar row of the last session on or before as_of_date (-1 if none)."""
+        return int(self.calendar.searchsorted(self._timestamp(as_of_date), side="right")) - 1
+
+    def _rows(self, symbol: str, session: int) -> int:
+        return int(self.offsets[session, self._column[symbol]]) if session >= 0 else 0
+
+    def as_of(self, symbol: str, as_of_date: datetime = None) -> Optional[pd.DataFrame]:
+        """The symbol's candles dated on or before as_of_date (a positional slice, not a copy)."""
+        if symbol not in self.frames:
+            return None
+        session = self._session(as_of_date or self.as_of_date)
+        return self.frames[symbol].iloc[:self._rows(symbol, session)]
+
+    def as_of_frames(self, as_of_date: datetime = None, candidates_only: bool = False) -> dict:
+        """
+        as_of for every symbol with at least one candle: a candle_cache for EntryService.
+        candidates_only: just the candidate index's symbols for that date (all without an index).
+        """
+        as_of_date = as_of_date or self.as_of_date
+        self._ensure_window(as_of_date)
+        session = self._session(as_of_date)
+        names = list(self.frames)
+        if candidates_only and self.candidate_index is not None:
+            names = self.candidate_index.select(names, as_of_date)
+        frames = {}
+        for symbol in names:
+            df = self.frames[symbol]
+            rows = self._rows(symbol, session)
+            if rows:
+                frames[symbol] = df.iloc[:rows]
+        return frames
+
+    # --- BaseBroker ---
+
+    def fetch_candles(
+        self,
+        symbol: str,
+        interval: str = None,
+        days: int = None,
+        from_date: datetime = None,
+        to_date: datetime = None,
+        columns: Optional[list] = None
+    ):
+        if symbol not in self.frames:
+            return self.broker.fetch_candles(symbol, interval or self.interval, days, from_date, to_date)
+        df = self.as_of(symbol, to_date)
+        if from_date is not None:
+            df = df.iloc[df.index.searchsorted(self._timestamp(from_date), side="left"):]
+        if days and len(df) >= days:
+            df = df.iloc[-days:]
+        if columns is not None:
+            df = df[[col for col in columns if col in df.columns]]
+        return df
+
+    def get_ltp(self, symbol: str) -> float:
+        """Close of the last candle on or before the simulated date."""
+        df = self.as_of(symbol)
+        if df is None or df.empty:
+            return self.broker.get_ltp(symbol)
+        return df["close"].iloc[-1]
+
+    def get_symbols(self, index) -> list:
+        return self.symbols if index == self.index else self.broker.get_symbols(index)
+
+    def place_order(self, *args, **kwargs) -> dict:
+        return self.broker.place_order(*args, **kwargs)
@@ -4,11 +4,10 @@
 # @tags: broker, mock, test
 from datetime import datetime
 from typing import Optional
-import pandas as pd
-from pathlib import Path
 from brokers.base_broker import BaseBroker
 from brokers.kite.kite_broker import KiteBroker
 from brokers.data.indexes import get_index_symbols
+from brokers.data.ohlcv_store import OhlcvStore
 from config.logging_config import get_loggers
 from pytz import timezone
 india_tz = timezone("Asia/Kolkata")
@@ -18,24 +17,33 @@ logger, trade_logger = get_loggers()
 class MockBroker(BaseBroker):
     def __init__(self, interval: str = "day", index: str = "nifty_50", use_cache: bool = True):
         self.use_cache = use_cache
-        self.cache_root = Path(__file__).resolve().parents[2] / "backtesting" / "ohlcv_archive"
         self.live_broker = KiteBroker()
         self.interval = interval
+        self._stores = {}
+
+    def _store(self, interval: Optional[str] = None) -> OhlcvStore:
+        interval = interval or self.interval
+        if interval not in self._stores:
+            self._stores[interval] = OhlcvStore(interval=interval)
+        return self._stores[interval]
+
+    def release_memory_maps(self):
+        """Unmap the store segments (reopened lazily) so pages read so far stop counting as resident."""
+        for store in self._stores.values():
+            store.close()
 
     def get_ltp(self, symbol: str) -> float:
     
         if self.use_cache:
-            file_path = self._locate_latest_file(symbol, interval=self.interval)
-            if file_path.exists():
-                df = pd.read_feather(file_path)
-                df["date"] = pd.to_datetime(df["date"])
-                df = df.sort_values("date")
+            store = self._store()
+            if symbol in store:
+                df = store.read(symbol, columns=["close"], start=store.last_date(symbol), date_index=True)
                 if not df.empty:
                     return df.iloc[-1]["close"]
                 else:
                     logger.warning(f"[MOCK][get_ltp] No data for {symbol}")
             else:
-                logger.warning(f"[MOCK][get_ltp] File not found for {symbol}")
+                logger.warning(f"[MOCK][get_ltp] {symbol} not in OHLCV store")
 
         return self.live_broker.get_ltp(symbol=symbol)
 
@@ -46,23 +54,23 @@ class MockBroker(BaseBroker):
         interval: str,
         days: int = None,
         from_date: datetime = None,
-        to_date: datetime = None
+        to_date: datetime = None,
+        columns: Optional[list] = None
     ):
+        """
+        Date-indexed candles from the memory-mapped store: only `columns` (default
+        all) between from_date and to_date are read, and numeric columns are
+        read-only views over the mapped file rather than copies.
+        """
         try:
             if self.use_cache:
-                file_path = self._locate_latest_file(symbol, interval)
-
-                if file_path is not None and file_path.exists():
-                    df = pd.read_feather(file_path)
-                    df = df.set_index("date").sort_index()
-                    df = df.sort_values("date")
-                    if from_date:
-                        df = df[df.index >= from_date]
-                    if to_date:
-                        df = df[df.index <= to_date]
+                store = self._store(interval)
+                if symbol in store:
+                    df = store.read(symbol, columns=columns, start=from_date, end=to_date, date_index=True)
                     if days and len(df) >= days:
                         df = df.iloc[-days:]
-                    return df.copy()
+                    return df
+                logger.warning(f"[MOCK] No cached data found for {symbol} with interval {interval}")
             # fallback to API
             return self.live_broker.fetch_candles(symbol, interval, 180)
         except Exception as e:
@@ -96,16 +104,3 @@ class MockBroker(BaseBroker):
     def get_symbols(self, index):
         """Return all symbol-token mappings for the current index."""
         return get_index_symbols(index)
-    
-    def _locate_latest_file(self, symbol: str, interval: Optional[str] = None):
-        interval = interval or self.interval
-        if interval == "day":
-            interval = "1d"
-        folder = self.cache_root / symbol
-        if not folder.exists():
-            return None
-        matches = sorted(folder.glob(f"{symbol}_{interval}_*.feather"))
-        if not matches:
-            logger.warning(f"[MOCK] No cached data found for {symbol} with interval {interval} in {folder}")
-            return None
-        return matches[-1] if matches else None
\ No newline at end of file
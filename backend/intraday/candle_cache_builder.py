@@ -9,13 +9,17 @@ if str(ROOT) not in sys.path:
 import os
 import time
 import pandas as pd
-from datetime import datetime, timedelta, time as dt_time
+from datetime import datetime, timedelta
 from typing import List, Optional
 from brokers.kite.kite_broker import KiteBroker
 from config.filters_setup import load_filters
 from config.logging_config import get_loggers
-from util.util import is_trading_day
-from services.indicator_enrichment_service import enrich_with_indicators_and_score
+from util.trading_calendar import get_trading_calendar
+from services.indicator_state import (
+    build_indicator_frame, append_candles, load_indicator_state, save_indicator_state, OHLCV_COLUMNS
+)
+from services.indicator_enrichment_service import LIVE_TAIL_ROWS
+from services.compact_frames import compact_enabled, compact_frame
 from util.cache_meta import load_cache_meta, update_cache_meta
 
 logger, _ = get_loggers()
@@ -37,27 +41,45 @@ def cache_path(symbol):
     return os.path.join(CACHE_DIR, f"{symbol}_{INTERVAL}.feather")
 
 
-def get_expected_last_candle_time() -> datetime:
-    now = datetime.now()
-
-    # Market hasn't opened yet today
-    if now.time() < dt_time(hour=9, minute=15):
-        current_date = now.date() - timedelta(days=1)
-        while not is_trading_day(current_date):
-            current_date -= timedelta(days=1)
-        return datetime.combine(current_date, dt_time(hour=15, minute=15))
-
-    # During market hours: calculate latest 15-min candle boundary
-    minutes = (now.minute // 15) * 15
-    expected = now.replace(minute=minutes, second=0, microsecond=0)
-
-    # Ensure we’re not expecting future candles during early hours on non-trading days
-    while not is_trading_day(expected.date()):
-        expected -= timedelta(days=1)
-        expected = expected.replace(hour=15, minute=15)
+def state_path(symbol):
+    return os.path.join(CACHE_DIR, f"{symbol}_{INTERVAL}.state.json")
 
-    return expected
 
+def get_expected_last_candle_time() -> datetime:
+    # Latest 15-min bar boundary during market hours, else the last bar of the previous session
+    return get_trading_calendar().expected_last_bar(datetime.now()).to_pydatetime()
+
+
+
+def trim_to_lookback(df: pd.DataFrame) -> pd.DataFrame:
+    """The date-indexed candles of the last LOOKBACK_DAYS trading days."""
+    last_date = df.index.max()
+    first_day = get_trading_calendar().offset_trading_days(last_date, -(LOOKBACK_DAYS - 1))
+    if last_date.tzinfo is not None:
+        first_day = first_day.tz_localize(last_date.tzinfo)
+    min_date = first_day + (last_date - last_date.normalize())
+    return df[df.index >= min_date]
+
+
+def merge_candles(df_old: pd.DataFrame, df_new: pd.DataFrame, state, config):
+    """
+    (state, frame) for the cached frame df_old plus the fetched candles df_new
+    (both with a naive 'date' column). With a state in sync with df_old only the
+    new candles are enriched and scored. Otherwise the candles are trimmed to
+    LOOKBACK_DAYS first and rebuilt from there, so a rebuild enriches exactly
+    the window it keeps. The frame is date-indexed and trimmed to LOOKBACK_DAYS.
+    """
+    if state is not None:
+        # Incremental: only candles after the last cached one are enriched/scored
+        df_new = df_new[df_new['date'] > state.last_timestamp].drop_duplicates(subset='date').sort_values(by='date')
+        df_new = df_new.set_index('date').between_time("09:15", "15:30")
+        df = append_candles(df_old.set_index('date'), df_new, state, config)
+    else:
+        df = pd.concat([df_old, df_new]).drop_duplicates(subset='date').sort_values(by='date')
+        df.set_index('date', inplace=True)
+        df = trim_to_lookback(df.between_time("09:15", "15:30"))
+        state, df = build_indicator_frame(df[OHLCV_COLUMNS], config, tail_rows=LIVE_TAIL_ROWS)
+    return state, trim_to_lookback(df)
 
 
 def fetch_and_update(symbol, broker, config) -> Optional[pd.DataFrame]:
@@ -71,11 +93,16 @@ def fetch_and_update(symbol, broker, config) -> Optional[pd.DataFrame]:
             logger.info(f"⏩ Skipping {symbol}: already has last candle {last_cached}")
             return pd.read_feather(path).set_index("date")
 
-    # Step 1: Load existing data
+    # Step 1: Load existing data (+ indicator state for incremental updates)
+    state = None
     if os.path.exists(path):
         df_old = pd.read_feather(path)
         df_old['date'] = pd.to_datetime(df_old['date']).dt.tz_localize(None)
         last_timestamp = df_old['date'].max() - timedelta(minutes=15)
+        state = load_indicator_state(state_path(symbol))
+        if state is not None and state.last_timestamp != df_old['date'].max():
+            logger.info(f"🔁 {symbol}: indicator state out of sync with cache, rebuilding")
+            state = None
     else:
         df_old = pd.DataFrame()
         last_timestamp = datetime.now() - timedelta(days=LOOKBACK_DAYS * 2)
@@ -102,27 +129,16 @@ def fetch_and_update(symbol, broker, config) -> Optional[pd.DataFrame]:
         if df_new is not None and not df_new.empty:
             df_new.reset_index(inplace=True)
             df_new['date'] = pd.to_datetime(df_new['date']).dt.tz_localize(None)
-            df = pd.concat([df_old, df_new]).drop_duplicates(subset='date').sort_values(by='date')
-            df.set_index('date', inplace=True)
-            df = df.between_time("09:15", "15:30")
-
-            # Step 3: Trim to last N trading days
-            last_date = df.index.max()
-            valid_days = []
-            while len(valid_days) < LOOKBACK_DAYS:
-                if is_trading_day(last_date):
-                    valid_days.append(last_date)
-                last_date -= timedelta(days=1)
-
-            min_date = min(valid_days)
-            df = df[df.index >= min_date]
-            df = enrich_with_indicators_and_score(df, config)
+
+            # Step 3: Enrich/score and trim to last N trading days
+            state, df = merge_candles(df_old, df_new, state, config)
 
             # Step 4: Save
             df = df.reset_index()
             if "level_0" in df.columns:
                 df.drop(columns=["level_0"], inplace=True)
             df.to_feather(path)
+            save_indicator_state(state, state_path(symbol))
             update_cache_meta(CACHE_DIR, symbol, df["date"].max())
             logger.info(f"✅ Updated: {symbol} ({len(df_new)} new candles, {len(df)} kept)")
             df.set_index("date", inplace=True)
@@ -136,13 +152,14 @@ def fetch_and_update(symbol, broker, config) -> Optional[pd.DataFrame]:
 def preload_intraday_cache(symbols: List[str], broker, config):
     cached_data = {}
     filtered_symbols = []
+    compact = compact_enabled(config)
 
     for symbol_obj in symbols:
         symbol = symbol_obj.get("symbol")
         df = fetch_and_update(symbol, broker, config)
 
         if df is not None and not df.empty:
-            cached_data[symbol] = df
+            cached_data[symbol] = compact_frame(df) if compact else df
             filtered_symbols.append(symbol_obj)
     return filtered_symbols, cached_data
 
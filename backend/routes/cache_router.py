@@ -4,9 +4,19 @@
 # @tags: router, api, cache
 from fastapi import APIRouter
 from jobs.refresh_instrument_cache import refresh_index_cache
+from services.enrichment_cache import ENRICHMENT_CACHE
 
 router = APIRouter()
 
 @router.post("/refresh-index-cache")
 def refresh_index_cache_route():
-    return refresh_index_cache()
\ No newline at end of file
+    return refresh_index_cache()
+
+@router.get("/enrichment-cache-stats")
+def enrichment_cache_stats_route():
+    return ENRICHMENT_CACHE.stats()
+
+@router.post("/clear-enrichment-cache")
+def clear_enrichment_cache_route():
+    ENRICHMENT_CACHE.clear()
+    return ENRICHMENT_CACHE.stats()
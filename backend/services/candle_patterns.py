@@ -0,0 +1,204 @@
+# @role: Detects the candle patterns used by entry/exit filters
+# @used_by: indicator_enrichment_service.py, indicator_state.py
+# @filter_type: utility
+# @tags: candle, pattern, technical, vectorized
+"""
+Candle pattern detection limited to the patterns the filters check
+(BULLISH_PATTERNS for entry, BEARISH_PATTERNS for exit).
+
+With TA-Lib installed the patterns come from pandas_ta's cdl_pattern for just
+those names; without it a pure-NumPy implementation of the same patterns is
+used. The first matching pattern per candle is picked with an argmax over a
+(candles x patterns) match matrix and stored as a categorical column whose
+labels are the filter names (e.g. "CDL_HAMMER").
+"""
+import numpy as np
+import pandas as pd
+from pandas_ta import cdl_pattern
+from services.filters.candle_pattern_filter import BULLISH_PATTERNS
+from services.filters.exit_pattern_breakdown_filter import BEARISH_PATTERNS
+from services.indicator_kernels import TALIB_AVAILABLE
+
+from config.logging_config import get_loggers
+logger, trade_logger = get_loggers()
+
+# Filter label -> (TA-Lib pattern name, signal sign TA-Lib uses for it)
+PATTERN_SPECS = {
+    "CDL_BULLISH_ENGULFING": ("engulfing", 1),
+    "CDL_HAMMER": ("hammer", 1),
+    "CDL_PIERCING": ("piercing", 1),
+    "CDL_MORNINGSTAR": ("morningstar", 1),
+    "CDL_THREE_WHITE_SOLDIERS": ("3whitesoldiers", 1),
+    "CDL_BEARISH_ENGULFING": ("engulfing", -1),
+    "CDL_DARKCLOUDCOVER": ("darkcloudcover", -1),
+    "CDL_EVENINGSTAR": ("eveningstar", -1),
+    "CDL_SHOOTINGSTAR": ("shootingstar", -1),
+    "CDL_HANGINGMAN": ("hangingman", -1),
+    "CDL_THREE_BLACK_CROWS": ("3blackcrows", -1),
+}
+
+# Priority order for "first matching pattern": bullish filters first
+PATTERN_LABELS = list(dict.fromkeys(BULLISH_PATTERNS + BEARISH_PATTERNS))
+
+# TA-Lib style candle settings
+AVG_PERIOD = 10
+NEAR_PERIOD = 5
+SHADOW_VERY_SHORT_FACTOR = 0.1
+NEAR_FACTOR = 0.2
+PIERCING_PENETRATION = 0.5
+STAR_PENETRATION = 0.3
+
+
+def _shift(values: np.ndarray, periods: int) -> np.ndarray:
+    out = np.full_like(values, np.nan)
+    if periods < len(values):
+        out[periods:] = values[:len(values) - periods]
+    return out
+
+
+def _prior_mean(values: np.ndarray, period: int, lag: int = 1) -> np.ndarray:
+    """
+    Mean of the `period` values ending `lag` candles before each candle (axis 0);
+    NaN wherever that window touches a NaN (e.g. panel padding before a listing).
+    """
+    pad = np.zeros((1,) + values.shape[1:])
+    csum = np.concatenate([pad, np.nancumsum(values, axis=0)])
+    count = np.concatenate([pad, np.cumsum(~np.isnan(values), axis=0)])
+    out = np.full(values.shape, np.nan)
+    end = np.arange(len(values)) - lag + 1
+    valid = end - period >= 0
+    out[valid] = (csum[end[valid]] - csum[end[valid] - period]) / period
+    out[valid] = np.where(count[end[valid]] - count[end[valid] - period] == period, out[valid], np.nan)
+    return out
+
+
+def _numpy_signals(o: np.ndarray, h: np.ndarray, l: np.ndarray, c: np.ndarray) -> dict:
+    """
+    Pure-NumPy approximations of the TA-Lib patterns; name -> signed int array.
+    Works along axis 0, so (candles,) or (candles, symbols) arrays can be passed.
+    """
+    body = np.abs(c - o)
+    rng = h - l
+    top = np.maximum(o, c)
+    bottom = np.minimum(o, c)
+    upper = h - top
+    lower = bottom - l
+    white = c > o
+    black = c < o
+
+    body_avg = _prior_mean(body, AVG_PERIOD)
+    range_avg = _prior_mean(rng, AVG_PERIOD)
+    near = NEAR_FACTOR * _prior_mean(rng, NEAR_PERIOD)
+    short_body = body < body_avg
+    long_body = body > body_avg
+    very_short_upper = upper < SHADOW_VERY_SHORT_FACTOR * range_avg
+    very_short_lower = lower < SHADOW_VERY_SHORT_FACTOR * range_avg
+
+    p = {name: _shift(arr, 1) for name, arr in
+         {"o": o, "h": h, "l": l, "c": c, "body": body, "top": top, "bottom": bottom}.items()}
+    p_white, p_black = _shift(white.astype(float), 1) == 1, _shift(black.astype(float), 1) == 1
+    p_long = _shift(long_body.astype(float), 1) == 1
+    pp = {name: _shift(arr, 2) for name, arr in {"c": c, "body": body, "top": top, "bottom": bottom}.items()}
+    pp_white, pp_black = _shift(white.astype(float), 2) == 1, _shift(black.astype(float), 2) == 1
+    pp_long = _shift(long_body.astype(float), 2) == 1
+    p_short = _shift(short_body.astype(float), 1) == 1
+
+    with np.errstate(invalid="ignore"):
+        engulf_bull = white & p_black & (c >= p["o"]) & (o <= p["c"]) & ((c > p["o"]) | (o < p["c"]))
+        engulf_bear = black & p_white & (o >= p["c"]) & (c <= p["o"]) & ((o > p["c"]) | (c < p["o"]))
+        umbrella = short_body & (lower > body) & very_short_upper
+        hammer = umbrella & (bottom <= p["l"] + near)
+        hangingman = umbrella & (bottom >= p["h"] - near)
+        shootingstar = short_body & (upper > body) & very_short_lower & (bottom > p["top"])
+        piercing = (p_black & p_long & white & long_body & (o < p["l"]) & (c < p["o"])
+                    & (c > p["c"] + p["body"] * PIERCING_PENETRATION))
+        darkcloud = (p_white & p_long & black & (o > p["h"]) & (c > p["o"])
+                     & (c < p["c"] - p["body"] * PIERCING_PENETRATION))
+        morningstar = (pp_black & pp_long & p_short & (p["top"] < pp["c"]) & white & (body > body_avg)
+                       & (c > pp["c"] + pp["body"] * STAR_PENETRATION))
+        eveningstar = (pp_white & pp_long & p_short & (p["bottom"] > pp["c"]) & black & (body > body_avg)
+                       & (c < pp["c"] - pp["body"] * STAR_PENETRATION))
+
+        p_very_short_upper = _shift(very_short_upper.astype(float), 1) == 1
+        pp_very_short_upper = _shift(very_short_upper.astype(float), 2) == 1
+        soldiers = (pp_white & p_white & white
+                    & (p["c"] > pp["c"]) & (c > p["c"])
+                    & (p["o"] > pp["bottom"]) & (p["o"] <= pp["top"])
+                    & (o > p["bottom"]) & (o <= p["top"])
+                    & pp_very_short_upper & p_very_short_upper & very_short_upper)
+
+        ppp_white = _shift(white.astype(float), 3) == 1
+        p_very_short_lower = _shift(very_short_lower.astype(float), 1) == 1
+        pp_very_short_lower = _shift(very_short_lower.astype(float), 2) == 1
+        crows = (ppp_white & pp_black & p_black & black
+                 & (p["c"] < pp["c"]) & (c < p["c"])
+                 & (p["o"] < pp["top"]) & (p["o"] > pp["bottom"])
+                 & (o < p["top"]) & (o > p["bottom"])
+                 & pp_very_short_lower & p_very_short_lower & very_short_lower)
+
+    to_signal = lambda mask, sign: np.where(mask, 100 * sign, 0)
+    return {
+        "engulfing": to_signal(engulf_bull, 1) + to_signal(engulf_bear, -1),
+        "hammer": to_signal(hammer, 1),
+        "hangingman": to_signal(hangingman, -1),
+        "shootingstar": to_signal(shootingstar, -1),
+        "piercing": to_signal(piercing, 1),
+        "darkcloudcover": to_signal(darkcloud, -1),
+        "morningstar": to_signal(morningstar, 1),
+        "eveningstar": to_signal(eveningstar, -1),
+        "3whitesoldiers": to_signal(soldiers, 1),
+        "3blackcrows": to_signal(crows, -1),
+    }
+
+
+def _talib_signals(df: pd.DataFrame, names: list) -> dict:
+    pattern_df = cdl_pattern(open_=df["open"], high=df["high"], low=df["low"], close=df["close"], name=names)
+    return {
+        name: pattern_df[f"CDL_{name.upper()}"].fillna(0).to_numpy()
+        for name in names if f"CDL_{name.upper()}" in pattern_df.columns
+    }
+
+
+def pattern_signals(df: pd.DataFrame, labels: list = PATTERN_LABELS) -> dict:
+    """Raw TA-Lib style signals (+100/-100/0) for the patterns behind `labels`."""
+    names = list(dict.fromkeys(PATTERN_SPECS[label][0] for label in labels))
+    signals = _talib_signals(df, names) if TALIB_AVAILABLE else {}
+    missing = [name for name in names if name not in signals]
+    if missing:
+        fallback = _numpy_signals(*(df[col].to_numpy(dtype=float) for col in ["open", "high", "low", "close"]))
+        signals.update({name: fallback[name] for name in missing})
+    return signals
+
+
+def pattern_codes(signals: dict, labels: list = PATTERN_LABELS) -> np.ndarray:
+    """Index into `labels` of the first matching pattern per candle (-1 = none), as int8."""
+    matches = np.stack([
+        np.sign(signals[PATTERN_SPECS[label][0]]) == PATTERN_SPECS[label][1] for label in labels
+    ], axis=-1)
+    return np.where(matches.any(axis=-1), matches.argmax(axis=-1), -1).astype(np.int8)
+
+
+def panel_pattern_codes(open_, high, low, close, labels: list = PATTERN_LABELS) -> np.ndarray:
+    """pattern_codes for (candles, symbols) arrays; NaN rows (not yet listed) get -1."""
+    if not TALIB_AVAILABLE:
+        return pattern_codes(_numpy_signals(open_, high, low, close), labels)
+
+    codes = np.full(close.shape, -1, dtype=np.int8)
+    for j in range(close.shape[1]):
+        listed = ~np.isnan(close[:, j])
+        ohlc = pd.DataFrame({"open": open_[listed, j], "high": high[listed, j],
+                             "low": low[listed, j], "close": close[listed, j]})
+        if len(ohlc):
+            codes[listed, j] = pattern_codes(pattern_signals(ohlc, labels), labels)
+    return codes
+
+
+def to_categorical(codes: np.ndarray, index, labels: list = PATTERN_LABELS) -> pd.Series:
+    return pd.Series(pd.Categorical.from_codes(codes, categories=labels), index=index, name="CANDLE_PATTERN")
+
+
+def detect_candle_patterns(df: pd.DataFrame, labels: list = PATTERN_LABELS) -> pd.Series:
+    """First matching pattern per candle (in `labels` order) as a categorical Series."""
+    if not len(df):
+        return to_categorical(np.zeros(0, dtype=np.int8), df.index, labels)
+    return to_categorical(pattern_codes(pattern_signals(df, labels), labels), df.index, labels)
@@ -0,0 +1,63 @@
+# @role: Compact in-memory dtype schema for enriched candle frames
+# @used_by: panel_enrichment.py, enrichment_cache.py, candle_cache_builder.py, memory_checks.py, parity_checks.py
+# @filter_type: utility
+# @tags: indicators, memory, dtypes, cache
+"""
+Opt-in (config "compact_dtypes": true) schema for enriched frames held in the
+candle caches:
+- indicator, CONTRIB_* and scorer-extra columns as float32; OHLC prices and
+  ENTRY_SCORE stay float64, since fills, PnL and score thresholds compare them
+  exactly
+- volume as uint32 (left as-is when a value does not fit)
+- CANDLE_PATTERN as a categorical
+- a legacy ENTRY_BREAKDOWN column (old archives and intraday caches) is
+  dropped; breakdowns are built on demand by entry_score_engine.breakdown_at
+"""
+import numpy as np
+import pandas as pd
+
+FLOAT64_COLUMNS = {"open", "high", "low", "close", "adj_close", "ENTRY_SCORE"}
+CATEGORY_COLUMNS = {"CANDLE_PATTERN"}
+DROPPED_COLUMNS = {"ENTRY_BREAKDOWN"}
+UINT32_MAX = np.iinfo(np.uint32).max
+
+
+def compact_enabled(config: dict) -> bool:
+    return bool((config or {}).get("compact_dtypes", False))
+
+
+def _compact_volume(values: pd.Series) -> pd.Series:
+    array = values.to_numpy()
+    if not np.issubdtype(array.dtype, np.number) or not len(array):
+        return values
+    if not np.all(np.isfinite(array)) or array.min() < 0 or array.max() > UINT32_MAX:
+        return values
+    if np.issubdtype(array.dtype, np.floating) and not np.all(array == np.floor(array)):
+        return values
+    return values.astype(np.uint32)
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """A copy of an enriched (and scored) frame in the compact schema."""
+    columns = {}
+    for col in df.columns:
+        values = df[col]
+        if col in DROPPED_COLUMNS:
+            continue
+        if col in FLOAT64_COLUMNS:
+            columns[col] = values
+        elif col == "volume":
+            columns[col] = _compact_volume(values)
+        elif col in CATEGORY_COLUMNS:
+            columns[col] = values.astype("category")
+        elif values.dtype == np.float64:
+            columns[col] = values.astype(np.float32)
+        else:
+            columns[col] = values
+    compact = pd.DataFrame(columns, index=df.index)
+    compact.attrs = dict(df.attrs)
+    return compact
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
@@ -0,0 +1,147 @@
+# @role: Process-wide LRU cache of enriched (and scored) candle frames
+# @used_by: entry_service.py, exit_service.py, suggestion_logic.py, cache_router.py
+# @filter_type: utility
+# @tags: indicators, cache, performance
+"""
+Memory-bounded LRU cache in front of enrich_with_indicators(_and_score).
+
+Entries are keyed by (symbol, interval, candle window, indicator-config hash,
+scoring mode). The candle window is the first/last candle timestamp and row
+count (the recursive indicators depend on where the window starts) plus the
+last candle's OHLCV, so a live candle that is still forming is re-enriched
+when it changes. Repeat calls on the same candles within a candle period (e.g.
+/stock-score asked again for a symbol, or exit checks on every tick) are
+served from memory. Calls only share an entry when every key part matches:
+/stock-score (scored, 180-day window) and /check-exit (enriched only, exit
+window) keep separate entries even for the same symbol.
+
+Batch paths enrich each frame once per run and persist it, so they stay off
+the cache: ohlcv_data_downloader.py (archive builds and appends),
+candle_cache_builder.py (IndicatorState appends) and panel_enrichment.py
+(backtest universes). The engines' EntryService/ExitService calls go through it.
+
+Frames are copied in and out, so callers can keep mutating what they get.
+With the config's compact_dtypes flag they are held (and returned) in the
+compact_frames schema.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+import pandas as pd
+from services.indicator_enrichment_service import enrich_with_indicators, enrich_with_indicators_and_score
+from services.indicator_registry import resolve_indicators
+from services.compact_frames import compact_enabled, compact_frame
+
+from config.logging_config import get_loggers
+logger, trade_logger = get_loggers()
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def _frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _candle_window(df: pd.DataFrame) -> tuple:
+    """First/last timestamp, row count and the last candle's OHLCV (it may still be forming)."""
+    dates = df["date"] if "date" in df.columns else df.index.to_series()
+    last = tuple(float(df[col].iloc[-1]) for col in ["open", "high", "low", "close", "volume"] if col in df.columns)
+    return str(dates.iloc[0]), str(dates.iloc[-1]), len(df), last
+
+
+def indicator_config_hash(config: dict = None, scored: bool = False) -> str:
+    """Hash of the config parts that shape the enriched (and scored) output."""
+    config = config or {}
+    parts = {
+        "indicators": resolve_indicators(config) if config else None,
+        "use_indicator_kernels": config.get("use_indicator_kernels", False),
+        "compact_dtypes": compact_enabled(config),
+    }
+    if scored:
+        parts["entry_filters"] = config.get("entry_filters")
+        parts["late_entry_penalty"] = config.get("late_entry_penalty")
+    return hashlib.md5(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class EnrichmentCache:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0].copy()
+
+    def put(self, key, df: pd.DataFrame):
+        size = _frame_bytes(df)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (df.copy(), size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+ENRICHMENT_CACHE = EnrichmentCache()
+
+
+def _cached(symbol: str, interval: str, df: pd.DataFrame, config: dict, mode, compute) -> pd.DataFrame:
+    if df is None or df.empty or not symbol:
+        return compact_frame(compute()) if compact_enabled(config) else compute()
+    key = (symbol, interval, _candle_window(df), indicator_config_hash(config, scored=mode != "enrich"), mode)
+    cached = ENRICHMENT_CACHE.get(key)
+    if cached is not None:
+        logger.debug(f"♻️ Enrichment cache hit for {symbol}@{interval}")
+        return cached
+    result = compute()
+    if compact_enabled(config):
+        result = compact_frame(result)
+    ENRICHMENT_CACHE.put(key, result)
+    return result
+
+
+def cached_enrich(df: pd.DataFrame, config: dict, symbol: str, interval: str = "day") -> pd.DataFrame:
+    """enrich_with_indicators through the process-wide cache."""
+    return _cached(symbol, interval, df, config, "enrich", lambda: enrich_with_indicators(df, config))
+
+
+def cached_enrich_and_score(df: pd.DataFrame, config: dict, symbol: str, interval: str = "day",
+                            tail_rows: int = None) -> pd.DataFrame:
+    """enrich_with_indicators_and_score through the process-wide cache."""
+    return _cached(symbol, interval, df, config, ("score", tail_rows),
+                   lambda: enrich_with_indicators_and_score(df, config, tail_rows))
@@ -0,0 +1,61 @@
+# @role: Column-wise entry candidate masks and suggestion ranking keys
+# @used_by: entry_service.py, signal_engine.py, candidate_index.py
+# @filter_type: logic
+# @tags: entry, prefilter, vectorized, backtest
+"""
+evaluate_symbol's per-symbol gates for every row of a scored frame at once
+(row i read as the latest candle of an as-of view): the prefilter on average
+volume, price band and ATR%, the strategy's hard filters, and the fields the
+suggestion dict needs. Together with the tie-breaker keys this reproduces
+EntryService.get_suggestions for any date from precomputed columns.
+"""
+import numpy as np
+import pandas as pd
+
+# get_suggestions returns at most this many suggestions per call
+SUGGESTION_LIMIT = 12
+# Columns evaluate_symbol reads unguarded when building a suggestion
+SUGGESTION_COLUMNS = ["ADX_14", "DMP_14", "DMN_14", "RSI", "MACD", "MACD_SIGNAL", "close", "volume", "ENTRY_SCORE"]
+
+
+def _col(df: pd.DataFrame, name: str) -> np.ndarray:
+    if name not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=float)
+
+
+def prefilter_mask(df: pd.DataFrame, config: dict) -> np.ndarray:
+    """Rows passing evaluate_symbol's prefilter (every row with enable_soft_prefilter)."""
+    if config.get("enable_soft_prefilter"):
+        return np.ones(len(df), dtype=bool)
+    close, atr = _col(df, "close"), _col(df, "ATR")
+    avg_volume = (df["volume"].astype(float).rolling(20).mean().to_numpy()
+                  if "volume" in df.columns else np.zeros(len(df)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        atr_pct = np.where((atr != 0) & (close != 0), atr / close * 100, 0)
+    low_volume = avg_volume < config.get("min_volume")
+    outside_price = ~((config.get("min_price") <= close) & (close <= config.get("max_price")))
+    low_atr = atr_pct < config.get("min_atr_pct")
+    return ~(low_volume | outside_price | low_atr)
+
+
+def candidate_mask(df: pd.DataFrame, config: dict, strategy) -> np.ndarray:
+    """
+    Rows evaluate_symbol would turn into a suggestion: prefilter, hard filters,
+    the suggestion columns present, a volume int() accepts and a finite score
+    (NaN-score rows never clear minimum_entry_score).
+    """
+    if any(col not in df.columns for col in SUGGESTION_COLUMNS):
+        return np.zeros(len(df), dtype=bool)
+    usable = np.isfinite(_col(df, "volume")) & np.isfinite(_col(df, "ENTRY_SCORE"))
+    return usable & prefilter_mask(df, config) & strategy.hard_filter_mask(df)
+
+
+def ranking_keys(df: pd.DataFrame) -> dict:
+    """EntryService.tie_breaker fields per row, rounded the way evaluate_symbol rounds them."""
+    return {
+        "score": _col(df, "ENTRY_SCORE"),
+        "adx": np.round(_col(df, "ADX_14"), 2),
+        "rsi_distance": np.abs(np.round(_col(df, "RSI"), 2) - 50),
+        "volume": np.trunc(_col(df, "volume")),
+    }
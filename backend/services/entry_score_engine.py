@@ -0,0 +1,401 @@
+# @role: Column-wise entry scoring engine (whole history in one pass)
+# @used_by: indicator_enrichment_service.py, entry_service.py, suggestion_logic.py, signal_engine.py, walk_forward.py
+# @filter_type: logic
+# @tags: technical, entry, scoring, vectorized
+"""
+Vectorized twin of technical_analysis.calculate_score.
+
+Every entry filter is evaluated as a whole-column NumPy/pandas expression, so
+scoring N candles costs a handful of array ops instead of N calls that each
+re-run rolling windows over a growing prefix. The per-filter rules (including
+the truthiness checks, rounding and the order the score is accumulated in)
+mirror calculate_score exactly, so ENTRY_SCORE and the breakdowns
+explain_entry_rows builds match the per-row path row for row.
+"""
+import numpy as np
+import pandas as pd
+from services.filters.candle_pattern_filter import BULLISH_PATTERNS
+
+from config.logging_config import get_loggers
+logger, trade_logger = get_loggers()
+
+SATURATION_SCORE = 20
+SATURATION_MIN_FILTERS = 7
+# Earlier candles a row's score can read: breakout_ready averages BB width over
+# 10 candles (9 before the row); the RSI / MACD_HIST slopes need 3 diffs
+SCORE_CONTEXT = 9
+
+# Per-filter contribution columns: the pre-weight signal of each filter
+# (NaN where it did not fire), so a weight-only config change rescores as
+# round2(signal * weight) summed per row instead of a full recomputation.
+CONTRIB_DTYPE = np.float32
+# Filter -> [(column part, weight path in the config)], in breakdown order; a
+# None path is a fixed weight of 1 (the signal carries it)
+CONTRIBUTION_SPECS = {
+    "adx": [("", ("entry_filters", "adx", "weight"))],
+    "rsi": [("", ("entry_filters", "rsi", "weight"))],
+    "rsi_above_avg": [("", ("entry_filters", "rsi_above_avg", "weight"))],
+    "macd": [("", ("entry_filters", "macd", "weight"))],
+    "bb": [("", ("entry_filters", "bb", "weight"))],
+    "dmp_dmn": [("", ("entry_filters", "dmp_dmn", "weight"))],
+    "price_sma": [("", ("entry_filters", "price_sma", "weight"))],
+    "obv": [("", ("entry_filters", "obv", "weight"))],
+    "atr": [("", ("entry_filters", "atr", "weight"))],
+    "stochastic": [("", ("entry_filters", "stochastic", "weight"))],
+    "stochastic_overbought": [("", None)],
+    "candle_pattern": [("", ("entry_filters", "candle_pattern", "weight"))],
+    "fibonacci_support": [("", ("entry_filters", "fibonacci_support", "weight"))],
+    "volume_surge": [("", ("entry_filters", "volume_surge", "weight"))],
+    "rsi_slope": [("", ("entry_filters", "rsi_slope", "weight"))],
+    "breakout_ready": [
+        ("BB", ("entry_filters", "breakout_ready", "bb_weight")),
+        ("RSI", ("entry_filters", "breakout_ready", "rsi_weight")),
+        ("MACD", ("entry_filters", "breakout_ready", "macd_weight")),
+    ],
+    "late_entry_penalty": [("", ("late_entry_penalty", "penalty_score"))],
+}
+
+
+def contribution_column(name: str, part: str = "") -> str:
+    return f"CONTRIB_{name.upper()}" + (f"_{part}" if part else "")
+
+
+def _col(df: pd.DataFrame, name: str) -> np.ndarray:
+    """Column as float array; missing columns and None values become NaN."""
+    if name not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=float)
+
+
+def _truthy(values: np.ndarray) -> np.ndarray:
+    # Mirrors `if value:` on a float — NaN is truthy, 0 is not.
+    return values != 0
+
+
+def _round2(values) -> np.ndarray:
+    return np.round(values, 2)
+
+
+def _normalized(values: np.ndarray, min_val, max_val) -> np.ndarray:
+    """(values - min) / (max - min) clipped to [0, 1]; 0 for an empty range."""
+    span = np.asarray(max_val, dtype=float) - min_val
+    with np.errstate(divide="ignore", invalid="ignore"):
+        normalized = np.clip((values - min_val) / span, 0.0, 1.0)
+    return np.where(span == 0, 0.0, normalized)
+
+
+def _weighted(values: np.ndarray, min_val, max_val, weight) -> np.ndarray:
+    """Array form of technical_analysis.calculate_weighted_score."""
+    return _round2(_normalized(values, min_val, max_val) * weight)
+
+
+def _rolling_slope(df: pd.DataFrame, name: str, window: int = 3) -> np.ndarray:
+    return df[name].astype(float).diff().rolling(window).mean().to_numpy()
+
+
+def compute_entry_filters(df: pd.DataFrame, config: dict):
+    """
+    Evaluate every enabled entry filter over the whole frame.
+
+    Returns (filters, extras): filters is an ordered list of
+    (name, fired_mask, weights, details_fn) in calculate_score's breakdown
+    order; extras maps extra column names to arrays.
+    """
+    filters_cfg = config.get("entry_filters", {})
+    n = len(df)
+    filters = []
+    extras = {}
+
+    def is_enabled(name):
+        return (filters_cfg.get(name) or {}).get("enabled")
+
+    def add(name, fired, weights, details, signal=1.0):
+        weights = np.broadcast_to(np.asarray(weights), (n,))
+        filters.append((name, fired, weights, details))
+        if name != "breakout_ready":
+            extras[contribution_column(name)] = np.where(fired, signal, np.nan).astype(CONTRIB_DTYPE)
+
+    rsi = _col(df, "RSI")
+    macd = _col(df, "MACD")
+
+    if is_enabled("adx"):
+        fcfg = filters_cfg["adx"]
+        adx = _col(df, "ADX_14")
+        fired = _truthy(adx) & (adx >= fcfg["min"]) & (adx <= fcfg["max"])
+        add("adx", fired, _weighted(adx, fcfg["min"], fcfg["max"], fcfg["weight"]),
+            lambda i: {"adx": adx[i]}, _normalized(adx, fcfg["min"], fcfg["max"]))
+
+    if is_enabled("rsi"):
+        fcfg = filters_cfg["rsi"]
+        fired = _truthy(rsi) & (rsi >= fcfg["min"]) & (rsi <= fcfg["max"])
+        add("rsi", fired, _weighted(rsi, fcfg["min"], fcfg["max"], fcfg["weight"]),
+            lambda i: {"rsi": rsi[i]}, _normalized(rsi, fcfg["min"], fcfg["max"]))
+
+    if is_enabled("rsi_above_avg"):
+        avg_rsi = _col(df, "AVG_RSI")
+        fired = _truthy(rsi) & _truthy(avg_rsi) & (rsi > avg_rsi)
+        add("rsi_above_avg", fired, filters_cfg["rsi_above_avg"]["weight"],
+            lambda i: {"rsi": rsi[i], "avg_rsi": avg_rsi[i]})
+
+    if is_enabled("macd"):
+        fcfg = filters_cfg["macd"]
+        signal = _col(df, "MACD_SIGNAL")
+        cap = fcfg.get("cap", 30)
+        gap = macd - signal
+        fired = _truthy(macd) & _truthy(signal) & (macd > signal) & (macd >= fcfg.get("min", 0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            strength = np.minimum(gap / cap, 1.0)
+        add("macd", fired, _round2(strength * fcfg["weight"]),
+            lambda i: {"macd": macd[i], "macd_signal": signal[i], "gap": gap[i], "cap": cap}, strength)
+
+    if is_enabled("bb"):
+        fcfg = filters_cfg["bb"]
+        bb_val = _col(df, "BB_%B")
+        mid = _col(df, "BB_MIDDLE")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            width = np.where(_truthy(mid), ((_col(df, "BB_UPPER") - _col(df, "BB_LOWER")) / mid) * 100, 0.0)
+        fired = _truthy(bb_val) & (bb_val >= fcfg["lower"]) & (bb_val <= fcfg["upper"]) & (width >= fcfg["width_min"])
+        add("bb", fired, fcfg["weight"], lambda i: {"%B": bb_val[i], "width": width[i]})
+
+    if is_enabled("dmp_dmn"):
+        fcfg = filters_cfg["dmp_dmn"]
+        dmp = _col(df, "DMP_14")
+        dmn = _col(df, "DMN_14")
+        fired = _truthy(dmp) & _truthy(dmn) & (dmp > dmn) & ((dmp - dmn) <= fcfg["gap_max"])
+        add("dmp_dmn", fired, fcfg["weight"],
+            lambda i: {"dmp": dmp[i], "dmn": dmn[i], "gap": dmp[i] - dmn[i]})
+
+    if is_enabled("price_sma"):
+        fcfg = filters_cfg["price_sma"]
+        close = _col(df, "close")
+        sma = _col(df, "SMA_50")
+        fired = _truthy(close) & _truthy(sma) & (close > sma)
+        if fcfg.get("gap_max"):
+            fired &= (close - sma) <= fcfg["gap_max"]
+        add("price_sma", fired, fcfg["weight"], lambda i: {"close": close[i], "sma50": sma[i]})
+
+    if is_enabled("obv"):
+        fcfg = filters_cfg["obv"]
+        obv = _col(df, "OBV")
+        fired = _truthy(obv) & (obv > fcfg["min"])
+        add("obv", fired, fcfg["weight"], lambda i: {"obv": obv[i]})
+
+    if is_enabled("atr"):
+        fcfg = filters_cfg["atr"]
+        atr = _col(df, "ATR")
+        fired = _truthy(atr) & (atr > fcfg["min"])
+        if fcfg.get("max"):
+            fired &= atr < fcfg["max"]
+        add("atr", fired, _weighted(atr, fcfg["min"], fcfg["max"], fcfg["weight"]),
+            lambda i: {"atr": atr[i]}, _normalized(atr, fcfg["min"], fcfg["max"]))
+
+    if is_enabled("stochastic"):
+        fcfg = filters_cfg["stochastic"]
+        k = _col(df, "STOCHASTIC_K")
+        d = _col(df, "STOCHASTIC_D")
+        fired = _truthy(k) & _truthy(d) & (k > d) & (k > fcfg["threshold"])
+        add("stochastic", fired, fcfg["weight"], lambda i: {"%K": k[i], "%D": d[i]})
+        add("stochastic_overbought", fired & (k > fcfg.get("penalty_above", 100)), -1,
+            lambda i: {"%K": k[i]}, -1.0)
+
+    if is_enabled("candle_pattern") and "CANDLE_PATTERN" in df.columns:
+        fired = df["CANDLE_PATTERN"].isin(BULLISH_PATTERNS).to_numpy()
+        add("candle_pattern", fired, filters_cfg["candle_pattern"]["weight"], lambda i: {"match": True})
+
+    if is_enabled("fibonacci_support") and "fibonacci_levels" in df.columns:
+        fired = np.array([bool(v) for v in df["fibonacci_levels"]], dtype=bool)
+        add("fibonacci_support", fired, filters_cfg["fibonacci_support"]["weight"], lambda i: {"in_zone": True})
+
+    if is_enabled("volume_surge"):
+        fcfg = filters_cfg["volume_surge"]
+        vol = _col(df, "volume")
+        vol_avg = _col(df, "VOLUME_AVG")
+        has_ratio = _truthy(vol) & _truthy(vol_avg)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(has_ratio, vol / vol_avg, np.nan)
+        if has_ratio.any():
+            extras["volume_ratio"] = ratio
+        surge_factor = fcfg.get("surge_factor")
+        strength = np.minimum((ratio - surge_factor) / surge_factor, 1.0)
+        vol_values = df["volume"].tolist() if "volume" in df.columns else [None] * n
+        add("volume_surge", has_ratio & (ratio >= surge_factor), _round2(strength * fcfg["weight"]),
+            lambda i: {"volume": vol_values[i], "avg_volume": vol_avg[i], "ratio": ratio[i]}, strength)
+
+    if is_enabled("rsi_slope"):
+        fcfg = filters_cfg["rsi_slope"]
+        slope = _rolling_slope(df, "RSI")
+        fired = (slope >= fcfg["min"]) & (slope <= fcfg["max"])
+        add("rsi_slope", fired, _weighted(slope, fcfg["min"], fcfg["max"], fcfg["weight"]),
+            lambda i: {"slope": slope[i]}, _normalized(slope, fcfg["min"], fcfg["max"]))
+
+    if is_enabled("breakout_ready"):
+        fcfg = filters_cfg["breakout_ready"]
+        bb_width = (df["BB_UPPER"].astype(float) - df["BB_LOWER"].astype(float)) / df["BB_MIDDLE"].astype(float)
+        bb_avg = bb_width.rolling(10).mean().to_numpy()
+        bb_now = bb_width.to_numpy()
+        rsi_slope = _rolling_slope(df, "RSI")
+        macd_hist_slope = _rolling_slope(df, "MACD_HIST")
+
+        squeeze = bb_avg * fcfg.get("bb_squeeze_factor")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bb_signal = np.where(bb_now < squeeze, 1 - bb_now / squeeze, 0.0)
+        rsi_signal = np.where(
+            (rsi_slope > fcfg["rsi_slope_min"]) & (rsi_slope < fcfg["rsi_slope_max"]),
+            _normalized(rsi_slope, fcfg["rsi_slope_min"], fcfg["rsi_slope_max"]),
+            0.0,
+        )
+        macd_max = fcfg.get("macd_hist_slope_max", macd_hist_slope + 1)
+        macd_hist_signal = np.where(
+            macd_hist_slope > fcfg["macd_hist_slope_min"],
+            _normalized(macd_hist_slope, fcfg["macd_hist_slope_min"], macd_max),
+            0.0,
+        )
+        bb_weight = _round2(bb_signal * fcfg["bb_weight"])
+        rsi_weight = _round2(rsi_signal * fcfg["rsi_weight"])
+        macd_weight = _round2(macd_hist_signal * fcfg["macd_weight"])
+        for part, part_signal in (("BB", bb_signal), ("RSI", rsi_signal), ("MACD", macd_hist_signal)):
+            extras[contribution_column("breakout_ready", part)] = part_signal.astype(CONTRIB_DTYPE)
+        total_weight = _round2(bb_weight + rsi_weight + macd_weight)
+        extras["breakout_ready"] = total_weight
+        add("breakout_ready", total_weight > 0, total_weight,
+            lambda i: {"bb": bb_weight[i], "rsi": rsi_weight[i], "macd_hist": macd_weight[i]})
+
+    lep_cfg = config.get("late_entry_penalty")
+    fired = (_truthy(rsi) & (rsi > lep_cfg.get("rsi_above"))) | (_truthy(macd) & (macd > lep_cfg.get("macd_above")))
+    add("late_entry_penalty", fired, lep_cfg.get("penalty_score"), lambda i: {"rsi": rsi[i], "macd": macd[i]})
+
+    return filters, extras
+
+
+def _details(values: dict) -> dict:
+    # Plain Python scalars so breakdowns stay json-serializable like the per-row path.
+    return {k: v.item() if isinstance(v, np.generic) else v for k, v in values.items()}
+
+
+def _accumulate(filters: list, n: int):
+    score = np.zeros(n)
+    fired_count = np.zeros(n, dtype=int)
+    for _, fired, weights, _ in filters:
+        score = score + np.where(fired, weights, 0.0)
+        fired_count += fired
+    saturated = (score >= SATURATION_SCORE) & (fired_count >= SATURATION_MIN_FILTERS)
+    return np.where(saturated, 0.0, score), saturated
+
+
+def score_entry_frame(df: pd.DataFrame, config: dict, symbol: str = ""):
+    """
+    Score every row of an enriched frame in one pass.
+
+    Returns (scores, extras) — the column-wise equivalent of calling
+    calculate_score on each row with full_df=df.iloc[:i+1]. No breakdowns are
+    built: the CONTRIB_* extras carry each filter's part numerically and
+    explain_entry_rows materializes breakdowns for the rows a caller returns.
+    """
+    n = len(df)
+    try:
+        filters, extras = compute_entry_filters(df, config)
+    except Exception as e:
+        logger.exception(f"❌ Error calculating scores for {symbol}: {e}")
+        return np.zeros(n), {}
+    score, _ = _accumulate(filters, n)
+    return score, extras
+
+
+def score_entry_tail(df: pd.DataFrame, config: dict, tail_rows: int = 1, symbol: str = ""):
+    """
+    score_entry_frame for the last `tail_rows` rows only, evaluated over just
+    SCORE_CONTEXT extra candles of history. Same (scores, extras) shape,
+    covering the tail rows.
+    """
+    keep = min(max(tail_rows, 0), len(df))
+    start = max(len(df) - keep - SCORE_CONTEXT, 0)
+    scores, extras = score_entry_frame(df.iloc[start:], config, symbol)
+    skip = len(scores) - keep
+    return scores[skip:], {key: values[skip:] for key, values in extras.items()}
+
+
+def explain_entry_rows(df: pd.DataFrame, config: dict, rows, symbol: str = "") -> list:
+    """
+    Breakdowns ([{filter, weight, details}], as calculate_score builds them)
+    for the given row positions of an enriched frame, in the order given. Only
+    the candles those rows can read are re-evaluated, and dicts are built for
+    those rows alone.
+    """
+    n = len(df)
+    rows = [row + n if row < 0 else row for row in rows]
+    if not rows:
+        return []
+    start = max(min(rows) - SCORE_CONTEXT, 0)
+    window = df.iloc[start:max(rows) + 1]
+    try:
+        filters, _ = compute_entry_filters(window, config)
+    except Exception as e:
+        logger.exception(f"❌ Error explaining scores for {symbol}: {e}")
+        return [[] for _ in rows]
+    _, saturated = _accumulate(filters, len(window))
+
+    breakdowns = []
+    for row in rows:
+        i = row - start
+        if saturated[i]:
+            breakdowns.append([{"filter": "signal_blocked", "weight": 0, "details": {"reason": "Signal saturation"}}])
+            continue
+        breakdowns.append([
+            {"filter": name, "weight": weights[i].item(), "details": _details(details(i))}
+            for name, fired, weights, details in filters if fired[i]
+        ])
+    return breakdowns
+
+
+def breakdown_at(df: pd.DataFrame, config: dict, row: int = -1, symbol: str = "") -> list:
+    """explain_entry_rows for a single row (the latest candle by default)."""
+    return explain_entry_rows(df, config, [row], symbol)[0]
+
+
+def _config_weight(config: dict, path) -> float:
+    if path is None:
+        return 1.0
+    value = config
+    for key in path:
+        value = (value or {}).get(key)
+    return float(value)
+
+
+def reweight_contributions(contributions: dict, config: dict, shape):
+    """
+    reweight_entry_score over arrays of any `shape` (e.g. sessions x symbols):
+    contributions maps CONTRIB_* column names to arrays of that shape.
+    """
+    score = np.zeros(shape)
+    fired_count = np.zeros(shape, dtype=int)
+    filter_weights = {}
+    for name, parts in CONTRIBUTION_SPECS.items():
+        columns = [(contribution_column(name, part), path) for part, path in parts]
+        if not all(col in contributions for col, _ in columns):
+            continue
+        weights = sum(
+            _round2(np.asarray(contributions[col], dtype=np.float64) * _config_weight(config, path))
+            for col, path in columns
+        )
+        if name == "breakout_ready":
+            weights = _round2(weights)
+            weights = np.where(weights > 0, weights, np.nan)
+        fired = ~np.isnan(weights)
+        score = score + np.where(fired, weights, 0.0)
+        fired_count += fired
+        filter_weights[name] = weights
+
+    saturated = (score >= SATURATION_SCORE) & (fired_count >= SATURATION_MIN_FILTERS)
+    return np.where(saturated, 0.0, score), filter_weights, saturated
+
+
+def reweight_entry_score(df: pd.DataFrame, config: dict):
+    """
+    ENTRY_SCORE from stored CONTRIB_* columns and the weights in `config`:
+    per filter round2(sum(signal * weight)), summed with the saturation rule.
+    Returns (scores, filter_weights, saturated) where filter_weights maps each
+    filter to its per-row weight (NaN where it did not fire), in breakdown order.
+    """
+    contributions = {col: df[col].to_numpy(dtype=np.float64) for col in df.columns
+                     if str(col).startswith("CONTRIB_")}
+    return reweight_contributions(contributions, config, len(df))
@@ -7,10 +7,14 @@ import pandas as pd
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from services.strategies.strategy_factory import get_strategy
-from services.indicator_enrichment_service import enrich_with_indicators_and_score
+from services.indicator_enrichment_service import LIVE_TAIL_ROWS
+from services.enrichment_cache import cached_enrich_and_score
+from services.entry_score_engine import breakdown_at
+from services.entry_candidates import SUGGESTION_LIMIT
 from exceptions.exceptions import InvalidTokenException, DataUnavailableException
 from config.logging_config import get_loggers
 from brokers.mock.mock_broker import MockBroker
+from brokers.mock.backtest_data_context import BacktestDataContext
 from util.diagnostic_report_generator import diagnostics_tracker
 
 logger, trade_logger = get_loggers()
@@ -26,14 +30,15 @@ def evaluate_symbol(item, config, candle_cache, as_of_date, strategy):
 
         #usually for live treading and get single stock suggestion
         if "RSI" not in df.columns or "ADX_14" not in df.columns:
-            df = enrich_with_indicators_and_score(df, config=config)
+            df = cached_enrich_and_score(df, config, symbol, config.get("interval", "day"), tail_rows=LIVE_TAIL_ROWS)
             df.set_index("date", inplace=True)
 
         as_of_date = as_of_date.replace(tzinfo=None)
         if hasattr(df.index, 'tz') and df.index.tz is not None:
             df.index = df.index.tz_convert(None)
 
-        df = df[df.index <= as_of_date]
+        if df.index[-1] > as_of_date:
+            df = df[df.index <= as_of_date]
         if len(df) < 1:
             return None
 
@@ -81,8 +86,7 @@ def evaluate_symbol(item, config, candle_cache, as_of_date, strategy):
             return None
 
         score = latest.get("ENTRY_SCORE")
-        breakdown = latest.get("ENTRY_BREAKDOWN", [])
-        logger.info(f"Scored {symbol}: {score:.2f} | Breakdown: {breakdown}")
+        logger.info(f"Scored {symbol}: {score:.2f}")
 
         elapsed_ms = (time.perf_counter() - symbol_start) * 1000
         logger.debug("Processed %s in %.1fms, score=%.2f", symbol, elapsed_ms, score)
@@ -102,9 +106,10 @@ def evaluate_symbol(item, config, candle_cache, as_of_date, strategy):
             "atr": round(float(latest.get("ATR", 0)), 2),
             "stop_loss": round(latest["close"] * 0.97, 2),
             "score": float(score) if score is not None else 0.0,
-            "breakdown": breakdown,
             "close": round(float(latest["close"]), 2),
             "volume": int(latest["volume"]),
+            # Scored frame, popped by get_suggestions once the breakdown is (or is not) needed
+            "_frame": df,
         }
 
     except InvalidTokenException:
@@ -128,12 +133,18 @@ class EntryService:
         self.strategy = get_strategy(strategy, config)
 
         # Auto-adjust thread count for real brokers to avoid API throttling
-        if isinstance(data_provider, MockBroker):
+        if isinstance(data_provider, (MockBroker, BacktestDataContext)):
             self.max_workers = 20
         else:
             self.max_workers = 1
 
-    def get_suggestions(self, as_of_date: datetime = None) -> list:
+    def get_suggestions(self, as_of_date: datetime = None, candle_cache_override: dict = None) -> list:
+        """
+        candle_cache_override: pre-enriched, date-indexed frames keyed by symbol
+        (e.g. panel_enrichment.build_candle_cache) used instead of preloading.
+        With a BacktestDataContext as data provider its as-of views are used
+        (only its candidate symbols for the day when it has a candidate index).
+        """
         if as_of_date is None:
             as_of_date = datetime.now()
         start_all = time.perf_counter()
@@ -142,7 +153,14 @@ class EntryService:
 
         symbols = self.data_provider.get_symbols(self.index) or []
         
-        filtered_symbols, candle_cache = self.strategy.preload_and_filter_symbols(symbols, self.data_provider, self.config, as_of_date)
+        if candle_cache_override is None and isinstance(self.data_provider, BacktestDataContext):
+            candle_cache_override = self.data_provider.as_of_frames(as_of_date, candidates_only=True)
+
+        if candle_cache_override is not None:
+            candle_cache = candle_cache_override
+            filtered_symbols = [item for item in symbols if item.get("symbol") in candle_cache]
+        else:
+            filtered_symbols, candle_cache = self.strategy.preload_and_filter_symbols(symbols, self.data_provider, self.config, as_of_date)
         logger.info("Preloaded and filtered %d symbols", len(filtered_symbols))
 
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
@@ -157,7 +175,13 @@ class EntryService:
                     suggestions.append(result)
 
         suggestions.sort(key=self.tie_breaker)
-        top_n = suggestions[:12]
+        top_n = suggestions[:SUGGESTION_LIMIT]
+        # Breakdowns are only materialized for the suggestions actually returned
+        for rank, suggestion in enumerate(suggestions):
+            frame = suggestion.pop("_frame")
+            if rank < len(top_n):
+                suggestion["breakdown"] = breakdown_at(frame, self.config, symbol=suggestion["symbol"])
+                logger.info(f"Breakdown {suggestion['symbol']}: {suggestion['breakdown']}")
         total_time = (time.perf_counter() - start_all)
         logger.info(
             "Completed get_suggestions: %d out of %d symbols, returned %d suggestions in %.2fs",
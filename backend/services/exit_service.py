@@ -10,7 +10,7 @@ from config.logging_config import get_loggers
 from services.technical_analysis_exit import evaluate_exit
 from util.diagnostic_report_generator import diagnostics_tracker
 from exceptions.exceptions import OrderPlacementException
-from services.indicator_enrichment_service import enrich_with_indicators
+from services.enrichment_cache import cached_enrich
 from services.technical_analysis import calculate_score
 from util.util import calculate_dynamic_exit_threshold
 india_tz = pytz_timezone("Asia/Kolkata")
@@ -45,7 +45,7 @@ class ExitService:
         df["date"] = pd.to_datetime(df["date"])
         df = df.sort_index()
         df = df[df["date"] <= current_date] 
-        df = enrich_with_indicators(df)
+        df = cached_enrich(df, self.config, symbol)
 
         # 🎯 Profit Target Escalation Logic
         if self.config.get("profit_target_escalation").get("enabled", False):
@@ -176,7 +176,7 @@ class ExitService:
 
         latest = df.iloc[-1]
 
-        entry_score_at_exit, _ = calculate_score(latest, self.config, symbol=symbol)
+        entry_score_at_exit, _, _ = calculate_score(latest, self.config, symbol=symbol)
         entry_score = stock.get("score", 0) if isinstance(stock, dict) else 0
         entry_score_drop = entry_score - entry_score_at_exit
         entry_score_drop_pct = round((entry_score_drop / entry_score) * 100, 2) if entry_score else 0
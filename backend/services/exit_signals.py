@@ -0,0 +1,375 @@
+# @role: Column-wise exit signals and the exit stack evaluated over them
+# @used_by: signal_engine.py, exit_service.py, util.py, walk_forward.py, exit_replay.py
+# @filter_type: exit
+# @tags: exit, signals, vectorized, backtest
+"""
+Vectorized twin of ExitService.evaluate_exit_decision for backtests.
+
+Everything in the exit stack that does not depend on the position is computed
+once per symbol as whole-column arrays (row i read as the latest candle of an
+as-of view): the summed weight of the triggered evaluate_exit filters, the
+trailing-ATR stop, the early-profit momentum check and the ATR terms of the
+dynamic threshold. ExitStack then walks the stack for one position-day from
+those values plus the position's entry price, entry score and days held, in
+the same order and with the same thresholds as the service.
+"""
+import math
+import numpy as np
+import pandas as pd
+from services.indicator_enrichment_service import FIB_LEVEL_COLUMNS
+from services.filters.exit_pattern_breakdown_filter import BEARISH_PATTERNS
+
+# evaluate_exit reads each of these configs unguarded; a missing one makes it
+# fall back to a zero score for every filter
+REQUIRED_EXIT_FILTERS = [
+    "rsi_drop_filter", "bb_exit_filter", "obv_exit_filter", "atr_squeeze_filter", "macd_exit_filter",
+    "exit_time_decay_filter", "supply_absorption_filter", "pattern_breakdown_filter", "volatility_spike_exit",
+]
+EARLY_EXIT_PNL = 5.0
+EARLY_EXIT_MAX_DAYS = 5
+EXIT_SCORE_RATIO = 0.75
+
+SIGNAL_COLUMNS = ["EXIT_FILTER_SCORE", "TRAILING_EXIT", "EARLY_EXIT_SIGNAL", "ATR_AVG", "ATR_SEEN", "SWING_LOW"]
+
+
+def _col(df: pd.DataFrame, name: str) -> np.ndarray:
+    return pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=float)
+
+
+def _previous(values: np.ndarray, lag: int = 1) -> np.ndarray:
+    shifted = np.full(len(values), np.nan)
+    if lag < len(values):
+        shifted[lag:] = values[:len(values) - lag]
+    return shifted
+
+
+def _enabled(cfg) -> bool:
+    return bool(cfg and cfg.get("enabled", False))
+
+
+def _rsi_drop(df, cfg, n):
+    upper, lower = cfg.get("rsi_upper", 70), cfg.get("rsi_lower", 45)
+    if "RSI" not in df.columns:
+        return None
+    rsi, close = _col(df, "RSI"), _col(df, "close")
+    fired = np.where(rsi > upper, close < _previous(close), rsi < lower)
+    return fired
+
+
+def _bb_exit(df, cfg, n):
+    if "BB_%B" not in df.columns:
+        return None
+    return _col(df, "BB_%B") >= cfg.get("threshold", 0.9)
+
+
+def _obv_exit(df, cfg, n):
+    lookback = cfg.get("lookback_days", 5)
+    if "OBV" not in df.columns:
+        return None
+    obv = _col(df, "OBV")
+    prev = _previous(obv, lookback - 1)
+    drop = np.where(prev != 0, (prev - obv) / prev * 100, 0)
+    fired = (drop >= cfg.get("min_drop_pct", 1.5)) & (np.arange(n) + 1 >= lookback)
+    return fired
+
+
+def _atr_squeeze(df, cfg, n):
+    if "ATR" not in df.columns:
+        return None
+    atr = _col(df, "ATR")
+    prev = _previous(atr)
+    fired = (prev > 0) & (np.abs(atr - prev) / prev < cfg.get("threshold", 0.01))
+    return fired
+
+
+def _fibonacci_exit(df, cfg, n):
+    column = FIB_LEVEL_COLUMNS.get(str(cfg.get("retracement_zone", "0.618")))
+    if column not in df.columns or cfg.get("buffer_pct") is None:
+        return None
+    level = _col(df, column)
+    fired = (level != 0) & (_col(df, "close") < level * (1 - cfg["buffer_pct"]))
+    return fired
+
+
+def _fibonacci_support(df, cfg, n):
+    columns = [FIB_LEVEL_COLUMNS[level] for level in ["0.5", "0.618", "0.786"]]
+    if any(column not in df.columns for column in columns):
+        return None
+    close = _col(df, "close")
+    buffer_pct = cfg.get("buffer_pct", 0.005)
+    fired = np.zeros(n, dtype=bool)
+    for column in columns:
+        support = _col(df, column)
+        fired |= (support != 0) & (np.abs(close - support) / support <= buffer_pct)
+    return fired
+
+
+def _macd_exit(df, cfg, n):
+    if "MACD" not in df.columns or "MACD_SIGNAL" not in df.columns:
+        return None
+    return _col(df, "MACD") < _col(df, "MACD_SIGNAL")
+
+
+def _supply_absorption(df, cfg, n):
+    lookback = cfg.get("range_days", 3)
+    high = df["high"].rolling(lookback, min_periods=1).max().to_numpy(dtype=float)
+    low = df["low"].rolling(lookback, min_periods=1).min().to_numpy(dtype=float)
+    volume = df["volume"].astype(float)
+    vol_now = volume.to_numpy()
+    vol_avg = volume.rolling(lookback, min_periods=1).mean().to_numpy()
+    range_pct = np.where(low != 0, (high - low) / low * 100, 0)
+    vol_drop = np.where(vol_avg != 0, (vol_avg - vol_now) / vol_avg * 100, 0)
+    fired = (range_pct <= cfg.get("price_range_pct", 1)) & (vol_drop >= cfg.get("volume_drop_pct", 30))
+    return fired
+
+
+def _pattern_breakdown(df, cfg, n):
+    if "CANDLE_PATTERN" not in df.columns:
+        return None
+    return df["CANDLE_PATTERN"].isin(BEARISH_PATTERNS).to_numpy()
+
+
+def _volatility_spike(df, cfg, n):
+    if "ATR" not in df.columns:
+        return None
+    atr = _col(df, "ATR")
+    prev = _previous(atr)
+    spike = np.where(prev != 0, (atr - prev) / prev * 100, 0)
+    fired = (spike >= cfg.get("atr_spike_pct", 25)) & (np.arange(n) >= 1)
+    return fired
+
+
+# evaluate_exit filter config key -> column-wise rule (the rows it fires on);
+# exit_time_decay_filter depends on days held and is added per position by
+# ExitStack. override_filter is left out: it reads a bearish_pattern column
+# enrichment never produces, so it never fires.
+EXIT_FILTER_RULES = {
+    "rsi_drop_filter": _rsi_drop,
+    "bb_exit_filter": _bb_exit,
+    "obv_exit_filter": _obv_exit,
+    "atr_squeeze_filter": _atr_squeeze,
+    "fibonacci_exit_filter": _fibonacci_exit,
+    "fibonacci_support_exit_filter": _fibonacci_support,
+    "macd_exit_filter": _macd_exit,
+    "supply_absorption_filter": _supply_absorption,
+    "pattern_breakdown_filter": _pattern_breakdown,
+    "volatility_spike_exit": _volatility_spike,
+}
+# Weight each filter scores with when its config has none (the fibonacci
+# support filter has no default)
+DEFAULT_EXIT_WEIGHTS = {key: 3 for key in EXIT_FILTER_RULES}
+DEFAULT_EXIT_WEIGHTS.update({"supply_absorption_filter": 4, "fibonacci_support_exit_filter": None})
+
+
+def exit_filter_hits(df: pd.DataFrame, config: dict) -> dict:
+    """
+    Rows each enabled position-independent evaluate_exit filter fires on
+    (filter key -> bool array); empty when evaluate_exit scores zero throughout.
+    """
+    n = len(df)
+    exit_filters = config.get("exit_filters")
+    if exit_filters is None:
+        return {}
+    if any(not isinstance(exit_filters.get(key), dict) for key in REQUIRED_EXIT_FILTERS):
+        return {}
+    hits = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for key, rule in EXIT_FILTER_RULES.items():
+            cfg = exit_filters.get(key)
+            if not _enabled(cfg):
+                continue
+            fired = rule(df, cfg, n)
+            if fired is not None:
+                hits[key] = np.asarray(fired, dtype=bool)
+    return hits
+
+
+def exit_filter_weights(config: dict) -> dict:
+    """Weight of every enabled position-independent exit filter."""
+    exit_filters = config.get("exit_filters") or {}
+    return {key: exit_filters[key].get("weight", DEFAULT_EXIT_WEIGHTS[key])
+            for key in EXIT_FILTER_RULES if _enabled(exit_filters.get(key))}
+
+
+def combine_exit_hits(hits: dict, config: dict, shape) -> np.ndarray:
+    """Summed weight of the fired filters, in EXIT_FILTER_RULES order (hits: key -> bool array of `shape`)."""
+    score = np.zeros(shape)
+    weights = exit_filter_weights(config)
+    for key in EXIT_FILTER_RULES:
+        if key in hits and key in weights:
+            score += hits[key] * weights[key]
+    return score
+
+
+def exit_filter_score(df: pd.DataFrame, config: dict) -> np.ndarray:
+    """Summed weight of the triggered position-independent evaluate_exit filters, per row."""
+    return combine_exit_hits(exit_filter_hits(df, config), config, len(df))
+
+
+def exit_signal_columns(df: pd.DataFrame, config: dict, hits: dict = None) -> dict:
+    """
+    Position-independent exit-stack inputs for every row of an enriched, scored
+    frame (SIGNAL_COLUMNS -> array). hits: exit_filter_hits already computed for df.
+    """
+    n = len(df)
+    close = _col(df, "close")
+    has_atr = "ATR" in df.columns
+    atr = _col(df, "ATR") if has_atr else np.full(n, np.nan)
+
+    trailing_cfg = config.get("trailing_stop", {})
+    lookback = trailing_cfg.get("lookback_days", 10)
+    highest = pd.Series(close).rolling(lookback).max().to_numpy()
+    trailing = has_atr & (close <= highest - atr * trailing_cfg.get("atr_multiplier", 3))
+
+    macd = np.nan_to_num(_col(df, "MACD"), nan=0.0) if "MACD" in df.columns else np.zeros(n)
+    rsi = np.nan_to_num(_col(df, "RSI"), nan=50.0) if "RSI" in df.columns else np.full(n, 50.0)
+    bb = np.nan_to_num(_col(df, "%B"), nan=0.0) if "%B" in df.columns else np.zeros(n)
+
+    # Score collapse's structural break: lowest low of the last swing_lookback candles.
+    # Without a low column the service's lookup raises and it exits; +inf breaks every close.
+    swing_lookback = config.get("core_filter_loss_exit", {}).get("swing_lookback", 3)
+    swing_low = (pd.Series(_col(df, "low")).rolling(swing_lookback, min_periods=1).min().to_numpy()
+                 if "low" in df.columns else np.full(n, np.inf))
+
+    return {
+        "EXIT_FILTER_SCORE": combine_exit_hits(exit_filter_hits(df, config) if hits is None else hits, config, n),
+        "TRAILING_EXIT": trailing,
+        "EARLY_EXIT_SIGNAL": (macd < 20) | (rsi > 70) | (bb > 0.95),
+        "ATR_AVG": pd.Series(atr).rolling(14, min_periods=1).mean().fillna(0).to_numpy(),
+        "ATR_SEEN": np.cumsum(~np.isnan(atr)) > 0,
+        "SWING_LOW": swing_low,
+    }
+
+
+def max_exit_score(config: dict) -> float:
+    """Largest score the enabled exit filters can add up to."""
+    total = 0
+    for name, f in config.get("exit_filters", {}).items():
+        if not f.get("enabled", False):
+            continue
+        if name == "exit_time_decay_filter" and "weight_schedule" in f:
+            scheduled_weights = [w.get("weight", 0) for w in f["weight_schedule"]]
+            total += max(scheduled_weights) if scheduled_weights else 0
+        else:
+            weight = f.get("weight", 0)
+            if weight > 0:
+                total += weight
+    return total
+
+
+def dynamic_exit_threshold(config: dict, current_atr, avg_atr, days_held, max_score: float = None):
+    """
+    Exit score threshold for the given ATR terms and holding period (scalars or
+    arrays). A missing ATR (NaN avg_atr) gives the configured minimum.
+    """
+    dyn_config = config.get("dynamic_threshold", {})
+    max_score = max_exit_score(config) if max_score is None else max_score
+    min_threshold = dyn_config.get("min_threshold", 5)
+    base_threshold = max(min_threshold, dyn_config.get("base_weight_ratio", 0.25) * max_score)
+    time_decay = 1 - np.exp(-dyn_config.get("time_decay_rate", 0.3) * np.asarray(days_held, dtype=float))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vol_adj = np.where(avg_atr == 0, 1.0,
+                           1 + dyn_config.get("volatility_scaling_factor", 0.2) * (current_atr / avg_atr))
+    threshold = base_threshold * (1 - dyn_config.get("time_weight_reduction", 0.5) * time_decay) * vol_adj
+    threshold = np.where(np.isnan(avg_atr), min_threshold, threshold)
+    return threshold.item() if threshold.ndim == 0 else threshold
+
+
+def time_decay_weight(config: dict, days_held: int) -> float:
+    cfg = config.get("exit_filters", {}).get("exit_time_decay_filter")
+    if not _enabled(cfg) or days_held < cfg.get("min_hold_days_for_exit", 3):
+        return 0
+    weight = 0
+    for rule in sorted(cfg.get("weight_schedule"), key=lambda x: x["days"]):
+        if days_held >= rule["days"]:
+            weight = rule["weight"]
+        else:
+            break
+    return weight
+
+
+class ExitStack:
+    """
+    ExitService.evaluate_exit_decision for one position-day, read from
+    precomputed signals: `signals[column][at]` for the enriched columns
+    (close, ATR, MACD, ENTRY_SCORE) and SIGNAL_COLUMNS.
+
+    Profit-target escalation compounds profit_target_pct across every position
+    evaluated, as the service does by scaling its config in place; the stack
+    keeps that state on itself instead of mutating the config.
+
+    Score collapse reads the same position fields as
+    ExitService.evaluate_score_collapse_impact: the entry score against
+    final_score and core-filter activity from the position's filters (the
+    backtest engines set neither, so both default as they do there). Its
+    structural break needs signals["SESSION_CANDLE"], whether a candle is
+    stamped exactly at the evaluation time: without one the service's
+    lookup fails and it exits.
+    """
+    def __init__(self, config: dict):
+        self.config = config
+        self.min_holding_days = config.get("minimum_holding_days", 0)
+        self.stop_loss = config.get("stop_loss_exit", {})
+        self.escalation = config.get("profit_target_escalation", {})
+        self.profit_target = config.get("profit_target_exit", {})
+        self.profit_target_pct = self.profit_target.get("profit_target_pct", 0.02)
+        self.trailing = config.get("trailing_stop", {})
+        self.collapse = config.get("core_filter_loss_exit", {})
+        self.max_score = max_exit_score(config)
+        decay_days = range(0, 1 + max([r["days"] for r in config.get("exit_filters", {})
+                                      .get("exit_time_decay_filter", {}).get("weight_schedule", [])] or [0]))
+        self._decay = [time_decay_weight(config, days) for days in decay_days]
+
+    def _time_decay(self, days_held: int) -> float:
+        return self._decay[min(days_held, len(self._decay) - 1)] if days_held >= 0 else 0
+
+    def decide(self, entry_price: float, entry_score: float, days_held: int, signals: dict, at,
+               final_score: float = 0, filters=()):
+        """
+        Exit reason (ExitService's exit_reason) or None to hold. final_score and
+        filters are the position's fields of those names.
+        """
+        close = signals["close"][at]
+        pnl = ((close - entry_price) / entry_price) * 100 if entry_price else 0
+
+        if self.escalation.get("enabled", False):
+            macd = signals["MACD"][at] if "MACD" in signals else 0
+            if macd >= self.escalation.get("macd_threshold", 20) and pnl >= self.escalation.get("pnl_threshold", 1.0):
+                self.profit_target_pct *= 1.1
+
+        if days_held >= self.min_holding_days and self.stop_loss.get("enabled", False):
+            triggered = False
+            if self.stop_loss.get("use_atr", False) and "ATR" in signals:
+                triggered = close <= entry_price - self.stop_loss.get("atr_multiplier", 1.5) * signals["ATR"][at]
+            if not triggered and "stop_loss_pct" in self.stop_loss:
+                triggered = close <= entry_price * (1 - self.stop_loss["stop_loss_pct"])
+            if triggered:
+                return "atr_stop_loss"
+
+        if pnl >= EARLY_EXIT_PNL and days_held <= EARLY_EXIT_MAX_DAYS and (
+                signals["EARLY_EXIT_SIGNAL"][at] or pnl >= EARLY_EXIT_PNL + 1.5):
+            return "early_profit_exit"
+
+        if self.profit_target.get("enabled", True) and close >= entry_price * (1 + self.profit_target_pct):
+            return "profit_target"
+
+        if self.trailing.get("enabled", True) and signals["TRAILING_EXIT"][at]:
+            return "trailing_atr"
+
+        score = signals["EXIT_FILTER_SCORE"][at] + self._time_decay(days_held)
+        if "ATR" in signals and signals["ATR_SEEN"][at]:
+            atr, avg_atr = signals["ATR"][at], signals["ATR_AVG"][at]
+        else:
+            atr, avg_atr = math.nan, math.nan
+        threshold = dynamic_exit_threshold(self.config, atr, avg_atr, days_held, self.max_score)
+        if score >= threshold * EXIT_SCORE_RATIO:
+            return "🔁 exit filters triggered"
+
+        if self.collapse.get("enabled", False) and days_held >= self.collapse.get("min_hold_days", 1) and entry_score != 0:
+            drop_pct = ((entry_score - final_score) / entry_score) * 100
+            active = {f[0] for f in filters if isinstance(f, list) and f[1] > 0}
+            if not drop_pct < self.collapse.get("score_drop_pct", 60) and not active & set(self.collapse.get("core_filters", [])):
+                if not signals["SESSION_CANDLE"][at] or close < signals["SWING_LOW"][at]:
+                    return "score_collapse_and_filter_loss"
+                return "score_collapse_reduce_treated_as_exit"
+        return None
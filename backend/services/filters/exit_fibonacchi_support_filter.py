@@ -1,4 +1,5 @@
 from config.logging_config import get_loggers
+from services.indicator_enrichment_service import FIB_LEVEL_COLUMNS
 
 logger, trade_logger = get_loggers()
 
@@ -15,13 +16,12 @@ def fibonacci_support_exit_filter(df, config, symbol, **kwargs):
 
     try:
         price = df["close"].iloc[-1]
-        fib = df["FIBONACCI_LEVELS"].iloc[-1]
-        if not isinstance(fib, dict):
-            return []
-
         # Trigger if price is close to any major support level
         for level_name in ["0.5", "0.618", "0.786"]:
-            support = fib.get(level_name)
+            column = FIB_LEVEL_COLUMNS[level_name]
+            if column not in df.columns:
+                return []
+            support = df[column].iloc[-1]
             if support and (abs(price - support) / support) <= buffer_pct:
                 return [{
                     "filter": "fibonacci_support_exit_filter",
@@ -3,6 +3,7 @@
 # @filter_type: utility
 # @tags: exit, fibonacci, support
 from config.logging_config import get_loggers
+from services.indicator_enrichment_service import FIB_LEVEL_COLUMNS
 
 logger, trade_logger = get_loggers()
 
@@ -20,12 +21,12 @@ def fibonacci_exit_filter(df, config, symbol, **kwargs):
 
     try:
         price = df["close"].iloc[-1]
-        fib = df["FIBONACCI_LEVELS"].iloc[-1]
-        if not isinstance(fib, dict):
+        column = FIB_LEVEL_COLUMNS.get(retracement_zone)
+        if column not in df.columns:
             return []
 
-        level = fib.get(retracement_zone)
-        if not level:
+        level = df[column].iloc[-1]
+        if not level or level != level:
             return []
 
         # Trigger if price is below resistance
@@ -1,11 +1,138 @@
+import numpy as np
 import pandas as pd
-from pandas_ta import rsi, adx, obv, atr, stoch, cdl_pattern
-from services.technical_analysis import calculate_score
+from pandas_ta import rsi, adx, obv, atr, stoch
+from services.candle_patterns import detect_candle_patterns
+from services import indicator_kernels as kernels
+from services.entry_score_engine import score_entry_frame, score_entry_tail
+from services.indicator_registry import INDICATORS, resolve_indicators
 
 from config.logging_config import get_loggers
 logger, trade_logger = get_loggers()
 
-def enrich_with_indicators(df: pd.DataFrame) -> pd.DataFrame:
+FIB_WINDOW = 30
+# Retracement ratio (as used in exit configs) -> enriched column
+FIB_LEVEL_COLUMNS = {
+    "0.0": "FIB_0",
+    "0.236": "FIB_236",
+    "0.382": "FIB_382",
+    "0.5": "FIB_50",
+    "0.618": "FIB_618",
+    "0.786": "FIB_786",
+    "1.0": "FIB_100",
+}
+
+def _add_rsi(df: pd.DataFrame):
+    df["RSI"] = rsi(df["close"])
+
+def _add_macd(df: pd.DataFrame):
+    df["EMA_FAST"] = df["close"].ewm(span=12, adjust=False).mean()
+    df["EMA_SLOW"] = df["close"].ewm(span=26, adjust=False).mean()
+    df["MACD"] = df["EMA_FAST"] - df["EMA_SLOW"]
+    df["MACD_SIGNAL"] = df["MACD"].ewm(span=9, adjust=False).mean()
+    df["MACD_HIST"] = df["MACD"] - df["MACD_SIGNAL"]
+
+def _add_adx(df: pd.DataFrame):
+    adx_df = adx(df["high"], df["low"], df["close"])
+    df["ADX_14"] = adx_df["ADX_14"]
+    df["DMP_14"] = adx_df["DMP_14"]
+    df["DMN_14"] = adx_df["DMN_14"]
+
+def _add_obv(df: pd.DataFrame):
+    df["OBV"] = obv(df["close"], df["volume"])
+
+def _add_volume_avg(df: pd.DataFrame):
+    df["VOLUME_AVG"] = df["volume"].rolling(20).mean()
+
+def _add_atr(df: pd.DataFrame):
+    df["ATR"] = atr(df["high"], df["low"], df["close"])
+
+def _add_stochastic(df: pd.DataFrame):
+    stoch_df = stoch(df["high"], df["low"], df["close"], k=14, d=3, smooth_k=3)
+    df["STOCHASTIC_K"] = stoch_df["STOCHk_14_3_3"]
+    df["STOCHASTIC_D"] = stoch_df["STOCHd_14_3_3"]
+
+def _add_sma_50(df: pd.DataFrame):
+    df["SMA_50"] = df["close"].rolling(50).mean()
+
+def _add_bollinger(df: pd.DataFrame):
+    df["SMA_20"] = df["close"].rolling(20).mean()
+    sma = df["SMA_20"]
+    std = df["close"].rolling(20).std()
+    df["BB_MIDDLE"] = sma
+    df["BB_UPPER"] = sma + (2 * std)
+    df["BB_LOWER"] = sma - (2 * std)
+    df["BB_%B"] = (df["close"] - df["BB_LOWER"]) / (df["BB_UPPER"] - df["BB_LOWER"])
+
+def _add_avg_rsi(df: pd.DataFrame):
+    df["AVG_RSI"] = df["RSI"].rolling(14).mean()
+
+def _add_fibonacci(df: pd.DataFrame):
+    add_fibonacci_columns(df)
+
+def _add_candle_pattern(df: pd.DataFrame):
+    df["CANDLE_PATTERN"] = detect_candle_patterns(df)
+
+INDICATOR_FUNCTIONS = {
+    "RSI": _add_rsi,
+    "MACD": _add_macd,
+    "ADX": _add_adx,
+    "OBV": _add_obv,
+    "VOLUME_AVG": _add_volume_avg,
+    "ATR": _add_atr,
+    "STOCHASTIC": _add_stochastic,
+    "SMA_50": _add_sma_50,
+    "BOLLINGER": _add_bollinger,
+    "AVG_RSI": _add_avg_rsi,
+    "FIBONACCI": _add_fibonacci,
+    "CANDLE_PATTERN": _add_candle_pattern,
+}
+
+def _kernel_rsi(df: pd.DataFrame):
+    df["RSI"] = kernels.rsi(df["close"].to_numpy(dtype=float))
+
+def _kernel_adx(df: pd.DataFrame):
+    adx_, dmp, dmn = kernels.adx(*_hlc(df))
+    df["ADX_14"] = adx_
+    df["DMP_14"] = dmp
+    df["DMN_14"] = dmn
+
+def _kernel_obv(df: pd.DataFrame):
+    df["OBV"] = kernels.obv(df["close"].to_numpy(dtype=float), df["volume"].to_numpy(dtype=float))
+
+def _kernel_atr(df: pd.DataFrame):
+    df["ATR"] = kernels.atr(*_hlc(df))
+
+def _kernel_stochastic(df: pd.DataFrame):
+    df["STOCHASTIC_K"], df["STOCHASTIC_D"] = kernels.stoch(*_hlc(df), k=14, d=3, smooth_k=3)
+
+def _hlc(df: pd.DataFrame):
+    return tuple(df[col].to_numpy(dtype=float) for col in ["high", "low", "close"])
+
+# NumPy replacements for the pandas_ta calls, used when use_indicator_kernels is on
+KERNEL_FUNCTIONS = {
+    "RSI": _kernel_rsi,
+    "ADX": _kernel_adx,
+    "OBV": _kernel_obv,
+    "ATR": _kernel_atr,
+    "STOCHASTIC": _kernel_stochastic,
+}
+
+# Live suggestion paths only read the latest candle's score
+LIVE_TAIL_ROWS = 1
+
+# Computed even on very short frames; everything else needs MIN_CANDLES rows
+SHORT_FRAME_INDICATORS = {"RSI", "MACD"}
+MIN_CANDLES = 15
+
+def enrich_with_indicators(df: pd.DataFrame, config: dict = None, use_kernels: bool = None) -> pd.DataFrame:
+    """
+    Add indicator columns to an OHLCV frame. With a config, only the indicators
+    its enabled entry/exit filters need (plus the core set) are computed;
+    without one, everything is. use_kernels (default: the config's
+    use_indicator_kernels flag) swaps the pandas_ta calls for indicator_kernels.
+    """
+    if use_kernels is None:
+        use_kernels = (config or {}).get("use_indicator_kernels", False)
     df = df.copy()
 
     if "date" in df.columns:
@@ -19,157 +146,67 @@ def enrich_with_indicators(df: pd.DataFrame) -> pd.DataFrame:
     
     df.attrs["missing_indicators"] = []
 
-    try:
-        df["RSI"] = rsi(df["close"])
-    except Exception as e:
-        logger.warning(f"[RSI] failed: {e}")
-        df.attrs["missing_indicators"].append("RSI")
-        df["RSI"] = None
-
-    try:
-        df["EMA_FAST"] = df["close"].ewm(span=12, adjust=False).mean()
-        df["EMA_SLOW"] = df["close"].ewm(span=26, adjust=False).mean()
-        df["MACD"] = df["EMA_FAST"] - df["EMA_SLOW"]
-        df["MACD_SIGNAL"] = df["MACD"].ewm(span=9, adjust=False).mean()
-        df["MACD_HIST"] = df["MACD"] - df["MACD_SIGNAL"]
-    except Exception as e:
-        logger.warning(f"[MACD] failed: {e}")
-        df.attrs["missing_indicators"].append("MACD")
-        df["MACD"] = df["MACD_SIGNAL"] = df["MACD_HIST"] = None
-
-    if df.shape[0] < 15:
-        logger.warning("⚠️ Skipping enrichment — insufficient candles")
-        return df
-    try:
-        adx_df = adx(df["high"], df["low"], df["close"])
-        df["ADX_14"] = adx_df["ADX_14"]
-        df["DMP_14"] = adx_df["DMP_14"]
-        df["DMN_14"] = adx_df["DMN_14"]
-    except Exception as e:
-        logger.warning(f"[ADX] failed: {e}")
-        df.attrs["missing_indicators"].append("ADX")
-        df["ADX_14"] = df["DMP_14"] = df["DMN_14"] = None
-    adx_df = adx(df["high"], df["low"], df["close"])
-
-    try:
-        df["OBV"] = obv(df["close"], df["volume"])
-        df["VOLUME_AVG"] = df["volume"].rolling(20).mean()
-    except Exception as e:
-        logger.warning(f"[OBV] failed: {e}")
-        df.attrs["missing_indicators"].append("OBV")
-        df["OBV"] = None
-
-    try:
-        df["ATR"] = atr(df["high"], df["low"], df["close"])
-    except Exception as e:
-        logger.warning(f"[ATR] failed: {e}")
-        df.attrs["missing_indicators"].append("ATR")
-        df["ATR"] = None
-    
-    try:
-        stoch_df = stoch(df["high"], df["low"], df["close"], k=14, d=3, smooth_k=3)
-        df["STOCHASTIC_K"] = stoch_df["STOCHk_14_3_3"]
-        df["STOCHASTIC_D"] = stoch_df["STOCHd_14_3_3"]
-    except Exception as e:
-        logger.warning(f"[STOCHASTIC] failed: {e}")
-        df.attrs["missing_indicators"].append("STOCHASTIC")
-        df["STOCHASTIC_K"] = df["STOCHASTIC_D"] = None
-
-    try:
-        df["SMA_50"] = df["close"].rolling(50).mean()
-        df["SMA_20"] = df["close"].rolling(20).mean()
-        sma = df["SMA_20"]
-        std = df["close"].rolling(20).std()
-        df["BB_MIDDLE"] = sma
-        df["BB_UPPER"] = sma + (2 * std)
-        df["BB_LOWER"] = sma - (2 * std)
-        df["BB_%B"] = (df["close"] - df["BB_LOWER"]) / (df["BB_UPPER"] - df["BB_LOWER"])
-    except Exception as e:
-        logger.warning(f"[BOLLINGER] failed: {e}")
-        df.attrs["missing_indicators"].append("BOLLINGER")
-        df["BB_%B"] = df["BB_UPPER"] = df["BB_LOWER"] = df["BB_MIDDLE"] = None
-
-    try:
-        df["AVG_RSI"] = df["RSI"].rolling(14).mean()
-    except Exception as e:
-        logger.warning(f"[AVG_RSI] failed: {e}")
-        df.attrs["missing_indicators"].append("AVG_RSI")
-        df["AVG_RSI"] = None
-
-    try:
-        window = 30
-        fib_data = []
-        for i in range(len(df)):
-            if i < window:
-                fib_data.append({})
-                continue
-            fib_levels = calculate_fibonacci_levels(df["close"].iloc[i - window:i])
-            fib_data.append(fib_levels)
-
-        df["FIBONACCI_LEVELS"] = fib_data
-    except Exception as e:
-        logger.warning(f"[FIBONACCI] failed: {e}")
-        df.attrs["missing_indicators"].append("FIBONACCI")
-        df["FIBONACCI_LEVELS"] = [{} for _ in range(len(df))]
-
-    try:
-        pattern_df = cdl_pattern(open_=df["open"], high=df["high"], low=df["low"], close=df["close"])
-        pattern_df = pattern_df.fillna(0)
-
-        def get_pattern_name(row):
-            for col in pattern_df.columns:
-                if row[col] != 0:
-                    return col.replace("CDL_", "")  # return cleaned pattern name
-            return None
-
-        df["CANDLE_PATTERN"] = pattern_df.apply(get_pattern_name, axis=1)
-    except Exception as e:
-        logger.warning(f"[CANDLE_PATTERN] failed: {e}")
-        df.attrs["missing_indicators"].append("CANDLE_PATTERN")
-        df["CANDLE_PATTERN"] = None
+    for name in resolve_indicators(config):
+        if name not in SHORT_FRAME_INDICATORS and df.shape[0] < MIN_CANDLES:
+            logger.warning("⚠️ Skipping enrichment — insufficient candles")
+            return df
+        try:
+            compute = KERNEL_FUNCTIONS.get(name) if use_kernels else None
+            (compute or INDICATOR_FUNCTIONS[name])(df)
+        except Exception as e:
+            logger.warning(f"[{name}] failed: {e}")
+            df.attrs["missing_indicators"].append(name)
+            for col in INDICATORS[name]["columns"]:
+                df[col] = None
 
     df.reset_index(inplace=True)
     return df
 
-def calculate_entry_score(df: pd.DataFrame, config: dict) -> pd.DataFrame:
+def calculate_entry_score(df: pd.DataFrame, config: dict, tail_rows: int = None) -> pd.DataFrame:
+    """
+    Add ENTRY_SCORE (and the scorer's CONTRIB_* / extra columns) to an enriched
+    frame. Breakdowns are not stored; entry_score_engine.explain_entry_rows
+    builds them for the rows a caller returns.
+    With tail_rows, only the last tail_rows candles are scored — enough for live
+    paths that read iloc[-1]; earlier rows get NaN.
+    """
     df = df.copy()
     df.set_index("date", inplace=True)
-    scores, breakdowns = [], []
-    for i, (index, row) in enumerate(df.iterrows()):
-        score, breakdown, extras = calculate_score(row, config, full_df=df.iloc[:i+1])
-        scores.append(score)
-        breakdowns.append(breakdown if isinstance(breakdown, list) else [])
-        for key, val in extras.items():
-            if val is not None:
-                df.at[row.name, key] = val
-    df["ENTRY_SCORE"] = scores
-    df["ENTRY_BREAKDOWN"] = breakdowns
+    if tail_rows is None:
+        scores, extras = score_entry_frame(df, config)
+    else:
+        scores, extras = score_entry_tail(df, config, tail_rows)
+    assign_entry_scores(df, scores, extras)
     df.reset_index(inplace=True)
     return df
 
-def enrich_with_indicators_and_score(df: pd.DataFrame, config: dict) -> pd.DataFrame:
-    df = enrich_with_indicators(df)
-    df = calculate_entry_score(df, config)
+def assign_entry_scores(df: pd.DataFrame, scores, extras):
+    """Write scorer output covering the last len(scores) rows of df."""
+    n, keep = len(df), len(scores)
+    if keep == n:
+        for key, values in extras.items():
+            df[key] = values
+        df["ENTRY_SCORE"] = scores
+        return
+    pad = np.full(n - keep, np.nan)
+    for key, values in extras.items():
+        df[key] = np.concatenate([pad.astype(values.dtype), values])
+    df["ENTRY_SCORE"] = np.concatenate([pad, scores])
+
+def enrich_with_indicators_and_score(df: pd.DataFrame, config: dict, tail_rows: int = None) -> pd.DataFrame:
+    df = enrich_with_indicators(df, config)
+    df = calculate_entry_score(df, config, tail_rows)
     return df
 
-def calculate_fibonacci_levels(series: pd.Series) -> dict:
+def add_fibonacci_columns(df: pd.DataFrame, window: int = FIB_WINDOW) -> pd.DataFrame:
     """
-    Given a price series (usually 20-day close), calculate key Fibonacci retracement levels.
-    Returns a dictionary with levels: 0.0, 0.236, 0.382, 0.5, 0.618, 0.786, 1.0
+    Rolling Fibonacci retracement levels over the previous `window` closes
+    (the current candle is excluded), one float column per level.
     """
-    if series.empty or len(series) < 2:
-        return {}
-
-    high = series.max()
-    low = series.min()
+    prior_close = df["close"].shift(1)
+    high = prior_close.rolling(window).max()
+    low = prior_close.rolling(window).min()
     diff = high - low
-
-    return {
-        "0.0": round(high, 2),
-        "0.236": round(high - 0.236 * diff, 2),
-        "0.382": round(high - 0.382 * diff, 2),
-        "0.5": round(high - 0.5 * diff, 2),
-        "0.618": round(high - 0.618 * diff, 2),
-        "0.786": round(high - 0.786 * diff, 2),
-        "1.0": round(low, 2)
-    }
+    for ratio, col in FIB_LEVEL_COLUMNS.items():
+        df[col] = (high - float(ratio) * diff).round(2)
+    return df
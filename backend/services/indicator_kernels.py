@@ -0,0 +1,188 @@
+# @role: Pure-NumPy indicator kernels (array in, array out)
+# @used_by: indicator_enrichment_service.py
+# @filter_type: utility
+# @tags: indicators, numpy, performance
+"""
+Array-in/array-out implementations of the pandas_ta indicators used in
+enrichment: Wilder RSI, ATR, ADX/DMP/DMN, OBV and the stochastic %K/%D.
+
+They avoid the Series/DataFrame plumbing of each pandas_ta call, which is
+most of the cost on short frames. Every kernel works along axis 0, so a
+(candles,) array or a (candles, symbols) panel can be passed in.
+
+pandas_ta switches to TA-Lib for RSI, ATR and OBV when it is installed, so by
+default the kernels follow whichever path pandas_ta would take:
+- TA-Lib: Wilder smoothing seeded with the SMA of the first `length` values
+- native: ewm(alpha=1/length, adjust=True, min_periods=length) ("rma")
+"""
+import sys
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    import talib  # noqa: F401
+    TALIB_AVAILABLE = True
+except ImportError:
+    TALIB_AVAILABLE = False
+
+# Smallest beta**k the blocked decay filter lets a block reach; keeps beta**-k well
+# inside float range while making blocks as long as possible
+DECAY_FLOOR = 1e-10
+# TA-Lib's TA_IS_ZERO tolerance
+TALIB_ZERO = 1e-8
+
+
+def _as_2d(values):
+    arr = np.asarray(values, dtype=float)
+    return (arr[:, None] if arr.ndim == 1 else arr), arr.shape
+
+
+def _decay_filter(x: np.ndarray, beta: float, carry=None) -> np.ndarray:
+    """y[t] = beta * y[t-1] + x[t] along axis 0 (2-D input), in closed form per block."""
+    out = np.empty_like(x)
+    carry = np.zeros(x.shape[1]) if carry is None else carry
+    block = max(int(np.log(DECAY_FLOOR) / np.log(beta)), 1) if 0 < beta < 1 else 1
+    for start in range(0, len(x), block):
+        chunk = x[start:start + block]
+        powers = beta ** np.arange(1, len(chunk) + 1)[:, None]
+        out[start:start + len(chunk)] = powers * (carry + np.cumsum(chunk / powers, axis=0))
+        carry = out[start + len(chunk) - 1]
+    return out
+
+
+def rma(values, length: int) -> np.ndarray:
+    """pandas ewm(alpha=1/length, adjust=True, min_periods=length).mean() (ignore_na=False)."""
+    x, shape = _as_2d(values)
+    observed = ~np.isnan(x)
+    beta = 1.0 - 1.0 / length
+    numerator = _decay_filter(np.where(observed, x, 0.0), beta)
+    denominator = _decay_filter(observed.astype(float), beta)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = numerator / denominator
+    out[np.cumsum(observed, axis=0) < length] = np.nan
+    return out.reshape(shape)
+
+
+def wilder(values, length: int) -> np.ndarray:
+    """TA-Lib style Wilder smoothing: SMA of the first `length` values, then (prev*(n-1) + x)/n."""
+    x, shape = _as_2d(values)
+    n, m = x.shape
+    out = np.full((n, m), np.nan)
+    if n == 0:
+        return out.reshape(shape)
+    first = np.argmax(~np.isnan(x), axis=0)
+    seed_idx = first + length - 1
+    cols = np.flatnonzero(seed_idx < n)
+    if not len(cols):
+        return out.reshape(shape)
+
+    csum = np.vstack([np.zeros((1, m)), np.nancumsum(x, axis=0)])
+    seed = (csum[seed_idx[cols] + 1, cols] - csum[first[cols], cols]) / length
+
+    rows = np.arange(n)[:, None]
+    drive = np.where(rows > seed_idx, x / length, 0.0)
+    drive[seed_idx[cols], cols] = seed
+    smoothed = _decay_filter(drive[:, cols], 1.0 - 1.0 / length)
+    out[:, cols] = np.where(rows >= seed_idx[cols], smoothed, np.nan)
+    return out.reshape(shape)
+
+
+def _smooth(values, length: int, talib_compatible: bool) -> np.ndarray:
+    return wilder(values, length) if talib_compatible else rma(values, length)
+
+
+def _diff(x: np.ndarray) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    out[1:] = x[1:] - x[:-1]
+    return out
+
+
+def _rolling(x: np.ndarray, window: int, reducer) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    if len(x) >= window:
+        out[window - 1:] = reducer(sliding_window_view(x, window, axis=0), axis=-1)
+    return out
+
+
+def rsi(close, length: int = 14, talib_compatible: bool = TALIB_AVAILABLE) -> np.ndarray:
+    c, shape = _as_2d(close)
+    change = _diff(c)
+    gain = np.where(change < 0, 0.0, change)
+    loss = np.where(change > 0, 0.0, change)
+    avg_gain = _smooth(gain, length, talib_compatible)
+    avg_loss = np.abs(_smooth(loss, length, talib_compatible))
+    total = avg_gain + avg_loss
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = 100 * avg_gain / total
+    if talib_compatible:
+        out = np.where(np.abs(total) < TALIB_ZERO, 0.0, out)
+    return out.reshape(shape)
+
+
+def true_range(high, low, close) -> np.ndarray:
+    h, shape = _as_2d(high)
+    l, _ = _as_2d(low)
+    c, _ = _as_2d(close)
+    prev_close = np.full_like(c, np.nan)
+    prev_close[1:] = c[:-1]
+    with np.errstate(invalid="ignore"):
+        ranges = np.stack([h - l, np.abs(h - prev_close), np.abs(prev_close - l)])
+    out = ranges.max(axis=0)
+    out[:1] = np.nan
+    return out.reshape(shape)
+
+
+def atr(high, low, close, length: int = 14, talib_compatible: bool = TALIB_AVAILABLE) -> np.ndarray:
+    return _smooth(true_range(high, low, close), length, talib_compatible)
+
+
+def adx(high, low, close, length: int = 14, talib_compatible: bool = TALIB_AVAILABLE):
+    """Returns (ADX, DMP, DMN) like pandas_ta adx (rma-smoothed DM/DX over pandas_ta's atr)."""
+    h, shape = _as_2d(high)
+    l, _ = _as_2d(low)
+    atr_ = atr(h, l, close, length, talib_compatible).reshape(h.shape)
+
+    up = _diff(h)
+    down = -_diff(l)
+    with np.errstate(invalid="ignore"):
+        plus = np.where((up > down) & (up > 0), up, 0.0)
+        minus = np.where((down > up) & (down > 0), down, 0.0)
+    plus[np.isnan(up)] = np.nan
+    minus[np.isnan(down)] = np.nan
+    plus[np.abs(plus) < sys.float_info.epsilon] = 0.0
+    minus[np.abs(minus) < sys.float_info.epsilon] = 0.0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = 100 / atr_
+        dmp = scale * rma(plus, length)
+        dmn = scale * rma(minus, length)
+        dx = 100 * np.abs(dmp - dmn) / (dmp + dmn)
+    adx_ = rma(dx, length)
+    return adx_.reshape(shape), dmp.reshape(shape), dmn.reshape(shape)
+
+
+def obv(close, volume) -> np.ndarray:
+    c, shape = _as_2d(close)
+    v, _ = _as_2d(volume)
+    direction = np.sign(_diff(c))
+    direction[:1] = 1.0
+    signed = direction * v
+    out = np.nancumsum(signed, axis=0)
+    out[np.isnan(signed)] = np.nan
+    return out.reshape(shape)
+
+
+def stoch(high, low, close, k: int = 14, d: int = 3, smooth_k: int = 3):
+    """Returns (%K, %D) like pandas_ta stoch(k, d, smooth_k)."""
+    h, shape = _as_2d(high)
+    l, _ = _as_2d(low)
+    c, _ = _as_2d(close)
+    lowest = _rolling(l, k, np.min)
+    highest = _rolling(h, k, np.max)
+    price_range = highest - lowest
+    price_range = price_range + np.where((price_range == 0).any(axis=0), sys.float_info.epsilon, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        raw = 100 * (c - lowest) / price_range
+    stoch_k = _rolling(raw, smooth_k, np.mean)
+    stoch_d = _rolling(stoch_k, d, np.mean)
+    return stoch_k.reshape(shape), stoch_d.reshape(shape)
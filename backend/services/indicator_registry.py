@@ -0,0 +1,113 @@
+# @role: Declares indicators, their dependencies and which filters need them
+# @used_by: indicator_enrichment_service.py
+# @filter_type: utility
+# @tags: indicators, config, dependencies
+"""
+Indicator registry for selective enrichment.
+
+INDICATORS lists every indicator enrich_with_indicators can compute, in
+computation order, with the columns it produces and the indicators it
+depends on. The *_FILTER_INDICATORS maps tell which indicators each entry /
+exit filter reads, so resolve_indicators(config) can return the minimal set
+a config actually needs.
+"""
+from config.logging_config import get_loggers
+logger, trade_logger = get_loggers()
+
+# Order matters: it is the order columns are computed in.
+INDICATORS = {
+    "RSI": {"columns": ["RSI"], "depends_on": []},
+    "MACD": {"columns": ["EMA_FAST", "EMA_SLOW", "MACD", "MACD_SIGNAL", "MACD_HIST"], "depends_on": []},
+    "ADX": {"columns": ["ADX_14", "DMP_14", "DMN_14"], "depends_on": []},
+    "OBV": {"columns": ["OBV"], "depends_on": []},
+    "VOLUME_AVG": {"columns": ["VOLUME_AVG"], "depends_on": []},
+    "ATR": {"columns": ["ATR"], "depends_on": []},
+    "STOCHASTIC": {"columns": ["STOCHASTIC_K", "STOCHASTIC_D"], "depends_on": []},
+    "SMA_50": {"columns": ["SMA_50"], "depends_on": []},
+    "BOLLINGER": {"columns": ["SMA_20", "BB_MIDDLE", "BB_UPPER", "BB_LOWER", "BB_%B"], "depends_on": []},
+    "AVG_RSI": {"columns": ["AVG_RSI"], "depends_on": ["RSI"]},
+    "FIBONACCI": {"columns": ["FIB_0", "FIB_236", "FIB_382", "FIB_50", "FIB_618", "FIB_786", "FIB_100"], "depends_on": []},
+    "CANDLE_PATTERN": {"columns": ["CANDLE_PATTERN"], "depends_on": []},
+}
+
+# Always computed:
+# - RSI/MACD feed late_entry_penalty, the exit override and profit-target escalation
+# - ADX (DMP/DMN) and RSI/MACD are read by the swing/intraday strategy hard filters
+# - ATR feeds the entry prefilter (min_atr_pct) and the ATR stop loss / trailing stop
+CORE_INDICATORS = ["RSI", "MACD", "ADX", "ATR"]
+
+ENTRY_FILTER_INDICATORS = {
+    "adx": ["ADX"],
+    "rsi": ["RSI"],
+    "rsi_above_avg": ["AVG_RSI"],
+    "macd": ["MACD"],
+    "bb": ["BOLLINGER"],
+    "dmp_dmn": ["ADX"],
+    "price_sma": ["SMA_50"],
+    "obv": ["OBV"],
+    "atr": ["ATR"],
+    "stochastic": ["STOCHASTIC"],
+    "candle_pattern": ["CANDLE_PATTERN"],
+    # Reads the lowercase `fibonacci_levels` key, which enrichment never produces
+    "fibonacci_support": [],
+    "volume_surge": ["VOLUME_AVG"],
+    "rsi_slope": ["RSI"],
+    # BB width squeeze + RSI slope + MACD_HIST slope
+    "breakout_ready": ["BOLLINGER", "RSI", "MACD"],
+}
+
+EXIT_FILTER_INDICATORS = {
+    "rsi_drop_filter": ["RSI"],
+    "macd_exit_filter": ["MACD"],
+    "adx_exit_filter": ["ADX"],
+    "fibonacci_exit_filter": ["FIBONACCI"],
+    "fibonacci_support_filter": ["FIBONACCI"],
+    "fibonacci_support_exit_filter": ["FIBONACCI"],
+    "atr_squeeze_filter": ["ATR"],
+    "bb_exit_filter": ["BOLLINGER"],
+    "exit_time_decay_filter": [],
+    "score_drop_filter": [],
+    "supply_absorption_filter": [],
+    "pattern_breakdown_filter": ["CANDLE_PATTERN"],
+    "obv_exit_filter": ["OBV"],
+    "volatility_spike_exit": ["ATR"],
+}
+
+
+def _enabled(filters: dict) -> list:
+    return [name for name, cfg in (filters or {}).items() if (cfg or {}).get("enabled")]
+
+
+def resolve_indicators(config: dict = None) -> list:
+    """
+    Minimal ordered list of indicators needed by `config`: the core set plus
+    whatever its enabled entry and exit filters read, with dependencies.
+    A None config resolves to every indicator.
+    """
+    if config is None:
+        return list(INDICATORS)
+
+    wanted = list(CORE_INDICATORS)
+    for name in _enabled(config.get("entry_filters")):
+        if name not in ENTRY_FILTER_INDICATORS:
+            logger.warning(f"⚠️ Unknown entry filter '{name}' — computing all indicators")
+            return list(INDICATORS)
+        wanted.extend(ENTRY_FILTER_INDICATORS[name])
+    for name in _enabled(config.get("exit_filters")):
+        if name not in EXIT_FILTER_INDICATORS:
+            logger.warning(f"⚠️ Unknown exit filter '{name}' — computing all indicators")
+            return list(INDICATORS)
+        wanted.extend(EXIT_FILTER_INDICATORS[name])
+
+    required = set()
+    while wanted:
+        name = wanted.pop()
+        if name not in required:
+            required.add(name)
+            wanted.extend(INDICATORS[name]["depends_on"])
+
+    return [name for name in INDICATORS if name in required]
+
+
+def required_columns(config: dict = None) -> list:
+    return [col for name in resolve_indicators(config) for col in INDICATORS[name]["columns"]]
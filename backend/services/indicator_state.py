@@ -0,0 +1,373 @@
+# @role: Incremental (streaming) indicator engine with persistable per-symbol state
+# @used_by: candle_cache_builder.py, ohlcv_data_downloader.py
+# @filter_type: logic
+# @tags: indicators, incremental, cache, intraday
+"""
+Keeps the running state behind every indicator enrich_with_indicators produces
+(EMA/MACD, Wilder RSI, ATR, ADX/DMI, OBV, stochastic, rolling SMA/std windows),
+so appending N candles updates the indicator columns in O(N) instead of
+re-enriching the whole window.
+
+The recurrences follow pandas' ewm (ignore_na=False) and pandas_ta's formulas
+step for step (TA-Lib's seeded Wilder smoothing for RSI/ATR when it is
+installed), so a frame built candle-by-candle matches a full recompute within
+floating-point noise. State is saved as JSON next to the
+feather cache file (intraday) or in the OHLCV store (archive appends).
+"""
+import json
+import math
+import sys
+from collections import deque
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from services.entry_score_engine import score_entry_frame, score_entry_tail
+from services.candle_patterns import detect_candle_patterns
+from services.indicator_kernels import TALIB_AVAILABLE, TALIB_ZERO
+from services.indicator_enrichment_service import FIB_LEVEL_COLUMNS, FIB_WINDOW, assign_entry_scores
+
+from config.logging_config import get_loggers
+logger, trade_logger = get_loggers()
+
+STATE_VERSION = 2
+# Rows of history re-read when appending: covers the candle-pattern lookback and
+# the 10-bar breakout / 3-bar slope windows used by entry scoring.
+TAIL_CONTEXT = 30
+OHLCV_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+class EwmState:
+    """One pandas ewm(...).mean() recurrence (ignore_na=False)."""
+
+    def __init__(self, alpha: float, adjust: bool = True, min_periods: int = 0):
+        self.alpha = alpha
+        self.adjust = adjust
+        self.min_periods = max(min_periods, 1)
+        self.weighted = math.nan
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, value: float) -> float:
+        is_observation = value == value
+        self.nobs += is_observation
+        if self.weighted == self.weighted:
+            self.old_wt *= 1 - self.alpha
+            if is_observation:
+                new_wt = 1.0 if self.adjust else self.alpha
+                if self.weighted != value:
+                    self.weighted = self.old_wt * self.weighted + new_wt * value
+                    self.weighted /= self.old_wt + new_wt
+                self.old_wt = self.old_wt + new_wt if self.adjust else 1.0
+        elif is_observation:
+            self.weighted = value
+        return self.weighted if self.nobs >= self.min_periods else math.nan
+
+    def to_dict(self) -> dict:
+        return {"weighted": self.weighted, "old_wt": self.old_wt, "nobs": self.nobs}
+
+    def load(self, data: dict):
+        self.weighted = data["weighted"]
+        self.old_wt = data["old_wt"]
+        self.nobs = data["nobs"]
+
+
+class WilderState:
+    """TA-Lib Wilder smoothing: SMA of the first `length` values, then (prev*(n-1) + x)/n."""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.value = math.nan
+        self.total = 0.0
+        self.count = 0
+
+    def update(self, value: float) -> float:
+        if self.count < self.length:
+            if value == value:
+                self.total += value
+                self.count += 1
+                if self.count == self.length:
+                    self.value = self.total / self.length
+            return self.value
+        self.value = (self.value * (self.length - 1) + value) / self.length
+        return self.value
+
+    def to_dict(self) -> dict:
+        return {"value": self.value, "total": self.total, "count": self.count}
+
+    def load(self, data: dict):
+        self.value = data["value"]
+        self.total = data["total"]
+        self.count = data["count"]
+
+
+def _wilder(length: int):
+    # Same smoothing pandas_ta uses for RSI/ATR: TA-Lib's when installed, else rma
+    return WilderState(length) if TALIB_AVAILABLE else _rma(length)
+
+
+def _rma(length: int) -> EwmState:
+    # pandas_ta rma: ewm(alpha=1/length, min_periods=length), adjust=True
+    return EwmState(alpha=1.0 / length, adjust=True, min_periods=length)
+
+
+def _ema(span: int) -> EwmState:
+    return EwmState(alpha=2.0 / (span + 1), adjust=False)
+
+
+class RollingWindow:
+    """Fixed-size window matching pandas rolling(window) with default min_periods."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values = deque(maxlen=size)
+
+    def push(self, value: float):
+        self.values.append(value)
+
+    def ready(self) -> bool:
+        return len(self.values) == self.size and not any(v != v for v in self.values)
+
+    def mean(self) -> float:
+        return float(np.mean(self.values)) if self.ready() else math.nan
+
+    def std(self) -> float:
+        return float(np.std(self.values, ddof=1)) if self.ready() else math.nan
+
+    def min(self) -> float:
+        return min(self.values) if self.ready() else math.nan
+
+    def max(self) -> float:
+        return max(self.values) if self.ready() else math.nan
+
+
+class IndicatorState:
+    """Running indicator state for one symbol/interval."""
+
+    def __init__(self):
+        self.last_timestamp = None
+        self.prev_close = math.nan
+        self.prev_high = math.nan
+        self.prev_low = math.nan
+        self.obv = 0.0
+        self.candles = 0
+
+        self.ema_fast = _ema(12)
+        self.ema_slow = _ema(26)
+        self.macd_signal = _ema(9)
+        self.rsi_gain = _wilder(14)
+        self.rsi_loss = _wilder(14)
+        self.atr = _wilder(14)
+        self.dm_plus = _rma(14)
+        self.dm_minus = _rma(14)
+        self.adx = _rma(14)
+
+        self.volume_20 = RollingWindow(20)
+        self.close_20 = RollingWindow(20)
+        self.close_50 = RollingWindow(50)
+        self.rsi_14 = RollingWindow(14)
+        self.high_14 = RollingWindow(14)
+        self.low_14 = RollingWindow(14)
+        self.stoch_raw = RollingWindow(3)
+        self.stoch_k = RollingWindow(3)
+        self.fib_closes = RollingWindow(FIB_WINDOW)
+
+    def update(self, open_: float, high: float, low: float, close: float, volume: float) -> dict:
+        """Advance every indicator by one candle and return that candle's values."""
+        row = {}
+        first = self.candles == 0
+
+        # Fibonacci levels use the 30 closes *before* this candle
+        fib_high, fib_low = self.fib_closes.max(), self.fib_closes.min()
+        for ratio, col in FIB_LEVEL_COLUMNS.items():
+            row[col] = float(np.round(fib_high - float(ratio) * (fib_high - fib_low), 2))
+
+        # RSI (Wilder, pandas_ta native)
+        change = close - self.prev_close
+        gain = change if not change < 0 else 0.0
+        loss = change if not change > 0 else 0.0
+        avg_gain = self.rsi_gain.update(gain)
+        avg_loss = self.rsi_loss.update(loss)
+        total = avg_gain + abs(avg_loss)
+        if TALIB_AVAILABLE and abs(total) < TALIB_ZERO:
+            row["RSI"] = 0.0
+        else:
+            row["RSI"] = 100 * avg_gain / total if total else math.nan
+
+        # MACD
+        row["EMA_FAST"] = self.ema_fast.update(close)
+        row["EMA_SLOW"] = self.ema_slow.update(close)
+        row["MACD"] = row["EMA_FAST"] - row["EMA_SLOW"]
+        row["MACD_SIGNAL"] = self.macd_signal.update(row["MACD"])
+        row["MACD_HIST"] = row["MACD"] - row["MACD_SIGNAL"]
+
+        # ATR / ADX / DMI
+        true_range = math.nan if first else max(abs(high - low), abs(high - self.prev_close), abs(self.prev_close - low))
+        atr = self.atr.update(true_range)
+        up = high - self.prev_high
+        down = self.prev_low - low
+        plus = (up if (up > down and up > 0) else 0.0) if up == up else math.nan
+        minus = (down if (down > up and down > 0) else 0.0) if down == down else math.nan
+        plus = 0.0 if abs(plus) < sys.float_info.epsilon else plus
+        minus = 0.0 if abs(minus) < sys.float_info.epsilon else minus
+        scale = 100 / atr if atr else math.nan
+        dmp = scale * self.dm_plus.update(plus)
+        dmn = scale * self.dm_minus.update(minus)
+        dx = 100 * abs(dmp - dmn) / (dmp + dmn) if dmp + dmn else math.nan
+        row["ADX_14"] = self.adx.update(dx)
+        row["DMP_14"] = dmp
+        row["DMN_14"] = dmn
+        row["ATR"] = atr
+
+        # OBV
+        if not first and close != self.prev_close:
+            self.obv += volume if close > self.prev_close else -volume
+        elif first:
+            self.obv = float(volume)
+        row["OBV"] = self.obv
+        self.volume_20.push(volume)
+        row["VOLUME_AVG"] = self.volume_20.mean()
+
+        # Stochastic %K/%D (14, 3, 3)
+        self.high_14.push(high)
+        self.low_14.push(low)
+        lowest, highest = self.low_14.min(), self.high_14.max()
+        price_range = highest - lowest
+        price_range = price_range if price_range != 0 else sys.float_info.epsilon
+        self.stoch_raw.push(100 * (close - lowest) / price_range)
+        row["STOCHASTIC_K"] = self.stoch_raw.mean()
+        self.stoch_k.push(row["STOCHASTIC_K"])
+        row["STOCHASTIC_D"] = self.stoch_k.mean()
+
+        # SMA / Bollinger
+        self.close_20.push(close)
+        self.close_50.push(close)
+        row["SMA_50"] = self.close_50.mean()
+        row["SMA_20"] = sma = self.close_20.mean()
+        std = self.close_20.std()
+        row["BB_MIDDLE"] = sma
+        row["BB_UPPER"] = sma + 2 * std
+        row["BB_LOWER"] = sma - 2 * std
+        band = row["BB_UPPER"] - row["BB_LOWER"]
+        row["BB_%B"] = (close - row["BB_LOWER"]) / band if band else math.nan
+
+        self.rsi_14.push(row["RSI"])
+        row["AVG_RSI"] = self.rsi_14.mean()
+
+        self.fib_closes.push(close)
+        self.prev_close, self.prev_high, self.prev_low = close, high, low
+        self.candles += 1
+        return row
+
+    def append(self, candles: pd.DataFrame) -> pd.DataFrame:
+        """Indicator columns for candles (date-indexed OHLCV) that follow the current state."""
+        rows = [
+            self.update(float(c.open), float(c.high), float(c.low), float(c.close), float(c.volume))
+            for c in candles[OHLCV_COLUMNS].itertuples(index=False)
+        ]
+        if len(candles):
+            self.last_timestamp = pd.Timestamp(candles.index[-1])
+        indicators = pd.DataFrame(rows, index=candles.index)
+        return pd.concat([candles, indicators], axis=1)
+
+    def to_dict(self) -> dict:
+        windows = {
+            name: list(getattr(self, name).values)
+            for name in ["volume_20", "close_20", "close_50", "rsi_14", "high_14", "low_14",
+                         "stoch_raw", "stoch_k", "fib_closes"]
+        }
+        ewms = {
+            name: getattr(self, name).to_dict()
+            for name in ["ema_fast", "ema_slow", "macd_signal", "rsi_gain", "rsi_loss",
+                         "atr", "dm_plus", "dm_minus", "adx"]
+        }
+        return {
+            "version": STATE_VERSION,
+            "talib": TALIB_AVAILABLE,
+            "last_timestamp": self.last_timestamp.isoformat() if self.last_timestamp is not None else None,
+            "prev_close": self.prev_close,
+            "prev_high": self.prev_high,
+            "prev_low": self.prev_low,
+            "obv": self.obv,
+            "candles": self.candles,
+            "ewm": ewms,
+            "windows": windows,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "IndicatorState":
+        state = cls()
+        state.last_timestamp = pd.Timestamp(data["last_timestamp"]) if data.get("last_timestamp") else None
+        state.prev_close = data["prev_close"]
+        state.prev_high = data["prev_high"]
+        state.prev_low = data["prev_low"]
+        state.obv = data["obv"]
+        state.candles = data["candles"]
+        for name, values in data["ewm"].items():
+            getattr(state, name).load(values)
+        for name, values in data["windows"].items():
+            getattr(state, name).values.extend(values)
+        return state
+
+
+def save_indicator_state(state: IndicatorState, path) -> None:
+    with open(path, "w") as f:
+        json.dump(state.to_dict(), f)
+
+
+def load_indicator_state(path):
+    """Return the saved IndicatorState, or None when missing/unreadable/outdated."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+        if data.get("version") != STATE_VERSION or data.get("talib") != TALIB_AVAILABLE:
+            return None
+        return IndicatorState.from_dict(data)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not load indicator state {path}: {e}")
+        return None
+
+
+def _pattern_and_score(frame: pd.DataFrame, config: dict, tail_rows: int = None) -> pd.DataFrame:
+    try:
+        frame["CANDLE_PATTERN"] = detect_candle_patterns(frame)
+    except Exception as e:
+        logger.warning(f"[CANDLE_PATTERN] failed: {e}")
+        frame["CANDLE_PATTERN"] = None
+    if tail_rows is None:
+        scores, extras = score_entry_frame(frame, config)
+    else:
+        scores, extras = score_entry_tail(frame, config, tail_rows)
+    assign_entry_scores(frame, scores, extras)
+    return frame
+
+
+def build_indicator_frame(candles: pd.DataFrame, config: dict, tail_rows: int = None):
+    """
+    Full build: replay date-indexed OHLCV through a fresh state.
+    Returns (state, enriched_and_scored_frame); with tail_rows only the last
+    tail_rows candles are scored.
+    """
+    state = IndicatorState()
+    frame = state.append(candles[OHLCV_COLUMNS])
+    return state, _pattern_and_score(frame, config, tail_rows)
+
+
+def append_candles(cached: pd.DataFrame, new_candles: pd.DataFrame, state: IndicatorState, config: dict) -> pd.DataFrame:
+    """
+    Append raw candles to an enriched, scored, date-indexed frame.
+    Only the new rows are computed; history is reused as-is. The state always
+    advances every indicator, but only the columns `cached` carries (those the
+    config resolved to when it was enriched) are emitted for the new rows.
+    """
+    if new_candles is None or new_candles.empty:
+        return cached
+
+    fresh = state.append(new_candles[OHLCV_COLUMNS])
+    fresh = fresh[[col for col in fresh.columns if col in cached.columns]]
+    tail = pd.concat([cached.iloc[-TAIL_CONTEXT:][fresh.columns], fresh])
+    tail = _pattern_and_score(tail, config, tail_rows=len(fresh))
+    tail = tail[[col for col in tail.columns if col in cached.columns]]
+    return pd.concat([cached, tail.iloc[-len(fresh):]])
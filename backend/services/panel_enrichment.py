@@ -0,0 +1,254 @@
+# @role: Universe-wide indicator enrichment on a 2-D (candles x symbols) panel
+# @used_by: engine.py, engine_filters_quality_analysis.py, ohlcv_data_downloader.py
+# @filter_type: logic
+# @tags: indicators, panel, vectorized, backtest
+"""
+Enrich a whole symbol universe in one pass instead of one pandas pipeline per
+symbol.
+
+OHLCV of every symbol is stacked into (candles x symbols) arrays aligned on
+each symbol's latest candle, so on a shared daily calendar a row is a trading
+day. Symbols with shorter histories (later listings) are NaN-padded at the
+top; a symbol's own missing sessions do not occupy a row, so every column
+sees exactly the candles its per-symbol frame would. Indicators are computed
+column-wise with the NumPy kernels and pandas' 2-D ewm/rolling, then split
+back into per-symbol frames and scored. The kernels follow the config's
+use_indicator_kernels flag as enrich_with_indicators does: with it off, the
+indicators it swaps (RSI, ADX, OBV, ATR, stochastic) are computed per symbol
+with pandas_ta and written into the panel.
+
+The output matches enrich_with_indicators_and_score symbol for symbol.
+"""
+import numpy as np
+import pandas as pd
+from services import indicator_kernels as kernels
+from services.candle_patterns import panel_pattern_codes, to_categorical
+from services.indicator_enrichment_service import (
+    enrich_with_indicators, calculate_entry_score, FIB_LEVEL_COLUMNS, FIB_WINDOW, MIN_CANDLES,
+    INDICATOR_FUNCTIONS, KERNEL_FUNCTIONS
+)
+from services.indicator_registry import INDICATORS, resolve_indicators
+from services.compact_frames import compact_enabled, compact_frame
+
+from config.logging_config import get_loggers
+logger, trade_logger = get_loggers()
+
+PANEL_FIELDS = ["open", "high", "low", "close", "volume"]
+RAW_COLUMNS = ["open", "high", "low", "close", "adj_close", "volume"]
+
+
+def _dated(df: pd.DataFrame) -> pd.DataFrame:
+    if "date" in df.columns:
+        df = df.set_index(pd.to_datetime(df["date"])).drop(columns="date")
+    return df.sort_index()
+
+
+def build_panel(frames: dict) -> dict:
+    """
+    Stack per-symbol OHLCV frames (date column or date index) into a panel:
+    {"symbols", "frames", "rows", "lengths", "open", "high", "low", "close", "volume"},
+    each field a (rows x symbols) float array.
+    """
+    frames = {s: _dated(df[[c for c in ["date"] + RAW_COLUMNS if c in df.columns]])
+              for s, df in frames.items() if df is not None and len(df)}
+    symbols = list(frames)
+    lengths = np.array([len(frames[s]) for s in symbols], dtype=int)
+    rows = int(lengths.max()) if len(lengths) else 0
+
+    panel = {"symbols": symbols, "frames": frames, "rows": rows, "lengths": lengths}
+    for field in PANEL_FIELDS:
+        values = np.full((rows, len(symbols)), np.nan)
+        for j, symbol in enumerate(symbols):
+            values[rows - lengths[j]:, j] = frames[symbol][field].to_numpy(dtype=float)
+        panel[field] = values
+    return panel
+
+
+def _panel_rsi(p, out):
+    out["RSI"] = kernels.rsi(p["close"])
+
+
+def _panel_macd(p, out):
+    close = pd.DataFrame(p["close"])
+    out["EMA_FAST"] = close.ewm(span=12, adjust=False).mean().to_numpy()
+    out["EMA_SLOW"] = close.ewm(span=26, adjust=False).mean().to_numpy()
+    out["MACD"] = out["EMA_FAST"] - out["EMA_SLOW"]
+    out["MACD_SIGNAL"] = pd.DataFrame(out["MACD"]).ewm(span=9, adjust=False).mean().to_numpy()
+    out["MACD_HIST"] = out["MACD"] - out["MACD_SIGNAL"]
+
+
+def _panel_adx(p, out):
+    out["ADX_14"], out["DMP_14"], out["DMN_14"] = kernels.adx(p["high"], p["low"], p["close"])
+
+
+def _panel_obv(p, out):
+    # kernels.obv starts at +volume on row 0 only; here each symbol starts on its own first candle
+    first = p["rows"] - p["lengths"]
+    listed = np.arange(p["rows"])[:, None] >= first
+    direction = np.sign(np.diff(p["close"], axis=0, prepend=np.nan))
+    direction[listed & np.isnan(direction)] = 1.0
+    signed = direction * p["volume"]
+    obv = np.nancumsum(signed, axis=0)
+    obv[np.isnan(signed)] = np.nan
+    out["OBV"] = obv
+
+
+def _panel_volume_avg(p, out):
+    out["VOLUME_AVG"] = pd.DataFrame(p["volume"]).rolling(20).mean().to_numpy()
+
+
+def _panel_atr(p, out):
+    out["ATR"] = kernels.atr(p["high"], p["low"], p["close"])
+
+
+def _panel_stochastic(p, out):
+    out["STOCHASTIC_K"], out["STOCHASTIC_D"] = kernels.stoch(p["high"], p["low"], p["close"], k=14, d=3, smooth_k=3)
+
+
+def _panel_sma_50(p, out):
+    out["SMA_50"] = pd.DataFrame(p["close"]).rolling(50).mean().to_numpy()
+
+
+def _panel_bollinger(p, out):
+    close = pd.DataFrame(p["close"])
+    sma = close.rolling(20).mean().to_numpy()
+    std = close.rolling(20).std().to_numpy()
+    out["SMA_20"] = out["BB_MIDDLE"] = sma
+    out["BB_UPPER"] = sma + (2 * std)
+    out["BB_LOWER"] = sma - (2 * std)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out["BB_%B"] = (p["close"] - out["BB_LOWER"]) / (out["BB_UPPER"] - out["BB_LOWER"])
+
+
+def _panel_avg_rsi(p, out):
+    out["AVG_RSI"] = pd.DataFrame(out["RSI"]).rolling(14).mean().to_numpy()
+
+
+def _panel_fibonacci(p, out):
+    prior_close = pd.DataFrame(p["close"]).shift(1)
+    high = prior_close.rolling(FIB_WINDOW).max()
+    low = prior_close.rolling(FIB_WINDOW).min()
+    diff = high - low
+    for ratio, col in FIB_LEVEL_COLUMNS.items():
+        out[col] = (high - float(ratio) * diff).round(2).to_numpy()
+
+
+def _panel_candle_pattern(p, out):
+    out["CANDLE_PATTERN"] = panel_pattern_codes(p["open"], p["high"], p["low"], p["close"])
+
+
+PANEL_FUNCTIONS = {
+    "RSI": _panel_rsi,
+    "MACD": _panel_macd,
+    "ADX": _panel_adx,
+    "OBV": _panel_obv,
+    "VOLUME_AVG": _panel_volume_avg,
+    "ATR": _panel_atr,
+    "STOCHASTIC": _panel_stochastic,
+    "SMA_50": _panel_sma_50,
+    "BOLLINGER": _panel_bollinger,
+    "AVG_RSI": _panel_avg_rsi,
+    "FIBONACCI": _panel_fibonacci,
+    "CANDLE_PATTERN": _panel_candle_pattern,
+}
+
+
+def _per_symbol(name: str, p, out):
+    """One indicator through its pandas_ta path, symbol by symbol, into panel arrays."""
+    columns = INDICATORS[name]["columns"]
+    for col in columns:
+        out[col] = np.full((p["rows"], len(p["symbols"])), np.nan)
+    for j, symbol in enumerate(p["symbols"]):
+        df = p["frames"][symbol][PANEL_FIELDS].copy()
+        INDICATOR_FUNCTIONS[name](df)
+        for col in columns:
+            out[col][p["rows"] - p["lengths"][j]:, j] = df[col].to_numpy(dtype=float)
+
+
+def enrich_panel(panel: dict, config: dict = None) -> dict:
+    """Indicator arrays for the whole panel: column name -> (rows x symbols) array."""
+    use_kernels = (config or {}).get("use_indicator_kernels", False)
+    out = {}
+    for name in resolve_indicators(config):
+        try:
+            if name in KERNEL_FUNCTIONS and not use_kernels:
+                _per_symbol(name, panel, out)
+            else:
+                PANEL_FUNCTIONS[name](panel, out)
+        except Exception as e:
+            logger.warning(f"[PANEL {name}] failed: {e}")
+            for col in INDICATORS[name]["columns"]:
+                out[col] = None
+    return out
+
+
+def split_panel(panel: dict, indicators: dict) -> dict:
+    """Per-symbol enriched frames (same shape as enrich_with_indicators output)."""
+    frames = {}
+    rows = panel["rows"]
+    failed = [name for name, spec in INDICATORS.items()
+              if spec["columns"][0] in indicators and indicators[spec["columns"][0]] is None]
+    for j, symbol in enumerate(panel["symbols"]):
+        base = panel["frames"][symbol]
+        start = rows - panel["lengths"][j]
+        columns = {}
+        for col, values in indicators.items():
+            if values is None:
+                columns[col] = None
+            elif col == "CANDLE_PATTERN":
+                columns[col] = to_categorical(values[start:, j], base.index)
+            else:
+                columns[col] = values[start:, j]
+        df = pd.concat([base, pd.DataFrame(columns, index=base.index)], axis=1)
+        df.index.name = "date"
+        df.attrs["missing_indicators"] = list(failed)
+        frames[symbol] = df.reset_index()
+    return frames
+
+
+def enrich_universe(frames: dict, config: dict = None) -> dict:
+    """
+    enrich_with_indicators for a whole universe at once.
+    Symbols too short for the full indicator set go through the per-symbol path.
+    """
+    frames = {s: df for s, df in frames.items() if df is not None and len(df)}
+    short = {s for s, df in frames.items() if len(df) < MIN_CANDLES}
+    enriched = {s: enrich_with_indicators(frames[s], config) for s in short}
+
+    panel = build_panel({s: df for s, df in frames.items() if s not in short})
+    if panel["symbols"]:
+        enriched.update(split_panel(panel, enrich_panel(panel, config)))
+    logger.info(f"🧮 Panel enrichment: {len(panel['symbols'])} symbols x {panel['rows']} candles "
+                f"({len(short)} short frames enriched per symbol)")
+    return enriched
+
+
+def enrich_universe_and_score(frames: dict, config: dict) -> dict:
+    """enrich_with_indicators_and_score for a whole universe: symbol -> frame with a date column."""
+    scored = {}
+    for symbol, df in enrich_universe(frames, config).items():
+        scored[symbol] = calculate_entry_score(df, config) if "date" in df.columns else df
+    return scored
+
+
+def build_candle_cache(data_provider, symbols: list, config: dict, from_date=None, to_date=None, interval: str = "day") -> dict:
+    """
+    Load every symbol once, enrich + score the universe as a panel and return
+    date-indexed frames keyed by symbol — a candle_cache for EntryService.get_suggestions
+    (in the compact_frames schema when the config sets compact_dtypes).
+    """
+    frames = {}
+    for item in symbols:
+        symbol = item.get("symbol") if isinstance(item, dict) else item
+        df = data_provider.fetch_candles(symbol=symbol, interval=interval, from_date=from_date, to_date=to_date)
+        if df is None or df.empty:
+            continue
+        df = df.reset_index() if "date" not in df.columns else df
+        frames[symbol] = df[[c for c in ["date"] + RAW_COLUMNS if c in df.columns]]
+
+    compact = compact_enabled(config)
+    cache = {}
+    for symbol, df in enrich_universe_and_score(frames, config).items():
+        df = df.set_index("date") if "date" in df.columns else df
+        cache[symbol] = compact_frame(df) if compact else df
+    return cache
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import List, Dict, Optional, Tuple
+import numpy as np
 import pandas as pd
 from datetime import date
 
@@ -23,3 +24,10 @@ class BaseStrategy(ABC):
         Return None if the symbol doesn't pass filters.
         """
         pass
+
+    def hard_filter_mask(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        apply_hard_filters for every row of df at once (row i read as the latest
+        candle). Strategies override this with a column-wise version.
+        """
+        return np.array([self.apply_hard_filters("", df.iloc[:i + 1]) for i in range(len(df))], dtype=bool)
@@ -1,5 +1,6 @@
 from services.strategies.base_strategy import BaseStrategy
 from config.logging_config import get_loggers
+import numpy as np
 import pandas as pd
 from datetime import timedelta
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -7,6 +8,8 @@ import threading
 
 logger, _ = get_loggers()
 
+HARD_FILTER_COLUMNS = ["RSI", "MACD", "MACD_SIGNAL", "DMP_14", "DMN_14"]
+
 class SwingStrategy(BaseStrategy):
     def __init__(self, config):
         self.config = config
@@ -18,21 +21,37 @@ class SwingStrategy(BaseStrategy):
     def apply_hard_filters(self, symbol: str, df: pd.DataFrame) -> bool:
         try:
             logger.debug(f"🔍 Evaluating hard filters for {symbol}")
-            rsi = df.get("RSI")
-            macd = df.get("MACD")
-            macd_signal = df.get("MACD_SIGNAL")
-            dmp = df.get("DMP_14")
-            dmn = df.get("DMN_14")
-
-            if not (self.config.get('rsi_min') <= rsi <= self.config.get('rsi_max')): return False
-            if macd <= macd_signal: return False
-            if dmp <= dmn: return False
+            if not self.hard_filter_mask(df.iloc[-1:])[0]:
+                return False
 
             logger.debug(f"✅ {symbol} passed all hard filters")
             return True
         except Exception as e:
             logger.exception(f"❌ Error in hard filter evaluation for {symbol}: {e}")
             return False
+
+    def hard_filter_mask(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Latest-candle hard filters for every row: MACD above its signal, DMP above
+        DMN and, when the config sets rsi_min / rsi_max, RSI inside that band.
+        Missing indicator columns and NaN indicator values (warm-up rows) reject.
+
+        Behaviour change: the original apply_hard_filters compared whole columns
+        (and None bounds when rsi_min / rsi_max are unset), raised, and so
+        rejected every symbol. parity_checks.py [HARD_FILTERS] reports both.
+        """
+        if any(col not in df.columns for col in HARD_FILTER_COLUMNS):
+            return np.zeros(len(df), dtype=bool)
+        rsi, macd, macd_signal, dmp, dmn = (
+            pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float) for col in HARD_FILTER_COLUMNS
+        )
+        # Built from the passing conditions so that any NaN comparison rejects
+        passed = (macd > macd_signal) & (dmp > dmn)
+        if self.config.get("rsi_min") is not None:
+            passed &= rsi >= self.config["rsi_min"]
+        if self.config.get("rsi_max") is not None:
+            passed &= rsi <= self.config["rsi_max"]
+        return passed
         
     def preload_and_filter_symbols(self, symbols, data_provider, config, as_of_date):
         candle_cache = {}
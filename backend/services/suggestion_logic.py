@@ -4,7 +4,9 @@
 # @tags: suggestion, scoring, logic
 from config.filters_setup import load_filters
 from services.entry_service import EntryService
-from services.indicator_enrichment_service import enrich_with_indicators_and_score
+from services.indicator_enrichment_service import LIVE_TAIL_ROWS
+from services.enrichment_cache import cached_enrich_and_score
+from services.entry_score_engine import breakdown_at
 from exceptions.exceptions import InvalidTokenException
 from brokers.kite.kite_broker import KiteBroker
 from config.logging_config import get_loggers
@@ -40,7 +42,7 @@ class SuggestionLogic:
             if df is None or df.empty:
                 return None
 
-            enriched = enrich_with_indicators_and_score(df, self.config)
+            enriched = cached_enrich_and_score(df, self.config, symbol, self.interval, tail_rows=LIVE_TAIL_ROWS)
             latest = enriched.iloc[-1]
 
             if latest["close"] <= self.min_price or latest["volume"] < self.min_volume:
@@ -53,7 +55,7 @@ class SuggestionLogic:
                 }
 
             score = latest.get("ENTRY_SCORE")
-            breakdown = latest.get("ENTRY_BREAKDOWN", [])
+            breakdown = breakdown_at(enriched, self.config, symbol=symbol)
             suggestion = "buy" if score >= 15 else "avoid"
 
             logger.info(f"Scored {symbol}: {score:.2f} ({suggestion}) | Breakdown: {breakdown}")
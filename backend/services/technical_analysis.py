@@ -45,7 +45,14 @@ def calculate_score(latest: pd.Series, config: dict, symbol: str = "", full_df=N
         filters = config.get("entry_filters", {})
         extras = {}
 
-        def is_enabled(f): return filters.get(f).get("enabled")
+        # Bug fixes over the original (which scored such rows 0 via the except below):
+        # a filter missing from the config counts as disabled instead of raising, and
+        # rsi/macd are read up front because rsi_above_avg and the late-entry penalty
+        # use them even when the rsi/macd filters are disabled.
+        def is_enabled(f): return (filters.get(f) or {}).get("enabled")
+
+        rsi = latest.get("RSI")
+        macd = latest.get("MACD")
 
         # ADX
         if is_enabled("adx"):
@@ -229,13 +236,13 @@ def calculate_score(latest: pd.Series, config: dict, symbol: str = "", full_df=N
             score += penalty
             breakdown.append({"filter": "late_entry_penalty", "weight": penalty, "details": {"rsi": rsi, "macd": macd}})
 
-        # Signal Saturation Block
+        # Signal Saturation Block (returned 2 values before, breaking callers' unpacking)
         if score >= 20 and len(breakdown) >= 7:
-            return 0, [{"filter": "signal_blocked", "weight": 0, "details": {"reason": "Signal saturation"}}]
+            return 0, [{"filter": "signal_blocked", "weight": 0, "details": {"reason": "Signal saturation"}}], extras
 
         return score, breakdown, extras
 
     except Exception as e:
         logger.exception(f"❌ Error calculating score for {symbol}: {e}")
-        return 0, []
+        return 0, [], {}
 
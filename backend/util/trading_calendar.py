@@ -0,0 +1,172 @@
+# @role: NSE trading calendar with a precomputed session index
+# @used_by: util.py, engine.py, engine_filters_quality_analysis.py, candle_cache_builder.py
+# @filter_type: utility
+# @tags: calendar, holidays, sessions, market-hours
+"""
+The holiday file is parsed once into a sorted datetime64[D] array and a NumPy
+business-day calendar (Mon-Fri minus holidays). Point checks and session
+arithmetic (next/previous session, offsets, counts) are O(log holidays),
+ranges are slices of the sorted session array, and DatetimeIndex masks are
+evaluated in one vectorized call instead of a Python loop per timestamp.
+
+Every date-like input is read as an Asia/Kolkata date (tz-aware inputs are
+converted first, naive ones are taken as IST wall time).
+"""
+import json
+from datetime import time as dt_time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from jobs.refresh_holidays import download_nse_holidays
+from config.logging_config import get_loggers
+
+logger, trade_logger = get_loggers()
+
+HOLIDAY_FILE = Path(__file__).resolve().parents[1] / "assets" / "nse_holidays.json"
+MARKET_TZ = "Asia/Kolkata"
+WEEKMASK = "1111100"
+SESSION_OPEN = dt_time(hour=9, minute=15)
+SESSION_CLOSE = dt_time(hour=15, minute=30)
+BAR_MINUTES = 15
+# Span of the precomputed session array; point checks work outside it too
+SESSIONS_START = "2000-01-01"
+SESSIONS_END = "2041-01-01"
+
+_calendar = None
+_calendar_mtime = None
+
+
+def _to_timestamp(value) -> pd.Timestamp:
+    ts = pd.Timestamp(value)
+    return ts.tz_convert(MARKET_TZ).tz_localize(None) if ts.tzinfo is not None else ts
+
+
+def _to_day(value) -> np.datetime64:
+    return np.datetime64(_to_timestamp(value).date(), "D")
+
+
+def _to_days(index: pd.DatetimeIndex) -> np.ndarray:
+    if index.tz is not None:
+        index = index.tz_convert(MARKET_TZ).tz_localize(None)
+    return index.values.astype("datetime64[D]")
+
+
+def parse_holidays(items: list) -> np.ndarray:
+    """Sorted unique holiday dates from the NSE holiday-master entries."""
+    raw = [item.get("tradingDate") or item.get("holidayDate") for item in items]
+    dates = pd.to_datetime(pd.Series(raw, dtype=object), format="%d-%b-%Y", errors="coerce").dropna()
+    return np.unique(dates.values.astype("datetime64[D]"))
+
+
+class TradingCalendar:
+    def __init__(self, holidays=(), bar_minutes: int = BAR_MINUTES):
+        self.holidays = np.unique(np.asarray(holidays, dtype="datetime64[D]"))
+        self.busdaycal = np.busdaycalendar(weekmask=WEEKMASK, holidays=self.holidays)
+        days = np.arange(np.datetime64(SESSIONS_START), np.datetime64(SESSIONS_END), dtype="datetime64[D]")
+        self.sessions = days[np.is_busday(days, busdaycal=self.busdaycal)]
+        self.bar_minutes = bar_minutes
+
+    # ---- sessions ----
+    def is_trading_day(self, value) -> bool:
+        return bool(np.is_busday(_to_day(value), busdaycal=self.busdaycal))
+
+    def next_trading_day(self, value) -> pd.Timestamp:
+        """First session strictly after the date."""
+        return pd.Timestamp(np.busday_offset(_to_day(value), 1, roll="backward", busdaycal=self.busdaycal))
+
+    def prev_trading_day(self, value) -> pd.Timestamp:
+        """Last session strictly before the date."""
+        return pd.Timestamp(np.busday_offset(_to_day(value), -1, roll="forward", busdaycal=self.busdaycal))
+
+    def offset_trading_days(self, value, n: int) -> pd.Timestamp:
+        """The session n sessions away, after rolling a non-session date back to the previous session."""
+        return pd.Timestamp(np.busday_offset(_to_day(value), n, roll="backward", busdaycal=self.busdaycal))
+
+    def trading_days_between(self, start, end) -> int:
+        """Number of sessions in [start, end]."""
+        start, end = _to_day(start), _to_day(end)
+        if end < start:
+            return 0
+        return int(np.busday_count(start, end + np.timedelta64(1, "D"), busdaycal=self.busdaycal))
+
+    def sessions_between(self, start, end) -> pd.DatetimeIndex:
+        """Sessions in [start, end] as a naive DatetimeIndex of midnights."""
+        start, end = _to_day(start), _to_day(end)
+        if start < self.sessions[0] or end > self.sessions[-1]:
+            days = np.arange(start, end + np.timedelta64(1, "D"), dtype="datetime64[D]")
+            return pd.DatetimeIndex(days[np.is_busday(days, busdaycal=self.busdaycal)])
+        lo = np.searchsorted(self.sessions, start, side="left")
+        hi = np.searchsorted(self.sessions, end, side="right")
+        return pd.DatetimeIndex(self.sessions[lo:hi])
+
+    def session_mask(self, index: pd.DatetimeIndex) -> np.ndarray:
+        """Boolean mask: the timestamp falls on a session date."""
+        return np.is_busday(_to_days(pd.DatetimeIndex(index)), busdaycal=self.busdaycal)
+
+    # ---- market hours ----
+    def is_market_open(self, value) -> bool:
+        ts = _to_timestamp(value)
+        return self.is_trading_day(ts) and SESSION_OPEN <= ts.time() <= SESSION_CLOSE
+
+    def market_hours_mask(self, index: pd.DatetimeIndex) -> np.ndarray:
+        """Boolean mask: the timestamp is within session hours of a session date."""
+        index = pd.DatetimeIndex(index)
+        if index.tz is not None:
+            index = index.tz_convert(MARKET_TZ).tz_localize(None)
+        minutes = (index - index.normalize()) // pd.Timedelta(minutes=1)
+        minutes = np.asarray(minutes)
+        in_hours = (minutes >= SESSION_OPEN.hour * 60 + SESSION_OPEN.minute) & \
+                   (minutes <= SESSION_CLOSE.hour * 60 + SESSION_CLOSE.minute)
+        return in_hours & self.session_mask(index)
+
+    # ---- bar boundaries ----
+    def last_bar_start(self, day) -> pd.Timestamp:
+        """Start of the final bar of the session on `day`."""
+        close = SESSION_CLOSE.hour * 60 + SESSION_CLOSE.minute
+        open_ = SESSION_OPEN.hour * 60 + SESSION_OPEN.minute
+        start = open_ + ((close - open_ - 1) // self.bar_minutes) * self.bar_minutes
+        return pd.Timestamp(day).normalize() + pd.Timedelta(minutes=start)
+
+    def floor_bar(self, value) -> pd.Timestamp:
+        """Start of the bar (aligned to the session open) containing the timestamp."""
+        ts = _to_timestamp(value)
+        session_open = ts.normalize() + pd.Timedelta(hours=SESSION_OPEN.hour, minutes=SESSION_OPEN.minute)
+        bars = (ts - session_open) // pd.Timedelta(minutes=self.bar_minutes)
+        return session_open + bars * pd.Timedelta(minutes=self.bar_minutes)
+
+    def expected_last_bar(self, now=None) -> pd.Timestamp:
+        """
+        Start of the latest bar a complete intraday cache should hold at `now`:
+        the current bar during session hours, otherwise the last bar of the
+        most recent session.
+        """
+        ts = _to_timestamp(now if now is not None else pd.Timestamp.now(tz=MARKET_TZ))
+        if not self.is_trading_day(ts) or ts.time() < SESSION_OPEN:
+            return self.last_bar_start(self.prev_trading_day(ts))
+        return min(self.floor_bar(ts), self.last_bar_start(ts))
+
+
+def load_holiday_items() -> list:
+    if not HOLIDAY_FILE.exists():
+        logger.error(f"⚠️ Holidays file not found at {HOLIDAY_FILE!s}. Downloading fresh copy…")
+        res = download_nse_holidays()
+        if res.get("status") != "success":
+            logger.info("❌ Could not fetch holidays; treating every weekday as a session.")
+            return []
+    with open(HOLIDAY_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def get_trading_calendar() -> TradingCalendar:
+    """
+    Process-wide calendar, rebuilt only when the holiday file changes
+    (e.g. after the scheduled holiday refresh).
+    """
+    global _calendar, _calendar_mtime
+    mtime = HOLIDAY_FILE.stat().st_mtime if HOLIDAY_FILE.exists() else None
+    if _calendar is None or mtime != _calendar_mtime:
+        _calendar = TradingCalendar(parse_holidays(load_holiday_items()))
+        _calendar_mtime = HOLIDAY_FILE.stat().st_mtime if HOLIDAY_FILE.exists() else None
+    return _calendar